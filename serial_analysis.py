@@ -0,0 +1,238 @@
+import math
+from array import array
+from collections import deque
+
+
+class RollingStats:
+    """
+    Sliding-window statistics over the last window samples of a signal.
+
+    add() is O(1): mean, variance and the RMS error against the setpoint
+    come from running sums that are updated as samples enter and leave the
+    ring, and min/max from monotonic candidate deques (as in RingBuffer).
+    Values are stored relative to the first sample to limit cancellation
+    in the variance, and the sums are recomputed from the ring once per
+    window so that floating point drift cannot accumulate.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.values = array('d', bytes(8 * window))  # Relative to shift
+        self.errors = array('d', bytes(8 * window))  # Squared error against the setpoint
+        self.head = 0
+        self.count = 0
+        self.seq = 0
+        self.shift = None
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.sum_err = 0.0
+        self.min_candidates = deque()  # (seq, value), increasing values
+        self.max_candidates = deque()  # (seq, value), decreasing values
+
+    def add(self, value, setpoint=0.0):
+        if self.shift is None:
+            self.shift = value
+        x = value - self.shift
+        err = (value - setpoint) ** 2
+        head = self.head
+        if self.count == self.window:
+            old = self.values[head]
+            self.sum -= old
+            self.sum_sq -= old * old
+            self.sum_err -= self.errors[head]
+        else:
+            self.count += 1
+        self.values[head] = x
+        self.errors[head] = err
+        self.sum += x
+        self.sum_sq += x * x
+        self.sum_err += err
+        self.head = (head + 1) % self.window
+        if self.head == 0:
+            self.resum()
+
+        seq = self.seq
+        self.seq += 1
+        oldest = seq - self.window
+        mins = self.min_candidates
+        while mins and mins[-1][1] >= value:
+            mins.pop()
+        mins.append((seq, value))
+        if mins[0][0] <= oldest:
+            mins.popleft()
+        maxs = self.max_candidates
+        while maxs and maxs[-1][1] <= value:
+            maxs.pop()
+        maxs.append((seq, value))
+        if maxs[0][0] <= oldest:
+            maxs.popleft()
+
+    def resum(self):
+        count = self.count
+        self.sum = math.fsum(self.values[:count])
+        self.sum_sq = math.fsum(x * x for x in self.values[:count])
+        self.sum_err = math.fsum(self.errors[:count])
+
+    @property
+    def mean(self):
+        return self.shift + self.sum / self.count if self.count else 0.0
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return 0.0
+        mean = self.sum / self.count
+        return max(self.sum_sq / self.count - mean * mean, 0.0) * self.count / (self.count - 1)
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def rms_error(self):
+        return math.sqrt(max(self.sum_err, 0.0) / self.count) if self.count else 0.0
+
+    @property
+    def min(self):
+        return self.min_candidates[0][1] if self.min_candidates else 0.0
+
+    @property
+    def max(self):
+        return self.max_candidates[0][1] if self.max_candidates else 0.0
+
+    def reset(self):
+        self.__init__(self.window)
+
+    def describe(self):
+        return (f"Mean {self.mean:.3f} | Std {self.std:.3f} | Min {self.min:.3f} | Max {self.max:.3f} "
+                f"| RMS error {self.rms_error:.3f} ({self.count} samples)")
+
+
+class StepResponse:
+    """Metrics of the response to one setpoint step; times in seconds"""
+
+    def __init__(self, start, initial, target, params=None):
+        self.start = start  # Timestamp of the step, ns
+        self.initial = initial
+        self.target = target
+        self.params = params  # Parameter set active when the step happened
+        self.params_changed = False  # Parameters were changed during the response
+        self.rise_time = None  # 10% -> 90% of the step
+        self.overshoot = 0.0  # Peak beyond the target, % of the step
+        self.settling_time = None  # Until the response stayed within the band
+        self.steady_state_error = 0.0  # Mean target - value over the final hold period
+        self.settled = False
+        self.duration = 0.0
+
+    def describe(self):
+        def seconds(value):
+            return "-" if value is None else f"{value * 1000:.0f} ms"
+        text = (f"Step {self.initial:g} -> {self.target:g}: rise {seconds(self.rise_time)}, "
+                f"overshoot {self.overshoot:.1f}%, settling {seconds(self.settling_time)}, "
+                f"steady-state error {self.steady_state_error:.3f}")
+        if not self.settled:
+            text += f" (not settled after {self.duration:.1f} s)"
+        if self.params:
+            text += f" [{self.params}{', changed during step' if self.params_changed else ''}]"
+        return text
+
+
+class StepAnalyzer:
+    """
+    Online step-response measurement.
+
+    add() takes one (timestamp_ns, value, setpoint) sample at a time. A
+    setpoint change of at least threshold starts a new step from the old
+    setpoint to the new one. Each sample then updates the 10%/90% crossing
+    times, the peak and the last time the value was outside the settling
+    band (band x step size around the target). The step completes once the
+    value has stayed inside the band for hold seconds. It also completes,
+    as not settled, after timeout seconds or when the next step begins.
+    The steady-state error is the mean error over the last hold seconds,
+    kept in a short time-bounded deque. Memory is therefore bounded by the
+    hold period, not by the length of the response.
+
+    params is a description of the controller parameters currently in use;
+    each step is tagged with the value at its start.
+    """
+
+    def __init__(self, threshold=1e-6, band=0.05, hold=0.5, timeout=10.0):
+        self.threshold = threshold  # Smallest setpoint change treated as a step
+        self.band = band
+        self.hold = hold
+        self.timeout = timeout
+        self.params = None
+        self.setpoint = None
+        self.step = None  # StepResponse in progress
+        self.last_outside = 0  # ns since the step
+        self.recent = deque()  # (ns since the step, error) over the last hold seconds
+        self.recent_sum = 0.0
+        self.peak = 0.0  # Largest normalized response so far (1 = target)
+        self.t10 = None  # ns since the step when the response first reached 10%
+        self.results = deque(maxlen=100)
+
+    def set_params(self, params):
+        self.params = params
+        if self.step and params != self.step.params:
+            self.step.params_changed = True
+
+    def add(self, timestamp, value, setpoint):
+        """Feed one sample; returns a StepResponse when a step completes, else None"""
+        done = None
+        if self.setpoint is None:
+            self.setpoint = setpoint
+        elif abs(setpoint - self.setpoint) >= self.threshold:
+            if self.step:
+                done = self.finish()
+            self.begin(timestamp, self.setpoint, setpoint)
+            self.setpoint = setpoint
+        step = self.step
+        if step is None:
+            return done
+        t = timestamp - step.start
+        amplitude = step.target - step.initial
+        progress = (value - step.initial) / amplitude
+        if progress > self.peak:
+            self.peak = progress
+            if self.t10 is None and progress >= 0.1:
+                self.t10 = t
+            if step.rise_time is None and progress >= 0.9:
+                step.rise_time = (t - self.t10) / 1e9
+        error = step.target - value
+        if abs(error) > self.band * abs(amplitude):
+            self.last_outside = t
+        recent = self.recent
+        recent.append((t, error))
+        self.recent_sum += error
+        hold = self.hold * 1e9
+        while recent and recent[0][0] < t - hold:
+            self.recent_sum -= recent.popleft()[1]
+        step.duration = t / 1e9
+        if t - self.last_outside >= hold and step.rise_time is not None:
+            step.settled = True
+            return self.finish()
+        if t >= self.timeout * 1e9:
+            return self.finish()
+        return done
+
+    def begin(self, timestamp, initial, target):
+        self.step = StepResponse(timestamp, initial, target, self.params)
+        self.last_outside = 0
+        self.recent.clear()
+        self.recent_sum = 0.0
+        self.peak = 0.0
+        self.t10 = None
+
+    def finish(self):
+        step = self.step
+        self.step = None
+        step.overshoot = max(self.peak - 1.0, 0.0) * 100
+        step.settling_time = self.last_outside / 1e9 if step.settled else None
+        step.steady_state_error = self.recent_sum / len(self.recent) if self.recent else 0.0
+        self.results.append(step)
+        return step
+
+    def reset(self):
+        self.setpoint = None
+        self.step = None
+        self.results.clear()
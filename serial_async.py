@@ -0,0 +1,355 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+
+from serial_reader import SerialReader
+
+
+class AsyncSerial:
+    """
+    asyncio connection over an already opened serial.Serial port.
+
+    On POSIX the port's file descriptor is registered with the event loop,
+    so reads and writes are non-blocking and any number of ports share one
+    thread. Ports without a selectable descriptor (Windows) fall back to a
+    SerialReader thread for input and a single-thread executor for output.
+
+    Received bytes are buffered until consumed with read(), read_until() or
+    read_frame(), or delivered as chunks by pump(). Reading is paused while
+    more than high_water bytes are unconsumed, and drain() waits until
+    pending output falls below low_water. close() detaches from the loop and
+    fails every pending read with ConnectionError; the port itself stays
+    open and is closed by its owner.
+    """
+
+    def __init__(self, serial_port, loop=None, chunk_size=65536, high_water=1 << 20, low_water=1 << 18):
+        self.serial_port = serial_port
+        self.loop = loop or asyncio.get_event_loop()
+        self.chunk_size = chunk_size
+        self.high_water = high_water
+        self.low_water = low_water
+        self.on_error = None  # Called on the loop thread when the port fails
+        self.buffer = bytearray()  # Received but not yet consumed
+        self.out = bytearray()  # Accepted but not yet written
+        self.out_pending = 0  # Bytes handed to the fallback executor
+        self.waiter = None  # Woken when data arrives or the connection ends
+        self.drain_waiter = None
+        self.drain_level = low_water  # Pending output at which the drain waiter is woken
+        self.fd = None
+        self.reader = None  # SerialReader fallback
+        self.pump_task = None  # Set by open_connection() when chunks are pumped to a callback
+        self.executor = None  # Write executor fallback
+        self.reading_paused = False
+        self.closed = False
+        self.exception = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.discarded = 0  # Output dropped by discard_output() or lost to the port's write_timeout
+
+    def start(self):
+        """Attach the port to the event loop"""
+        try:
+            self.fd = self.serial_port.fileno()
+            self.loop.add_reader(self.fd, self.on_readable)
+        except (AttributeError, NotImplementedError, OSError, ValueError):
+            self.fd = None
+            self.reader = SerialReader(
+                self.serial_port,
+                lambda data: self.loop.call_soon_threadsafe(self.data_received, data),
+                lambda e: self.loop.call_soon_threadsafe(self.connection_lost, e)
+            )
+            self.reader.start()
+            self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def close(self):
+        """Detach from the loop and cancel pending reads and drains"""
+        if self.closed:
+            return
+        self.connection_lost(None)
+
+    # Input
+
+    def on_readable(self):
+        try:
+            data = os.read(self.fd, self.chunk_size)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self.connection_lost(e)
+            return
+        if not data:
+            self.connection_lost(ConnectionError("Serial port closed"))
+            return
+        self.data_received(data)
+
+    def data_received(self, data):
+        if self.closed:
+            return
+        self.bytes_in += len(data)
+        self.buffer += data
+        if self.fd is not None and not self.reading_paused and len(self.buffer) > self.high_water:
+            # Nobody is consuming: stop reading and let the driver/flow control hold the data
+            self.loop.remove_reader(self.fd)
+            self.reading_paused = True
+        self.wake(self.waiter)
+
+    def connection_lost(self, exc):
+        if self.closed:
+            return
+        self.closed = True
+        self.exception = exc
+        if self.fd is not None:
+            self.loop.remove_reader(self.fd)
+            self.loop.remove_writer(self.fd)
+        if self.reader:
+            self.reader.stop()
+            self.reader = None
+        if self.executor:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+        self.wake(self.waiter, exc or ConnectionError("Serial port closed"))
+        self.wake(self.drain_waiter, exc or ConnectionError("Serial port closed"))
+        if exc is not None and self.on_error:
+            self.on_error(exc)
+
+    def wake(self, waiter, exc=None):
+        if waiter is not None and not waiter.done():
+            if exc is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(exc)
+
+    async def wait_for_data(self):
+        if self.closed:
+            raise self.exception or ConnectionError("Serial port closed")
+        waiter = self.waiter = self.loop.create_future()
+        try:
+            await waiter
+        finally:
+            if self.waiter is waiter:
+                self.waiter = None
+
+    def consume(self, n):
+        if n >= len(self.buffer):
+            # Everything buffered: hand the buffer itself over instead of copying it
+            data = self.buffer
+            self.buffer = bytearray()
+        else:
+            with memoryview(self.buffer) as view:
+                data = bytes(view[:n])  # One copy, not a slice plus a copy
+            del self.buffer[:n]
+        if self.reading_paused and len(self.buffer) <= self.low_water and not self.closed:
+            self.loop.add_reader(self.fd, self.on_readable)
+            self.reading_paused = False
+        return data
+
+    async def read(self, n=-1):
+        """
+        Return up to n buffered bytes (all of them if n < 0), waiting for at
+        least one; a bytearray when the whole buffer is taken, else bytes
+        """
+        while not self.buffer:
+            await self.wait_for_data()
+        return self.consume(len(self.buffer) if n < 0 else n)
+
+    async def read_until(self, separator=b'\n', limit=65536):
+        """Return data up to and including separator; ValueError if none within limit bytes"""
+        start = 0
+        while True:
+            index = self.buffer.find(separator, start)
+            if index != -1:
+                return self.consume(index + len(separator))
+            if len(self.buffer) > limit:
+                raise ValueError(f"No separator within {limit} bytes")
+            start = max(len(self.buffer) - len(separator) + 1, 0)
+            await self.wait_for_data()
+
+    async def read_frame(self, delimiter=b'\x00', limit=65536):
+        """Return the next non-empty delimiter-terminated frame without its delimiter"""
+        while True:
+            frame = await self.read_until(delimiter, limit)
+            if len(frame) > len(delimiter):
+                return frame[:-len(delimiter)]
+
+    async def pump(self, on_data, on_error=None):
+        """
+        Deliver every received chunk to on_data until the connection ends.
+        An exception from on_data does not stop reception: it is passed to
+        on_error (default: the connection's on_error), with its traceback on
+        the loop's exception handler, once per run of failing chunks.
+        """
+        failing = False
+        while True:
+            try:
+                data = await self.read()
+            except Exception as e:
+                # The port failed or was closed; connection_lost() has reported failures
+                if self.exception is not None and on_error:
+                    on_error(e)
+                return
+            try:
+                on_data(data)
+            except Exception as e:
+                if not failing:
+                    self.loop.call_exception_handler({"message": "Serial receive callback failed", "exception": e})
+                    report = on_error or self.on_error
+                    if report:
+                        report(RuntimeError(f"Receive callback failed: {e!r}"))
+                failing = True
+            else:
+                failing = False
+
+    # Output
+
+    def write(self, data):
+        """Queue data for writing without blocking"""
+        if self.closed:
+            raise self.exception or ConnectionError("Serial port closed")
+        if not data:
+            return
+        if self.fd is None:
+            self.out_pending += len(data)
+            future = self.loop.run_in_executor(self.executor, self.serial_port.write, data)
+            future.add_done_callback(lambda f, n=len(data): self.executor_write_done(f, n))
+            return
+        if not self.out:
+            try:
+                n = os.write(self.fd, data)
+            except (BlockingIOError, InterruptedError):
+                n = 0
+            except OSError as e:
+                self.connection_lost(e)
+                raise
+            self.bytes_out += n
+            if n == len(data):
+                return
+            data = memoryview(data)[n:]
+            self.loop.add_writer(self.fd, self.on_writable)
+        self.out += data
+
+    def write_threadsafe(self, data):
+        """write() for callers outside the loop thread; failures go to on_error"""
+        self.loop.call_soon_threadsafe(self.safe_write, data)
+
+    def safe_write(self, data):
+        try:
+            self.write(data)
+        except Exception as e:
+            if self.on_error:
+                self.on_error(e)
+
+    def on_writable(self):
+        try:
+            n = os.write(self.fd, self.out)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self.connection_lost(e)
+            return
+        self.bytes_out += n
+        del self.out[:n]
+        if not self.out:
+            self.loop.remove_writer(self.fd)
+        if self.pending() <= self.drain_level:
+            self.wake(self.drain_waiter)
+
+    def executor_write_done(self, future, n):
+        self.out_pending -= n
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if isinstance(exc, serial.SerialTimeoutException):
+            # The port's write_timeout expired (stalled adapter or flow-control hold):
+            # the block is lost but the port is still usable
+            self.discarded += n
+        elif exc is not None:
+            self.connection_lost(exc)
+            return
+        else:
+            self.bytes_out += n
+        if self.pending() <= self.drain_level:
+            self.wake(self.drain_waiter)
+
+    def pending(self):
+        """Bytes accepted by write() but not yet handed to the OS"""
+        return len(self.out) + self.out_pending
+
+    def discard_output(self):
+        """
+        Drop output not yet handed to the OS (e.g. after a write timeout);
+        returns the bytes dropped. Writes already running in the executor
+        fallback cannot be recalled; they end with the port's write_timeout.
+        """
+        dropped = len(self.out)
+        if dropped and self.fd is not None:
+            self.loop.remove_writer(self.fd)
+        del self.out[:]
+        self.discarded += dropped
+        return dropped
+
+    async def drain(self, level=None):
+        """Wait until pending output drops to level, default low_water (backpressure for writers)"""
+        level = self.low_water if level is None else level
+        while self.pending() > level:
+            if self.closed:
+                raise self.exception or ConnectionError("Serial port closed")
+            self.drain_level = level
+            waiter = self.drain_waiter = self.loop.create_future()
+            try:
+                await waiter
+            finally:
+                if self.drain_waiter is waiter:
+                    self.drain_waiter = None
+
+
+async def open_connection(serial_port, on_data=None, on_error=None):
+    """
+    Attach an opened serial.Serial to the running loop. If on_data is given,
+    every received chunk is passed to it from the loop thread.
+    """
+    connection = AsyncSerial(serial_port, asyncio.get_running_loop())
+    connection.on_error = on_error
+    connection.start()
+    if on_data:
+        connection.pump_task = asyncio.ensure_future(connection.pump(on_data))
+    return connection
+
+
+class AsyncBridge:
+    """
+    Runs one asyncio event loop in a background thread so that a Tk
+    application can drive any number of AsyncSerial connections without a
+    thread per port. Coroutines are submitted from the Tk thread; callbacks
+    from connections run on the loop thread and must hand results back to
+    Tk themselves (e.g. through a ChunkBuffer or root.after).
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedule a coroutine; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call(self, func, *args):
+        """Run func(*args) on the loop thread without waiting"""
+        self.loop.call_soon_threadsafe(func, *args)
+
+    def call_and_wait(self, func, *args, timeout=1.0):
+        """Run func(*args) on the loop thread and return its result"""
+        async def invoke():
+            return func(*args)
+        return self.submit(invoke()).result(timeout)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(1.0)
@@ -0,0 +1,432 @@
+import argparse
+import json
+import os
+import platform
+import select
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+
+import serial
+import tkinter as tk
+
+from serial_async import AsyncBridge, open_connection
+from serial_telemetry import RecordFramer, ChannelRegistry, np
+from serial_protocol import FrameDecoder, encode_frame
+from serial_debugger import SerialDebugger
+
+try:
+    import tty
+except ImportError:  # Windows has no pseudo-terminals
+    tty = None
+
+# Metrics where a higher value is better; every other numeric metric is a time
+HIGHER_IS_BETTER = ("bytes_per_s", "samples_per_s", "frames_per_s")
+
+
+def make_payload(telemetry_format="ascii", records=1000):
+    """A block of typical balance-car telemetry that can be repeated seamlessly"""
+    out = bytearray()
+    for i in range(records):
+        left = 100.0 * ((i % 200) - 100) / 100
+        right = left + 0.5
+        angle = (i % 50) / 10.0 - 2.5
+        if telemetry_format == "ascii":
+            out += f"SPEED:{left:.2f},{right:.2f}\n".encode('ascii')
+            if i % 4 == 0:
+                out += f"ANGLE:{angle:.3f},{angle * 3:.3f}\n".encode('ascii')
+        else:
+            out += encode_frame(0x01, left, right, framing=telemetry_format)
+            if i % 4 == 0:
+                out += encode_frame(0x02, angle, angle * 3, framing=telemetry_format)
+    return bytes(out)
+
+
+def make_decoder(telemetry_format, samples):
+    if telemetry_format == "ascii":
+        return RecordFramer(ChannelRegistry().keys(), samples)
+    return FrameDecoder(telemetry_format, samples)
+
+
+def percentiles(values, scale=1.0):
+    """p50/p90/p99/max of values, multiplied by scale"""
+    if not values:
+        return {}
+    values = sorted(values)
+    last = len(values) - 1
+    result = {f"p{q}": values[min(last, int(round(q / 100 * last)))] * scale for q in (50, 90, 99)}
+    result["max"] = values[-1] * scale
+    return result
+
+
+class LoadGenerator:
+    """
+    Writes a repeating payload into the master side of a pseudo-terminal.
+
+    The slave side (port_name) is opened by the code under test like any
+    serial port. rate limits the output to that many bytes per second (0
+    writes as fast as the consumer reads). Every write is recorded as
+    (end offset, monotonic ns) so that end-to-end latency can be computed
+    once the consumer reports how far it got, see latencies().
+    """
+
+    def __init__(self, payload, rate=0, chunk_size=4096):
+        if tty is None or not hasattr(os, "openpty"):
+            raise OSError("Pseudo-terminals are not supported on this platform")
+        self.payload = payload
+        self.rate = rate
+        # Small writes when throttled, so bursts do not dominate the latency
+        self.chunk_size = min(chunk_size, max(16, rate // 200)) if rate else chunk_size
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port_name = os.ttyname(self.slave)
+        self.sent = 0
+        self.offsets = array('q')  # End offset of every write
+        self.times = array('q')  # Completion time of every write
+        self.running = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.running = True
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join(1.0)
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+    def run(self):
+        data = memoryview(self.payload)
+        pos = 0
+        start = time.monotonic_ns()
+        while self.running:
+            if self.rate:
+                delay = (start + self.sent * 1e9 / self.rate - time.monotonic_ns()) / 1e9
+                if delay > 0:
+                    time.sleep(min(delay, 0.1))
+                    continue
+            readable, writable, _ = select.select([self.master], [self.master], [], 0.1)
+            if readable:
+                try:
+                    os.read(self.master, 65536)  # Commands from the code under test
+                except OSError:
+                    pass
+            if not writable:
+                continue
+            if pos >= len(data):
+                pos = 0
+            try:
+                n = os.write(self.master, data[pos:pos + self.chunk_size])
+            except (BlockingIOError, InterruptedError):
+                continue
+            pos += n
+            self.sent += n
+            self.offsets.append(self.sent)
+            self.times.append(time.monotonic_ns())
+
+    def latencies(self, seen_offsets, seen_times):
+        """
+        Write-to-consumer latencies in ns, given the consumer's progress as
+        parallel sequences of (bytes consumed so far, monotonic ns)
+        """
+        result = []
+        j = 0
+        for offset, written in zip(self.offsets, self.times):
+            while j < len(seen_offsets) and seen_offsets[j] < offset:
+                j += 1
+            if j == len(seen_offsets):
+                break
+            result.append(seen_times[j] - written)
+        return result
+
+
+class HeadlessDebugger:
+    """
+    The receive-path state of SerialDebugger without any widgets.
+
+    init_receive_state(), receive_data() and parse_speed_data() are
+    SerialDebugger's own methods, so the benchmark runs the real I/O-thread
+    code; ui_tick() mirrors SerialDebugger.ui_tick() and drain_telemetry()
+    up to the point where they touch Tk.
+    """
+
+    init_receive_state = SerialDebugger.init_receive_state
+    receive_data = SerialDebugger.receive_data
+    parse_speed_data = SerialDebugger.parse_speed_data
+
+    def __init__(self, telemetry_format="ascii", hex_display=False):
+        self.init_receive_state()
+        self.speed_monitoring = True
+        self.channels = ChannelRegistry(capacity=100)
+        if telemetry_format != "ascii":
+            self.channels.configure("SPEED:left,right;ANGLE:angle,gyro")
+        self.telemetry_samples = deque(maxlen=100000)
+        self.telemetry_decoder = make_decoder(telemetry_format, self.telemetry_samples)
+        self.hex_display = hex_display
+        self.consumed = 0
+        self.samples = 0
+
+    def ui_tick(self):
+        data, chunks, arrival = self.rx_buffer.drain()
+        if data:
+            if self.hex_display:
+                data.hex(' ')
+            else:
+                data.decode('utf-8', errors='replace')
+            self.consumed += len(data)
+        samples = self.telemetry_samples
+        while samples:
+            timestamp, key, values = samples.popleft()
+            self.channels.push(timestamp, key, values)
+            self.samples += 1
+        return len(data)
+
+
+def bench_parse(telemetry_format, duration):
+    """Parser alone, fed from memory: the upper bound for the receive path"""
+    payload = make_payload(telemetry_format)
+    samples = deque(maxlen=100000)
+    decoder = make_decoder(telemetry_format, samples)
+    count = 0
+    fed = 0
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        decoder.feed(payload, 0)
+        fed += len(payload)
+        count += len(samples)
+        samples.clear()
+    elapsed = time.perf_counter() - start
+    return {
+        "bytes_per_s": fed / elapsed,
+        "samples_per_s": count / elapsed,
+        "cpu_percent": 100 * (time.process_time() - cpu_start) / elapsed,
+        "counters": decoder.counters(),
+    }
+
+
+def bench_receive(port_factory, telemetry_format, duration, rate, ui_rate, hex_display=False):
+    """
+    pty -> AsyncSerial -> SerialDebugger.receive_data/parse_speed_data on the
+    I/O thread, drained by a simulated UI tick on this thread
+    """
+    generator = LoadGenerator(make_payload(telemetry_format), rate)
+    debugger = HeadlessDebugger(telemetry_format, hex_display)
+    bridge = AsyncBridge()
+    serial_port = port_factory(generator.port_name)
+    seen_offsets = array('q')
+    seen_times = array('q')
+    tick_times = []
+    try:
+        connection = bridge.submit(open_connection(serial_port, debugger.receive_data)).result(timeout=2)
+        generator.start()
+        interval = 1.0 / ui_rate
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        next_tick = start + interval
+        while time.perf_counter() - start < duration:
+            time.sleep(max(0.0, next_tick - time.perf_counter()))
+            next_tick += interval
+            tick_start = time.perf_counter()
+            if debugger.ui_tick():
+                seen_offsets.append(debugger.consumed)
+                seen_times.append(time.monotonic_ns())
+            tick_times.append(time.perf_counter() - tick_start)
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        generator.stop()
+        bridge.call_and_wait(connection.close)
+    finally:
+        generator.stop()
+        bridge.stop()
+        serial_port.close()
+        generator.close()
+    return {
+        "bytes_per_s": debugger.consumed / elapsed,
+        "samples_per_s": debugger.samples / elapsed,
+        "cpu_percent": 100 * cpu / elapsed,
+        "offered_bytes_per_s": generator.sent / elapsed,
+        "latency_ms": percentiles(generator.latencies(seen_offsets, seen_times), 1e-6),
+        "ui_tick_ms": percentiles(tick_times, 1e3),
+        "counters": debugger.telemetry_decoder.counters(),
+    }
+
+
+def bench_gui(telemetry_format, duration, rate, ui_rate, hex_display=False):
+    """
+    The complete SerialDebugger connected to a pty: receive, display, parse
+    and graph redraw as in normal use. Needs a display (e.g. xvfb-run).
+    """
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        return {"skipped": f"No display available ({e}); run under xvfb-run"}
+    generator = LoadGenerator(make_payload(telemetry_format), rate)
+    app = SerialDebugger(root)
+    app.ui_rate_var.set(ui_rate)
+    app.receive_hex_var.set(hex_display)
+    app.notebook.select(1)  # Show the telemetry graph
+
+    seen_offsets = array('q')
+    seen_times = array('q')
+    display_times = []
+    redraw_times = []
+    samples = [0]
+
+    display = app.display_received_data
+    def timed_display(data):
+        t = time.perf_counter()
+        display(data)
+        display_times.append(time.perf_counter() - t)
+        seen_offsets.append((seen_offsets[-1] if seen_offsets else 0) + len(data))
+        seen_times.append(time.monotonic_ns())
+    app.display_received_data = timed_display
+
+    drain = app.drain_telemetry
+    def counted_drain():
+        samples[0] += len(app.telemetry_samples)
+        drain()
+    app.drain_telemetry = counted_drain
+
+    redraw = app.speed_graph.redraw
+    def timed_redraw():
+        t = time.perf_counter()
+        redraw()
+        root.update_idletasks()  # Include the canvas repaint
+        redraw_times.append(time.perf_counter() - t)
+    app.speed_graph.redraw = timed_redraw
+
+    if telemetry_format != "ascii":
+        app.telemetry_format_var.set(telemetry_format.upper())
+        app.set_telemetry_format()
+    root.update()
+    app.port_var.set(generator.port_name)
+    app.connect_serial()
+    if not app.is_open:
+        generator.close()
+        app.on_close()
+        return {"skipped": f"Could not open {generator.port_name}"}
+    app.start_speed_monitoring()
+
+    generator.start()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    root.after(int(duration * 1000), root.quit)
+    root.mainloop()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    generator.stop()
+    counters = app.telemetry_decoder.counters()
+    app.on_close()
+    generator.close()
+    consumed = seen_offsets[-1] if seen_offsets else 0
+    return {
+        "bytes_per_s": consumed / elapsed,
+        "samples_per_s": samples[0] / elapsed,
+        "frames_per_s": len(redraw_times) / elapsed,
+        "cpu_percent": 100 * cpu / elapsed,
+        "offered_bytes_per_s": generator.sent / elapsed,
+        "latency_ms": percentiles(generator.latencies(seen_offsets, seen_times), 1e-6),
+        "display_ms": percentiles(display_times, 1e3),
+        "redraw_ms": percentiles(redraw_times, 1e3),
+        "counters": counters,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print metric changes against a baseline; returns the regressions found"""
+    regressions = []
+    def walk(path, new, old):
+        if isinstance(new, dict) and isinstance(old, dict):
+            for key in new:
+                if key in old:
+                    walk(path + [key], new[key], old[key])
+            return
+        if not isinstance(new, (int, float)) or not isinstance(old, (int, float)) or not old:
+            return
+        if path[-1] == "cpu_percent" or path[-1].startswith("offered"):
+            return  # Informational only
+        change = (new - old) / old
+        worse = -change if any(name in path for name in HIGHER_IS_BETTER) else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        print(f"  {'.'.join(path):<40} {old:>12.3f} -> {new:>12.3f} ({change:+.1%}){flag}")
+        if flag:
+            regressions.append(".".join(path))
+    walk([], results, baseline)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the serial debugger receive, parse and render paths")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per benchmark (default: 5)")
+    parser.add_argument("--format", default="ascii", choices=["ascii", "cobs", "slip"],
+                        help="Telemetry format to generate (default: ascii)")
+    parser.add_argument("--baudrate", type=int, default=0,
+                        help="Throttle the load to this baud rate (10 bits per byte); 0 = unthrottled (default: 0)")
+    parser.add_argument("--ui-rate", type=int, default=30, help="UI refresh rate in Hz (default: 30)")
+    parser.add_argument("--hex", action="store_true", help="Display received data as hex")
+    parser.add_argument("--only", action="append", choices=["parse", "receive", "gui"],
+                        help="Run only the given benchmark; repeatable (default: all)")
+    parser.add_argument("-o", "--output", metavar="PATH", help="Write the results as JSON to PATH")
+    parser.add_argument("--compare", metavar="PATH", help="Compare against an earlier JSON result")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Relative change counted as a regression by --compare (default: 0.2)")
+
+    args = parser.parse_args()
+
+    def port_factory(name):
+        return serial.Serial(name, baudrate=args.baudrate or 115200, timeout=1)
+
+    rate = args.baudrate // 10
+    only = args.only or ["parse", "receive", "gui"]
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np is not None,
+        "config": {
+            "duration": args.duration,
+            "format": args.format,
+            "baudrate": args.baudrate,
+            "ui_rate": args.ui_rate,
+            "hex": args.hex,
+        },
+        "results": {},
+    }
+    results = report["results"]
+    for name in only:
+        print(f"Running {name} benchmark ({args.duration:g} s)...", file=sys.stderr)
+        try:
+            if name == "parse":
+                results[name] = bench_parse(args.format, args.duration)
+            elif name == "receive":
+                results[name] = bench_receive(port_factory, args.format, args.duration, rate, args.ui_rate, args.hex)
+            else:
+                results[name] = bench_gui(args.format, args.duration, rate, args.ui_rate, args.hex)
+        except OSError as e:
+            results[name] = {"skipped": str(e)}
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Compared with {args.compare}:")
+        if baseline.get("config") != report["config"]:
+            print(f"  Warning: baseline was run with a different configuration: {baseline.get('config')}")
+        regressions = compare(report["results"], baseline.get("results", {}), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import os
+import queue
+import struct
+import threading
+import time
+
+# Capture file layout:
+#   file header:  MAGIC, then wall-clock ns and monotonic ns at file creation ('<qq')
+#   each record:  monotonic ns timestamp, direction, payload length ('<qBI'), payload
+# The header pair lets readers convert record timestamps to wall-clock time.
+MAGIC = b"SERCAP01"
+FILE_HEADER = struct.Struct('<qq')
+RECORD_HEADER = struct.Struct('<qBI')
+RX = 0
+TX = 1
+
+
+class CaptureWriter:
+    """
+    Continuous binary capture of serial traffic with size/time rotation.
+
+    record() is called from the I/O thread and only appends to an in-memory
+    block; full blocks (block_size bytes) are handed to a writer thread,
+    which performs large sequential writes and rotates files. The I/O thread
+    never touches the disk, and blocks are queued without limit, so no data
+    is dropped when the disk briefly falls behind. Partially filled blocks
+    are flushed every flush_interval seconds.
+
+    A failed write or rotation stops the capture: error is set and passed
+    to on_error (on the writer thread), the files written so far stay
+    valid, and queued blocks and later records are dropped and counted.
+
+    Files are named <stem>-0001<suffix>, <stem>-0002<suffix>, ... next to
+    path; a new one is started when the current file exceeds max_bytes or
+    is older than max_seconds (either may be None).
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, max_seconds=None, block_size=1 << 20, flush_interval=0.5):
+        self.stem, self.suffix = os.path.splitext(path)
+        self.suffix = self.suffix or ".scap"
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.block_size = block_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.block = bytearray()
+        self.blocks = queue.Queue()
+        self.file = None
+        self.file_size = 0
+        self.file_opened = 0.0
+        self.index = 0
+        self.files = []  # Paths written so far
+        self.records = 0
+        self.bytes = 0  # Payload bytes captured
+        self.dropped = 0  # Payload bytes lost after a write error
+        self.error = None
+        self.on_error = None  # Called with the exception when the capture stops on an error
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.open_next()
+        self.thread.start()
+
+    def record(self, direction, data, timestamp=None):
+        """Append one RX/TX chunk (any thread; never blocks on disk)"""
+        if timestamp is None:
+            timestamp = time.monotonic_ns()
+        header = RECORD_HEADER.pack(timestamp, direction, len(data))
+        with self.lock:
+            if self.error is not None:
+                self.dropped += len(data)
+                return
+            self.block += header
+            self.block += data
+            self.records += 1
+            self.bytes += len(data)
+            if len(self.block) < self.block_size:
+                return
+            block = self.block
+            self.block = bytearray()
+        self.blocks.put(block)
+
+    def close(self):
+        """Flush everything and stop the writer thread"""
+        with self.lock:
+            block = self.block
+            self.block = bytearray()
+        if block:
+            self.blocks.put(block)
+        self.blocks.put(None)
+        self.thread.join()
+
+    def open_next(self):
+        """Start the next file; if that fails the current one stays open and complete"""
+        path = f"{self.stem}-{self.index + 1:04d}{self.suffix}"
+        file = open(path, "wb")
+        try:
+            file.write(MAGIC + FILE_HEADER.pack(time.time_ns(), time.monotonic_ns()))
+        except OSError:
+            file.close()
+            raise
+        if self.file:
+            self.file.close()
+        self.file = file
+        self.index += 1
+        self.file_size = len(MAGIC) + FILE_HEADER.size
+        self.file_opened = time.monotonic()
+        self.files.append(path)
+
+    def run(self):
+        while True:
+            try:
+                block = self.blocks.get(timeout=self.flush_interval)
+            except queue.Empty:
+                # Idle: push out whatever has accumulated
+                with self.lock:
+                    block = self.block
+                    self.block = bytearray()
+                if not block:
+                    continue
+            if block is None:
+                break
+            if self.error is not None:
+                self.dropped += self.payload_size(block)
+                continue
+            try:
+                self.write_block(block)
+            except (OSError, ValueError) as e:
+                self.fail(e, block)
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def write_block(self, block):
+        # Rotate between blocks so records never straddle two files
+        if (self.max_bytes and self.file_size + len(block) > self.max_bytes and
+                self.file_size > len(MAGIC) + FILE_HEADER.size):
+            self.open_next()
+        elif self.max_seconds and time.monotonic() - self.file_opened > self.max_seconds:
+            self.open_next()
+        self.file.write(block)
+        self.file_size += len(block)
+
+    def fail(self, e, block):
+        with self.lock:
+            self.error = e
+            self.dropped += self.payload_size(block) + self.payload_size(self.block)
+            self.block = bytearray()
+        if self.on_error:
+            self.on_error(e)
+
+    @staticmethod
+    def payload_size(block):
+        """Payload bytes of the records in a block"""
+        size = 0
+        pos = 0
+        while pos < len(block):
+            length = RECORD_HEADER.unpack_from(block, pos)[2]
+            size += length
+            pos += RECORD_HEADER.size + length
+        return size
+
+    def status(self):
+        text = f"Captured {self.bytes} bytes in {self.records} records to {len(self.files)} file(s)"
+        if self.error is not None:
+            text += f"; stopped by a write error ({self.error}), {self.dropped} bytes lost"
+        return text
+
+
+def read_capture(path):
+    """Return (wall_ns, mono_ns) from the file header; raises ValueError for non-capture files"""
+    with open(path, "rb") as f:
+        head = f.read(len(MAGIC) + FILE_HEADER.size)
+    if len(head) < len(MAGIC) + FILE_HEADER.size or head[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a serial capture file")
+    return FILE_HEADER.unpack_from(head, len(MAGIC))
+
+
+def iter_capture(path, block_size=1 << 20):
+    """Yield (timestamp_ns, direction, data) for every record in a capture file"""
+    read_capture(path)
+    with open(path, "rb") as f:
+        f.seek(len(MAGIC) + FILE_HEADER.size)
+        buf = b""
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            buf = buf + block if buf else block
+            pos = 0
+            while len(buf) - pos >= RECORD_HEADER.size:
+                timestamp, direction, length = RECORD_HEADER.unpack_from(buf, pos)
+                end = pos + RECORD_HEADER.size + length
+                if end > len(buf):
+                    break
+                yield timestamp, direction, buf[pos + RECORD_HEADER.size:end]
+                pos = end
+            buf = buf[pos:]
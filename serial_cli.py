@@ -1,13 +1,77 @@
 import serial
 import serial.tools.list_ports
-import threading
 import sys
 import argparse
+import asyncio
+import threading
+import queue
+import time
+import glob
+import fnmatch
+import os
+
+from serial_async import AsyncSerial, open_connection
+from serial_protocol import FrameDecoder
+from serial_capture import CaptureWriter, RX, TX
+from serial_stats import StreamStats
+from serial_discovery import PortDiscovery
+from serial_commands import CommandEngine, parse_pid_reply
+from serial_sweep import (PidSweep, PlantTarget, DeviceTarget, parse_ranges, grid_candidates, random_candidates,
+                          format_table)
+from serial_plant import DEFAULT_GAINS
+
+try:
+    import msvcrt  # Windows: stdin must be switched to binary mode for --raw
+except ImportError:
+    msvcrt = None
+
+# Map parity string to serial constants
+PARITY_MAP = {
+    'N': serial.PARITY_NONE,
+    'E': serial.PARITY_EVEN,
+    'O': serial.PARITY_ODD,
+    'M': serial.PARITY_MARK,
+    'S': serial.PARITY_SPACE
+}
+
+# Map stopbits to serial constants
+STOPBITS_MAP = {
+    1: serial.STOPBITS_ONE,
+    1.5: serial.STOPBITS_ONE_POINT_FIVE,
+    2: serial.STOPBITS_TWO
+}
+
+def open_serial(port, baudrate=9600, bytesize=8, parity='N', stopbits=1):
+    """Open a serial port with CLI-style settings"""
+    return serial.Serial(
+        port=port,
+        baudrate=baudrate,
+        bytesize=bytesize,
+        parity=PARITY_MAP[parity],
+        stopbits=STOPBITS_MAP[stopbits],
+        timeout=1
+    )
 
 class SerialCLI:
-    def __init__(self, port, baudrate=9600, bytesize=8, parity='N', stopbits=1):
+    def __init__(self, port, baudrate=9600, bytesize=8, parity='N', stopbits=1, binary=None, capture=None,
+                 raw=False, rate=None, eof_wait=1.0, stats=False):
         self.serial_port = None
+        self.connection = None  # AsyncSerial while running
         self.running = False
+        # Raw pipe mode: stdin -> port and port -> stdout, status messages on stderr
+        self.raw = raw
+        self.rate = rate  # Limit for stdin -> port in bytes per second, None = unlimited
+        self.eof_wait = eof_wait  # Seconds to keep relaying port -> stdout after stdin EOF
+        self.tx_due = 0.0
+        self.tx_bytes = 0
+        self.rx_bytes = 0
+        self.last_rx = 0.0
+        self.stats = StreamStats() if stats else None  # Printed once per second with --stats
+        # Binary telemetry decoder ("cobs" or "slip"); None prints raw data
+        self.decoder = FrameDecoder(binary) if binary else None
+        # Capture settings: dict of CaptureWriter arguments, or None
+        self.capture_args = capture
+        self.capture = None
         self.port = port
         self.baudrate = baudrate
         self.bytesize = bytesize
@@ -17,65 +81,63 @@ class SerialCLI:
     def connect(self):
         """Connect to the serial port"""
         try:
-            # Map parity string to serial constants
-            parity_map = {
-                'N': serial.PARITY_NONE,
-                'E': serial.PARITY_EVEN,
-                'O': serial.PARITY_ODD,
-                'M': serial.PARITY_MARK,
-                'S': serial.PARITY_SPACE
-            }
-            
-            # Map stopbits to serial constants
-            stopbits_map = {
-                1: serial.STOPBITS_ONE,
-                1.5: serial.STOPBITS_ONE_POINT_FIVE,
-                2: serial.STOPBITS_TWO
-            }
-            
-            self.serial_port = serial.Serial(
-                port=self.port,
-                baudrate=self.baudrate,
-                bytesize=self.bytesize,
-                parity=parity_map[self.parity],
-                stopbits=stopbits_map[self.stopbits],
-                timeout=1
-            )
+            self.serial_port = open_serial(self.port, self.baudrate, self.bytesize, self.parity, self.stopbits)
             
-            print(f"Connected to {self.port} at {self.baudrate} baud")
+            self.info(f"Connected to {self.port} at {self.baudrate} baud")
             return True
             
         except Exception as e:
-            print(f"Failed to connect: {e}")
+            self.info(f"Failed to connect: {e}")
             return False
             
     def disconnect(self):
         """Disconnect from the serial port"""
         if self.serial_port and self.serial_port.is_open:
             self.serial_port.close()
-            print("Disconnected")
+            self.info("Disconnected")
             
-    def receive_data(self):
-        """Receive data in a separate thread"""
-        while self.running:
+    def info(self, message):
+        """Print a status message; in raw mode stdout carries data, so use stderr"""
+        print(message, file=sys.stderr if self.raw else sys.stdout)
+            
+    def receive_data(self, data):
+        """Handle data received on the event loop"""
+        timestamp = time.monotonic_ns()
+        if self.capture:
+            self.capture.record(RX, data, timestamp)
+        if self.stats:
+            self.stats.on_chunk(len(data))
+        if self.decoder:
+            self.decoder.feed(data, timestamp)
+            samples = self.decoder.samples
+            while samples:
+                _, key, values = samples.popleft()
+                print(f"RX FRAME {key}: {', '.join(f'{v:g}' for v in values)}")
+        else:
+            # Print received data as both hex and ASCII
+            print(f"RX HEX: {data.hex()}")
             try:
-                if self.serial_port.in_waiting > 0:
-                    data = self.serial_port.read(self.serial_port.in_waiting)
-                    if data:
-                        # Print received data as both hex and ASCII
-                        print(f"RX HEX: {data.hex()}")
-                        try:
-                            ascii_data = data.decode('utf-8')
-                            print(f"RX ASCII: {ascii_data}")
-                        except UnicodeDecodeError:
-                            print("RX ASCII: (unreadable)")
-                # Small delay to prevent high CPU usage
-                import time
-                time.sleep(0.01)
-            except Exception as e:
-                if self.running:  # Only print error if we're still supposed to be running
-                    print(f"Receive error: {e}")
-                break
+                ascii_data = data.decode('utf-8')
+                print(f"RX ASCII: {ascii_data}")
+            except UnicodeDecodeError:
+                print("RX ASCII: (unreadable)")
+        if self.stats:
+            self.stats.on_consumed(timestamp)
+            
+    async def report_stats(self):
+        """Print receive statistics once per second (--stats)"""
+        while True:
+            await asyncio.sleep(1.0)
+            self.stats.on_queue(len(self.connection.buffer) + self.connection.pending())
+            line = f"[stats] {self.stats.report()}"
+            if self.decoder:
+                line += f" | {self.decoder.counters()}"
+            self.info(line)
+
+    def receive_error(self, e):
+        """Handle a read or write failure on the event loop"""
+        if self.running:  # Only print error if we're still supposed to be running
+            self.info(f"Receive error: {e}")
                 
     def send_data(self, data, is_hex=False):
         """Send data to the serial port"""
@@ -90,24 +152,40 @@ class SerialCLI:
                 if len(hex_data) % 2 != 0:
                     hex_data = "0" + hex_data
                 byte_data = bytes.fromhex(hex_data)
-                self.serial_port.write(byte_data)
+                self.connection.write(byte_data)
+                if self.capture:
+                    self.capture.record(TX, byte_data)
                 print(f"Sent (HEX): {hex_data}")
             else:
-                self.serial_port.write(data.encode('utf-8'))
+                byte_data = data.encode('utf-8')
+                self.connection.write(byte_data)
+                if self.capture:
+                    self.capture.record(TX, byte_data)
                 print(f"Sent: {data}")
         except Exception as e:
             print(f"Send error: {e}")
             
-    def run(self):
-        """Run the main loop"""
-        if not self.connect():
-            return
+    def read_stdin(self, loop, lines):
+        """Forward stdin lines to the event loop (None on EOF)"""
+        try:
+            while True:
+                line = input()
+                loop.call_soon_threadsafe(lines.put_nowait, line)
+        except (EOFError, OSError):
+            loop.call_soon_threadsafe(lines.put_nowait, None)
             
-        self.running = True
+    async def run_async(self):
+        """Serve the port and the keyboard from one event loop"""
+        loop = asyncio.get_running_loop()
+        self.connection = AsyncSerial(self.serial_port, loop)
+        self.connection.on_error = self.receive_error
+        self.connection.start()
+        pump = asyncio.ensure_future(self.connection.pump(self.receive_data))
+        reporter = asyncio.ensure_future(self.report_stats()) if self.stats else None
         
-        # Start receive thread
-        receive_thread = threading.Thread(target=self.receive_data, daemon=True)
-        receive_thread.start()
+        # input() blocks, so it runs in a daemon thread that cannot hold up exit
+        lines = asyncio.Queue()
+        threading.Thread(target=self.read_stdin, args=(loop, lines), daemon=True).start()
         
         print("Serial terminal started. Type your messages and press Enter to send.")
         print("Commands:")
@@ -117,9 +195,15 @@ class SerialCLI:
         
         try:
             while self.running:
-                user_input = input()
+                next_line = asyncio.ensure_future(lines.get())
+                done, _ = await asyncio.wait({next_line, pump}, return_when=asyncio.FIRST_COMPLETED)
+                if next_line not in done:
+                    # The connection ended
+                    next_line.cancel()
+                    break
+                user_input = next_line.result()
                 
-                if user_input.lower() == "!quit":
+                if user_input is None or user_input.lower() == "!quit":
                     self.running = False
                     break
                 elif user_input.startswith("!hex "):
@@ -127,12 +211,522 @@ class SerialCLI:
                     self.send_data(hex_data, is_hex=True)
                 elif user_input:
                     self.send_data(user_input, is_hex=False)
+                await self.connection.drain()
+        finally:
+            if reporter:
+                reporter.cancel()
+            self.connection.close()
+            
+    def read_stdin_raw(self, loop, chunks):
+        """Forward raw stdin blocks to the event loop (None on EOF); blocks while the port is behind"""
+        fd = sys.stdin.fileno()
+        if msvcrt:
+            msvcrt.setmode(fd, os.O_BINARY)
+        try:
+            while True:
+                data = os.read(fd, 1 << 16)
+                if not data:
+                    break
+                asyncio.run_coroutine_threadsafe(chunks.put(data), loop).result()
+        except (OSError, RuntimeError):
+            pass  # Stdin failed or the loop is gone
+        try:
+            asyncio.run_coroutine_threadsafe(chunks.put(None), loop).result()
+        except RuntimeError:
+            pass
+            
+    async def relay_port(self, fd):
+        """Copy everything received to fd (stdout) until the connection ends"""
+        loop = asyncio.get_running_loop()
+        while True:
+            data = await self.connection.read()
+            timestamp = time.monotonic_ns()
+            self.last_rx = loop.time()
+            self.rx_bytes += len(data)
+            if self.capture:
+                self.capture.record(RX, data, timestamp)
+            if self.stats:
+                self.stats.on_chunk(len(data))
+            if msvcrt:
+                # Console and pipe handles cannot join the event loop: write from the executor
+                await loop.run_in_executor(None, self.write_all, fd, data)
+            else:
+                await self.write_out(fd, data)
+            if self.stats:
+                self.stats.on_consumed(timestamp)
+                
+    async def write_out(self, fd, data):
+        """
+        Write data to the non-blocking fd; while the reader of the pipe is
+        behind, wait for room without holding up the event loop
+        """
+        loop = asyncio.get_running_loop()
+        view = memoryview(data)
+        while view:
+            try:
+                view = view[os.write(fd, view):]
+            except BlockingIOError:
+                writable = loop.create_future()
+                loop.add_writer(fd, lambda: writable.done() or writable.set_result(None))
+                try:
+                    await writable
+                finally:
+                    loop.remove_writer(fd)
                     
+    def write_all(self, fd, data):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+            
+    async def send_raw(self, data):
+        """Write one stdin block to the port, paced to self.rate if set"""
+        loop = asyncio.get_running_loop()
+        step = max(int(self.rate / 50), 1) if self.rate else len(data)  # ~20 ms slices when paced
+        for pos in range(0, len(data), step):
+            piece = data[pos:pos + step]
+            if self.rate:
+                # Token bucket: idle time does not build up a burst allowance
+                now = loop.time()
+                due = max(self.tx_due, now)
+                if due > now:
+                    await asyncio.sleep(due - now)
+                self.tx_due = due + len(piece) / self.rate
+            self.connection.write(piece)
+            if self.capture:
+                self.capture.record(TX, piece)
+            self.tx_bytes += len(piece)
+            await self.connection.drain()
+            
+    async def run_raw(self):
+        """Relay raw bytes between the port and stdin/stdout without decoding or printing"""
+        loop = asyncio.get_running_loop()
+        self.connection = AsyncSerial(self.serial_port, loop)
+        self.connection.on_error = self.receive_error
+        self.connection.start()
+        out = sys.stdout.fileno()
+        blocking = None
+        if not msvcrt:
+            # A slow stdout consumer must not stall the loop, which also relays stdin to the port
+            blocking = os.get_blocking(out)
+            os.set_blocking(out, False)
+        receiver = asyncio.ensure_future(self.relay_port(out))
+        reporter = asyncio.ensure_future(self.report_stats()) if self.stats else None
+        # Bounded, so a fast stdin waits for a slow port instead of buffering everything
+        chunks = asyncio.Queue(maxsize=16)
+        threading.Thread(target=self.read_stdin_raw, args=(loop, chunks), daemon=True).start()
+        
+        try:
+            while True:
+                next_chunk = asyncio.ensure_future(chunks.get())
+                done, _ = await asyncio.wait({next_chunk, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if next_chunk not in done:
+                    next_chunk.cancel()
+                    break  # The connection ended
+                data = next_chunk.result()
+                if data is None:
+                    break
+                await self.send_raw(data)
+                
+            # Stdin closed: finish sending, then relay replies until the port goes quiet
+            while self.connection.pending() and not receiver.done():
+                await asyncio.sleep(0.01)
+            self.last_rx = max(self.last_rx, loop.time())
+            while not receiver.done():
+                idle = loop.time() - self.last_rx
+                if idle >= self.eof_wait:
+                    break
+                await asyncio.wait({receiver}, timeout=self.eof_wait - idle)
+            if receiver.done() and not receiver.cancelled():
+                receiver.result()  # Re-raise a stdout failure such as BrokenPipeError
+        finally:
+            receiver.cancel()
+            if reporter:
+                reporter.cancel()
+            self.connection.close()
+            if blocking is not None:
+                os.set_blocking(out, blocking)
+            
+    def run(self):
+        """Run the main loop"""
+        if not self.connect():
+            return
+            
+        if self.capture_args:
+            try:
+                self.capture = CaptureWriter(**self.capture_args)
+                self.capture.on_error = lambda e: self.info(f"Capture stopped by a write error: {e}")
+                self.info(f"Capturing to {self.capture.files[0]}")
+            except OSError as e:
+                self.info(f"Failed to start capture: {e}")
+                self.disconnect()
+                return
+                
+        self.running = True
+        start = time.monotonic()
+        try:
+            asyncio.run(self.run_raw() if self.raw else self.run_async())
         except KeyboardInterrupt:
-            print("\nInterrupted by user")
+            self.info("\nInterrupted by user")
+        except BrokenPipeError:
+            pass  # Reader of our stdout went away (e.g. | head)
+        except ConnectionError:
+            pass
         finally:
             self.running = False
             self.disconnect()
+            if self.raw:
+                elapsed = time.monotonic() - start
+                self.info(f"Sent {self.tx_bytes} bytes, received {self.rx_bytes} bytes in {elapsed:.2f} s")
+            if self.decoder:
+                self.info(self.decoder.counters())
+            if self.stats:
+                self.info(f"Stats: {self.stats.summary()}")
+            if self.capture:
+                self.capture.close()
+                self.info(self.capture.status())
+
+class PortStream:
+    """Per-port state of a MultiPortMonitor"""
+    def __init__(self, name, serial_port, binary=None):
+        self.name = name
+        self.serial_port = serial_port
+        self.connection = None
+        self.pump = None
+        self.partial = bytearray()  # Incomplete line carried over to the next chunk
+        self.decoder = FrameDecoder(binary) if binary else None
+        self.capture = None
+        self.bytes = 0
+        self.lines = 0
+        self.last_time = 0  # Arrival time of the latest chunk
+        self.dropped = 0  # Output lines dropped because the console could not keep up
+        self.error = None
+        self.stats = None  # StreamStats with --stats
+
+class MultiPortMonitor:
+    """
+    Monitor several serial ports from one event loop.
+    
+    Every port is an AsyncSerial on the same loop, so reading is multiplexed
+    without a thread per port. Received data is split into lines (or binary
+    frames) and printed as one merged stream, each line tagged with its port
+    and a monotonic timestamp taken when its bytes arrived. Ordering across
+    devices is therefore preserved. Console output goes through a bounded
+    queue drained by a writer thread, so a slow terminal never stalls the
+    ports; lines that do not fit are counted as drops.
+    """
+    def __init__(self, ports, baudrate=9600, bytesize=8, parity='N', stopbits=1, binary=None,
+                 capture=None, max_line=4096, max_queued=100000, stats=False):
+        self.ports = ports
+        self.baudrate = baudrate
+        self.bytesize = bytesize
+        self.parity = parity
+        self.stopbits = stopbits
+        self.binary = binary
+        self.capture_args = capture  # One capture per port, named after the port
+        self.max_line = max_line
+        self.streams = []
+        self.output = queue.Queue(maxsize=max_queued)
+        self.start_ns = 0
+        self.width = 0  # Port tag width for aligned output
+        self.stats = stats
+        
+    def connect(self):
+        """Open every port; ports that fail are reported and skipped"""
+        for port in self.ports:
+            try:
+                serial_port = open_serial(port, self.baudrate, self.bytesize, self.parity, self.stopbits)
+            except Exception as e:
+                print(f"Failed to connect to {port}: {e}")
+                continue
+            stream = PortStream(port, serial_port, self.binary)
+            if self.stats:
+                stream.stats = StreamStats(queue_unit="lines")
+            if self.capture_args:
+                stem, suffix = os.path.splitext(self.capture_args['path'])
+                tag = "".join(c if c.isalnum() else "_" for c in port).strip("_")
+                try:
+                    stream.capture = CaptureWriter(**dict(self.capture_args, path=f"{stem}-{tag}{suffix}"))
+                    stream.capture.on_error = lambda e, port=port: print(f"Capture for {port} stopped by a write error: {e}")
+                except OSError as e:
+                    print(f"Failed to start capture for {port}: {e}")
+            self.streams.append(stream)
+            print(f"Connected to {port} at {self.baudrate} baud")
+        self.width = max((len(stream.name) for stream in self.streams), default=0)
+        return bool(self.streams)
+        
+    def disconnect(self):
+        for stream in self.streams:
+            if stream.serial_port.is_open:
+                stream.serial_port.close()
+            if stream.capture:
+                stream.capture.close()
+        print("Disconnected")
+        
+    def emit(self, timestamp, stream, text, measured=True):
+        try:
+            # The writer thread uses the stream and arrival time for --stats latency
+            self.output.put_nowait((stream if measured else None, timestamp, f"{timestamp / 1e9:12.6f} [{stream.name:<{self.width}}] {text}\n"))
+            stream.lines += 1
+        except queue.Full:
+            stream.dropped += 1
+            
+    def receive_data(self, stream, data):
+        """Split one port's chunk into tagged lines (event loop thread)"""
+        timestamp = time.monotonic_ns() - self.start_ns
+        stream.bytes += len(data)
+        stream.last_time = timestamp
+        if stream.capture:
+            stream.capture.record(RX, data, timestamp + self.start_ns)
+        if stream.stats:
+            stream.stats.on_chunk(len(data))
+        if stream.decoder:
+            stream.decoder.feed(data, timestamp)
+            samples = stream.decoder.samples
+            while samples:
+                frame_time, key, values = samples.popleft()
+                self.emit(frame_time, stream, f"{key}: {', '.join(f'{v:g}' for v in values)}")
+            return
+        buf = stream.partial
+        buf += data
+        pos = 0
+        end = buf.find(b'\n')
+        while end != -1:
+            self.emit(timestamp, stream, buf[pos:end].decode('utf-8', errors='replace').rstrip('\r'))
+            pos = end + 1
+            end = buf.find(b'\n', pos)
+        if pos:
+            del buf[:pos]
+        while len(buf) >= self.max_line:
+            # Overlong line: print it in pieces rather than buffering forever
+            self.emit(timestamp, stream, buf[:self.max_line].decode('utf-8', errors='replace'))
+            del buf[:self.max_line]
+            
+    def receive_error(self, stream, e):
+        stream.error = e
+        self.emit(time.monotonic_ns() - self.start_ns, stream, f"Receive error: {e}")
+        
+    def write_output(self):
+        """Writer thread: print queued lines in batches"""
+        while True:
+            lines = [self.output.get()]
+            try:
+                while len(lines) < 1000:
+                    lines.append(self.output.get_nowait())
+            except queue.Empty:
+                pass
+            stop = None in lines
+            if stop:
+                lines.remove(None)
+            sys.stdout.write("".join(line[2] for line in lines))
+            sys.stdout.flush()
+            if self.stats:
+                now = time.monotonic_ns() - self.start_ns
+                for stream, timestamp, _ in lines:
+                    if stream:
+                        stream.stats.on_consumed(timestamp, now)
+            if stop:
+                return
+                
+    async def report_stats(self):
+        """Print one statistics line per port every second (--stats)"""
+        while True:
+            await asyncio.sleep(1.0)
+            depth = self.output.qsize()
+            for stream in self.streams:
+                stream.stats.on_queue(depth)
+                self.emit(time.monotonic_ns() - self.start_ns, stream, f"[stats] {stream.stats.report()}", False)
+                
+    def read_stdin(self, loop, quit_event):
+        try:
+            while True:
+                if input().strip().lower() == "!quit":
+                    break
+        except (EOFError, OSError):
+            return  # No keyboard (e.g. redirected stdin): run until Ctrl+C
+        loop.call_soon_threadsafe(quit_event.set)
+        
+    async def run_async(self):
+        loop = asyncio.get_running_loop()
+        for stream in self.streams:
+            stream.connection = AsyncSerial(stream.serial_port, loop)
+            stream.connection.on_error = lambda e, stream=stream: self.receive_error(stream, e)
+            stream.connection.start()
+            stream.pump = asyncio.ensure_future(
+                stream.connection.pump(lambda data, stream=stream: self.receive_data(stream, data))
+            )
+        quit_event = asyncio.Event()
+        threading.Thread(target=self.read_stdin, args=(loop, quit_event), daemon=True).start()
+        quit_wait = asyncio.ensure_future(quit_event.wait())
+        reporter = asyncio.ensure_future(self.report_stats()) if self.stats else None
+        try:
+            # Run until !quit or until every port has gone away
+            pumps = {stream.pump for stream in self.streams}
+            while pumps:
+                done, pumps = await asyncio.wait(pumps | {quit_wait}, return_when=asyncio.FIRST_COMPLETED)
+                if quit_wait in done:
+                    break
+                pumps.discard(quit_wait)
+        finally:
+            quit_wait.cancel()
+            if reporter:
+                reporter.cancel()
+            for stream in self.streams:
+                stream.connection.close()
+                
+    def print_summary(self, elapsed):
+        print(f"{'Port':<{max(self.width, 4)}}  {'RX bytes':>10}  {'Bytes/s':>10}  {'Lines':>8}  {'Dropped':>8}")
+        for stream in self.streams:
+            rate = stream.bytes / elapsed if elapsed > 0 else 0.0
+            line = (f"{stream.name:<{max(self.width, 4)}}  {stream.bytes:>10}  {rate:>10.0f}  "
+                    f"{stream.lines:>8}  {stream.dropped:>8}")
+            if stream.decoder:
+                line += f"  ({stream.decoder.counters()})"
+            if stream.error:
+                line += f"  (error: {stream.error})"
+            if stream.capture:
+                line += f"  ({stream.capture.status()})"
+            print(line)
+            if stream.stats:
+                print(f"  {stream.stats.summary()}")
+            
+    def run(self):
+        if not self.connect():
+            return
+        print(f"Monitoring {len(self.streams)} ports. Type !quit or press Ctrl+C to exit.")
+        print("-" * 40)
+        writer = threading.Thread(target=self.write_output, daemon=True)
+        writer.start()
+        self.start_ns = time.monotonic_ns()
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            elapsed = (time.monotonic_ns() - self.start_ns) / 1e9
+            # Flush partial lines, then let the writer finish
+            for stream in self.streams:
+                if stream.partial:
+                    self.emit(stream.last_time, stream, stream.partial.decode('utf-8', errors='replace'), False)
+            self.output.put(None)
+            writer.join(5.0)
+            print("-" * 40)
+            self.disconnect()
+            self.print_summary(elapsed)
+
+class SweepCLI:
+    """
+    Unattended PID sweep (--sweep): evaluates every candidate parameter set
+    on the device, or on the simulated car when port is None, prints each
+    result as it completes and the ranked table at the end.
+    """
+    
+    # Records the scored wheel speeds and the fall detection angle arrive in
+    RECORDS = {"SPEED": ["left", "right"], "ANGLE": ["angle", "gyro"]}
+    
+    def __init__(self, port, ranges, baudrate=9600, bytesize=8, parity='N', stopbits=1, binary=None,
+                 count=0, steps=3, settle=2.0, window=5.0, output=None, seed=None):
+        self.port = port  # None runs against the simulated car
+        self.ranges = ranges
+        self.baudrate = baudrate
+        self.bytesize = bytesize
+        self.parity = parity
+        self.stopbits = stopbits
+        self.binary = binary
+        self.count = count  # Random candidates; 0 = full grid
+        self.steps = steps
+        self.settle = settle
+        self.window = window
+        self.output = output
+        self.seed = seed
+        self.sweep = None
+        
+    def build(self, base):
+        if self.count:
+            candidates = random_candidates(base, self.ranges, self.count, self.seed)
+        else:
+            candidates = grid_candidates(base, self.ranges, self.steps)
+        self.sweep = PidSweep(candidates, base, self.RECORDS, settle=self.settle, window=self.window)
+        mode = "random" if self.count else "grid"
+        print(f"Sweeping {len(self.sweep.candidates)} {mode} parameter sets "
+              f"({self.settle:g} s settle + {self.window:g} s window each)")
+        
+    def print_result(self, result):
+        print(f"[{result.index}/{len(self.sweep.candidates)}] {result.describe()}")
+        
+    async def run_simulated(self):
+        self.build(DEFAULT_GAINS)
+        await self.sweep.run(PlantTarget(), self.print_result)
+        
+    async def run_device(self, serial_port):
+        target = None
+        
+        def receive_data(data):
+            if commands.outstanding:
+                commands.feed(data)
+            if target:
+                target.feed(data, time.monotonic_ns())
+                
+        connection = await open_connection(serial_port, receive_data)
+        try:
+            commands = CommandEngine(connection.write)
+            # The device's own parameters are the base of the sweep and are restored afterwards
+            base = parse_pid_reply(await commands.request("GET_PID", ("PID:",)))
+            self.build(base)
+            target = DeviceTarget(commands, list(self.RECORDS), self.binary)
+            await self.sweep.run(target, self.print_result)
+            print(commands.summary())
+        finally:
+            connection.close()
+            
+    def run(self):
+        serial_port = None
+        start = time.monotonic()
+        try:
+            if self.port is None:
+                print("Simulated balance car")
+                asyncio.run(self.run_simulated())
+            else:
+                serial_port = open_serial(self.port, self.baudrate, self.bytesize, self.parity, self.stopbits)
+                print(f"Connected to {self.port} at {self.baudrate} baud")
+                asyncio.run(self.run_device(serial_port))
+        except KeyboardInterrupt:
+            print("\nInterrupted by user")
+        except (TimeoutError, ValueError) as e:
+            print(f"Sweep failed: {e}")
+        except Exception as e:
+            print(f"Sweep error: {e}")
+        finally:
+            if serial_port and serial_port.is_open:
+                serial_port.close()
+        if not self.sweep or not self.sweep.results:
+            return
+        results = self.sweep.ranked()
+        print(f"{len(results)} sets evaluated in {time.monotonic() - start:.1f} s, "
+              f"{sum(result.ok for result in results)} without failure. Best first:")
+        for line in format_table(results, limit=20):
+            print(line)
+        if self.output:
+            try:
+                self.sweep.save(self.output)
+                print(f"Results saved to {self.output}")
+            except OSError as e:
+                print(f"Failed to save results: {e}")
+
+def expand_ports(patterns):
+    """Expand glob patterns (e.g. /dev/ttyUSB*) against the filesystem and detected ports"""
+    ports = []
+    detected = [port.device for port in serial.tools.list_ports.comports()]
+    for pattern in patterns:
+        if not any(c in pattern for c in "*?["):
+            matches = [pattern]
+        else:
+            matches = sorted(set(glob.glob(pattern)) | set(fnmatch.filter(detected, pattern)))
+            if not matches:
+                print(f"Warning: no ports match {pattern}")
+        for port in matches:
+            if port not in ports:
+                ports.append(port)
+    return ports
 
 def list_ports():
     """List all available serial ports"""
@@ -145,15 +739,68 @@ def list_ports():
     for port in ports:
         print(f"  {port.device}: {port.description}")
 
+def detect_port(ports=None, handshake=None, expect=None, binary=None, out=sys.stdout):
+    """Probe ports (None = every detected port) and return the best (port, baudrate), or None"""
+    discovery = PortDiscovery(handshake=handshake, expect=expect, binary=binary)
+    print("Probing ports...", file=out)
+    start = time.monotonic()
+    results = discovery.discover(ports, on_result=lambda result: print(f"  {result.describe()}", file=out))
+    best = discovery.best(results)
+    if not best:
+        print(f"No device found ({len(results)} ports probed in {time.monotonic() - start:.2f} s)", file=out)
+        return None
+    print(f"Detected {best.port} at {best.baudrate} baud in {time.monotonic() - start:.2f} s", file=out)
+    return best.port, best.baudrate
+
 def main():
     parser = argparse.ArgumentParser(description="Serial Port CLI Debugger")
-    parser.add_argument("-p", "--port", help="Serial port to connect to")
+    parser.add_argument("-p", "--port", action="append",
+                        help="Serial port to connect to; repeat or use a glob (e.g. '/dev/ttyUSB*') to monitor several ports")
     parser.add_argument("-b", "--baudrate", type=int, default=9600, help="Baudrate (default: 9600)")
     parser.add_argument("-d", "--databits", type=int, default=8, choices=[5, 6, 7, 8], help="Data bits (default: 8)")
     parser.add_argument("--parity", default="N", choices=["N", "E", "O", "M", "S"], 
                         help="Parity (N=None, E=Even, O=Odd, M=Mark, S=Space) (default: N)")
     parser.add_argument("--stopbits", type=float, default=1, choices=[1, 1.5, 2], help="Stop bits (default: 1)")
     parser.add_argument("-l", "--list", action="store_true", help="List available serial ports")
+    parser.add_argument("--auto", action="store_true",
+                        help="Probe all ports (or the -p ports) concurrently and connect to the device found, "
+                             "at the detected baud rate")
+    parser.add_argument("--handshake", metavar="COMMAND",
+                        help="With --auto, send this command at each baud rate (e.g. GET_PID)")
+    parser.add_argument("--expect", metavar="PREFIX",
+                        help="With --handshake, the reply prefix that identifies the device (e.g. PID:)")
+    parser.add_argument("--binary", choices=["cobs", "slip"],
+                        help="Decode binary telemetry frames with the given framing instead of printing raw data")
+    parser.add_argument("--capture", metavar="PATH",
+                        help="Capture all RX/TX traffic with timestamps to rotating binary files based on PATH")
+    parser.add_argument("--capture-max-mb", type=float, default=64,
+                        help="Start a new capture file after this many MB (default: 64)")
+    parser.add_argument("--capture-max-seconds", type=float,
+                        help="Start a new capture file after this many seconds")
+    parser.add_argument("--raw", action="store_true",
+                        help="Pipe mode: copy stdin to the port and the port to stdout as raw bytes")
+    parser.add_argument("--rate", type=float, metavar="BYTES_PER_S",
+                        help="With --raw, limit stdin -> port to this many bytes per second")
+    parser.add_argument("--eof-wait", type=float, default=1.0, metavar="SECONDS",
+                        help="With --raw, keep copying port -> stdout after stdin EOF until the port "
+                             "has been idle this long (default: 1)")
+    parser.add_argument("--stats", action="store_true",
+                        help="Print throughput, queue depth and latency percentiles every second")
+    parser.add_argument("--sweep", metavar="RANGES",
+                        help="Evaluate PID parameter sets instead of opening a terminal, e.g. 'ap=10:40:4;ad=0.5:2:4' "
+                             "(parameters left out keep the device's values)")
+    parser.add_argument("--sweep-random", type=int, default=0, metavar="N",
+                        help="With --sweep, evaluate N random sets from the ranges instead of the full grid")
+    parser.add_argument("--sweep-steps", type=int, default=3,
+                        help="With --sweep, grid values per range without an explicit count (default: 3)")
+    parser.add_argument("--settle", type=float, default=2.0, metavar="SECONDS",
+                        help="With --sweep, wait this long after SET_PID before recording (default: 2)")
+    parser.add_argument("--window", type=float, default=5.0, metavar="SECONDS",
+                        help="With --sweep, record and score this much telemetry per set (default: 5)")
+    parser.add_argument("--sweep-output", metavar="PATH", help="With --sweep, save the ranked results as CSV")
+    parser.add_argument("--simulate", action="store_true",
+                        help="With --sweep, run against the simulated balance car instead of a port")
+    parser.add_argument("--seed", type=int, help="With --sweep-random, seed for reproducible sets")
     
     args = parser.parse_args()
     
@@ -162,19 +809,89 @@ def main():
         list_ports()
         return
     
+    sweep_ranges = None
+    if args.sweep:
+        try:
+            sweep_ranges = parse_ranges(args.sweep)
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.simulate:
+        parser.error("--simulate needs --sweep")
+    
+    if args.simulate:
+        SweepCLI(None, sweep_ranges, count=args.sweep_random, steps=args.sweep_steps, settle=args.settle,
+                 window=args.window, output=args.sweep_output, seed=args.seed).run()
+        return
+    
     # Check if port is specified
-    if not args.port:
+    if not args.port and not args.auto:
         print("Error: No serial port specified")
-        print("Use -l to list available ports or -p to specify a port")
+        print("Use -l to list available ports, -p to specify a port or --auto to detect one")
+        return
+    
+    if args.handshake and not args.expect:
+        parser.error("--handshake needs --expect")
+    
+    ports = expand_ports(args.port) if args.port else None
+    if ports == []:
+        return
+    
+    if args.auto:
+        # Status goes to stderr in raw mode, where stdout carries the data
+        detected = detect_port(ports, args.handshake, args.expect, args.binary,
+                               out=sys.stderr if args.raw else sys.stdout)
+        if not detected:
+            return
+        ports = [detected[0]]
+        args.baudrate = detected[1]
+    
+    if args.raw and (len(ports) > 1 or args.binary):
+        parser.error("--raw works with a single port and without --binary")
+    
+    if sweep_ranges:
+        if len(ports) > 1 or args.raw:
+            parser.error("--sweep works with a single port and without --raw")
+        SweepCLI(ports[0], sweep_ranges, baudrate=args.baudrate, bytesize=args.databits, parity=args.parity,
+                 stopbits=args.stopbits, binary=args.binary, count=args.sweep_random, steps=args.sweep_steps,
+                 settle=args.settle, window=args.window, output=args.sweep_output, seed=args.seed).run()
+        return
+    
+    capture = None
+    if args.capture:
+        capture = {
+            'path': args.capture,
+            'max_bytes': int(args.capture_max_mb * 1024 * 1024),
+            'max_seconds': args.capture_max_seconds
+        }
+    
+    # Several ports: merged, timestamped monitoring
+    if len(ports) > 1:
+        monitor = MultiPortMonitor(
+            ports,
+            baudrate=args.baudrate,
+            bytesize=args.databits,
+            parity=args.parity,
+            stopbits=args.stopbits,
+            binary=args.binary,
+            capture=capture,
+            stats=args.stats
+        )
+        monitor.run()
         return
     
     # Create and run the CLI debugger
     cli = SerialCLI(
-        port=args.port,
+        port=ports[0],
         baudrate=args.baudrate,
         bytesize=args.databits,
         parity=args.parity,
-        stopbits=args.stopbits
+        stopbits=args.stopbits,
+        binary=args.binary,
+        capture=capture,
+        raw=args.raw,
+        rate=args.rate,
+        eof_wait=args.eof_wait,
+        stats=args.stats
     )
     cli.run()
 
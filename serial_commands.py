@@ -0,0 +1,152 @@
+import asyncio
+import time
+from collections import deque
+
+from serial_telemetry import LineFramer
+
+# Order of the nine values in SET_PID commands and PID: replies
+PID_FIELDS = [(control, param) for control in ("angle", "speed", "turn") for param in ("p", "i", "d")]
+# Short names used by compact "PID ap=1.5 sd=0.2" live updates
+PID_CODES = {(control, param): control[0] + param for control, param in PID_FIELDS}
+PID_FIELDS_BY_CODE = {code: field for field, code in PID_CODES.items()}
+
+
+class CommandError(Exception):
+    """The device answered a command with an error line"""
+
+
+class Command:
+    """One request in flight: the line sent and the reply prefixes it waits for"""
+
+    def __init__(self, text, expect, errors):
+        self.text = text
+        self.name = text.split(None, 1)[0] if text.strip() else text
+        self.data = (text.rstrip("\n") + "\n").encode('utf-8')
+        self.expect = tuple(prefix.encode('ascii') for prefix in expect)
+        self.errors = tuple(prefix.encode('ascii') for prefix in errors)
+        self.future = None
+        self.attempts = 0
+
+
+class CommandEngine(LineFramer):
+    """
+    Request/response layer for device commands such as GET_PID and SET_PID.
+
+    request() writes a command line and waits for the reply line that starts
+    with one of its expected prefixes (or an error prefix), with a timeout
+    and a number of retries. Up to max_outstanding commands may be in flight
+    at once; replies are matched to the oldest outstanding command that
+    expects them, so several commands can be pipelined without waiting for
+    each round trip.
+
+    Everything runs on the event loop thread: the receive path passes its
+    chunks to feed() while commands are outstanding (the outstanding deque
+    is non-empty), so the engine costs nothing while idle and never blocks
+    the UI. write is a callable that queues bytes on the connection. Round
+    trip times are kept per command name and reported through on_result.
+    """
+
+    def __init__(self, write, max_outstanding=4, max_line=4096):
+        super().__init__(max_line)
+        self.write = write
+        self.max_outstanding = max_outstanding
+        self.window = None  # Semaphore, created on the loop on first use
+        self.outstanding = deque()  # Sent commands awaiting replies, oldest first
+        self.round_trips = {}  # Command name -> list of round trip times in seconds
+        self.timeouts = 0
+        self.on_result = None  # Called with a log message after every command
+
+    async def request(self, text, expect, errors=("ERR",), timeout=1.0, retries=2):
+        """
+        Send text and return the reply line (str). Raises CommandError for an
+        error reply and TimeoutError when no reply came after all retries.
+        """
+        if self.window is None:
+            self.window = asyncio.Semaphore(self.max_outstanding)
+        command = Command(text, expect, errors)
+        loop = asyncio.get_running_loop()
+        async with self.window:
+            for attempt in range(retries + 1):
+                command.attempts = attempt + 1
+                command.future = loop.create_future()
+                if not self.outstanding:
+                    self.reset()  # Start line framing afresh; earlier data is not a reply
+                self.outstanding.append(command)
+                sent = time.perf_counter()
+                try:
+                    self.write(command.data)
+                    reply = await asyncio.wait_for(command.future, timeout)
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    continue
+                except CommandError as e:
+                    self.report(f"{command.name}: error reply '{e}' after {(time.perf_counter() - sent) * 1000:.1f} ms")
+                    raise
+                finally:
+                    if command in self.outstanding:
+                        self.outstanding.remove(command)
+                rtt = time.perf_counter() - sent
+                self.round_trips.setdefault(command.name, []).append(rtt)
+                self.report(f"{command.name}: reply in {rtt * 1000:.1f} ms"
+                            + (f" (attempt {command.attempts})" if command.attempts > 1 else ""))
+                return reply
+        self.report(f"{command.name}: no reply after {retries + 1} attempts of {timeout:g} s")
+        raise TimeoutError(f"No reply to {command.name}")
+
+    def handle_line(self, buf, start, end):
+        # Strip the '\r' of CRLF line endings
+        if end > start and buf[end - 1] == 0x0D:
+            end -= 1
+        for command in self.outstanding:
+            if buf.startswith(command.expect, start, end):
+                error = False
+            elif buf.startswith(command.errors, start, end):
+                error = True
+            else:
+                continue
+            self.outstanding.remove(command)
+            line = buf[start:end].decode('utf-8', errors='replace')
+            if not command.future.done():
+                if error:
+                    command.future.set_exception(CommandError(line))
+                else:
+                    command.future.set_result(line)
+            return
+
+    def report(self, message):
+        if self.on_result:
+            self.on_result(message)
+
+    def summary(self):
+        """Round trip statistics per command name"""
+        parts = []
+        for name, rtts in self.round_trips.items():
+            parts.append(f"{name}: {len(rtts)} x, avg {sum(rtts) / len(rtts) * 1000:.1f} ms, "
+                         f"max {max(rtts) * 1000:.1f} ms")
+        if self.timeouts:
+            parts.append(f"{self.timeouts} timeouts")
+        return " | ".join(parts) or "No commands completed"
+
+
+def format_set_pid(values):
+    """SET_PID command for a {(control, param): value} mapping"""
+    return "SET_PID " + " ".join(f"{values[field]}" for field in PID_FIELDS)
+
+
+def format_pid_update(values):
+    """Compact live update carrying only the given fields, e.g. PID ap=1.5 sd=0.2"""
+    return "PID " + " ".join(f"{PID_CODES[field]}={value:g}" for field, value in values.items())
+
+
+def parse_pid_reply(line):
+    """
+    Parse a GET_PID reply, "PID:ap,ai,ad,sp,si,sd,tp,ti,td" (spaces are
+    accepted too), into a {(control, param): value} mapping; raises ValueError
+    """
+    key, sep, rest = line.partition(":")
+    if not sep or key.strip() != "PID":
+        raise ValueError(f"Not a PID reply: '{line}'")
+    values = [float(value) for value in rest.replace(",", " ").split()]
+    if len(values) != len(PID_FIELDS):
+        raise ValueError(f"Expected {len(PID_FIELDS)} PID values, got {len(values)}")
+    return dict(zip(PID_FIELDS, values))
@@ -2,9 +2,29 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
 import serial
 import serial.tools.list_ports
-import threading
 import time
 import math
+import threading
+import asyncio
+from collections import deque
+
+from serial_reader import ChunkBuffer
+from serial_async import AsyncBridge, open_connection
+from serial_textview import BoundedTextView
+from serial_telemetry import RecordFramer, ChannelRegistry
+from serial_plot import TelemetryGraph
+from serial_protocol import FrameDecoder
+from serial_capture import CaptureWriter, RX, TX
+from serial_hexview import HexViewer
+from serial_stats import StreamStats
+from serial_discovery import PortDiscovery
+from serial_filter import TriggerFilter, parse_rules
+from serial_analysis import RollingStats, StepAnalyzer
+from serial_export import TelemetryExporter
+from serial_writer import WriteQueue, COMMAND, BULK, WRITE_TIMEOUT, block_size
+from serial_sweep import PidSweep, PlantTarget, DeviceTarget, parse_ranges, grid_candidates, random_candidates
+from serial_commands import (CommandEngine, CommandError, PID_FIELDS, PID_CODES, format_set_pid, format_pid_update,
+                             parse_pid_reply)
 
 class SerialDebugger:
     def __init__(self, root):
@@ -14,8 +34,27 @@ class SerialDebugger:
         
         self.serial_port = None
         self.is_open = False
-        self.receive_thread = None
-        self.running = False
+        self.bridge = AsyncBridge()  # Event loop thread that performs all serial I/O
+        self.connection = None  # AsyncSerial while connected
+        self.init_receive_state()
+        self.tx = None  # WriteQueue (writer task on the I/O thread) while connected
+        
+        # Port auto-detection: probes all ports for the car (GET_PID handshake),
+        # remembering where it was found by USB serial number
+        self.discovery = PortDiscovery(handshake="GET_PID", expect="PID:")
+        self.detecting = False
+        
+        self.ui_rate_var = tk.IntVar(value=30)  # UI refresh rate in Hz
+        
+        # Trigger/filter stage: while enabled only matching lines (with context) reach the view
+        self.trigger_enabled_var = tk.BooleanVar(value=False)
+        self.trigger_spec_var = tk.StringVar(value="ERR;highlight:WARN")
+        self.trigger_before_var = tk.IntVar(value=2)
+        self.trigger_after_var = tk.IntVar(value=2)
+        
+        # Scrollback limit of the receive view (older data stays browsable from disk)
+        self.scrollback_var = tk.IntVar(value=5000)
+        self.scrollback_unit_var = tk.StringVar(value="Lines")
         
         # PID parameters
         self.pid_params = {
@@ -24,15 +63,58 @@ class SerialDebugger:
             'turn': {'p': tk.DoubleVar(value=0.0), 'i': tk.DoubleVar(value=0.0), 'd': tk.DoubleVar(value=0.0)}
         }
         
+        # Live tuning: slider changes are streamed to the device, merged and rate limited
+        self.live_tuning_var = tk.BooleanVar(value=False)
+        self.live_rate_var = tk.IntVar(value=20)  # Maximum updates per second
+        self.live_sent = {}  # (control, param) -> value the device last received
+        self.live_pending = None  # after() id of the scheduled update
+        self.live_last_send = 0.0
+        self.live_updates = 0
+        
+        # Response analysis of one telemetry channel: rolling statistics and step metrics,
+        # tagged with the PID parameters the device had at the time
+        self.analysis_channel_var = tk.StringVar(value="angle")
+        self.analysis_setpoint_var = tk.StringVar(value="0")  # Number or setpoint channel name
+        self.analysis_window_var = tk.IntVar(value=1000)  # Samples
+        # Smallest setpoint change counted as a step, in the signal's units; well above
+        # the noise of a setpoint channel, which would otherwise start a step per sample
+        self.analysis_min_step_var = tk.StringVar(value="1")
+        self.rolling = RollingStats(self.analysis_window_var.get())
+        self.steps = StepAnalyzer(threshold=1.0)
+        self.analysis_source = None  # (record key, value index) of the analysed channel
+        self.setpoint_source = None  # (record key, value index) when the setpoint is a channel
+        self.setpoint_value = 0.0
+        
+        # PID sweep: batch evaluation of parameter sets on the device or the simulated car
+        self.sweep_ranges_var = tk.StringVar(value="ap=10:40:4;ad=0.5:2:4;sp=2;si=0.5")
+        self.sweep_random_var = tk.IntVar(value=0)  # Random sets; 0 = full grid
+        self.sweep_settle_var = tk.DoubleVar(value=2.0)
+        self.sweep_window_var = tk.DoubleVar(value=5.0)
+        self.sweep_simulate_var = tk.BooleanVar(value=False)
+        self.sweep = None  # PidSweep of the last run
+        self.sweeping = False
+        self.sweep_rows = {}  # Table row id -> SweepResult
+        self.sweep_sort = None  # (column, descending) the table was last sorted by
+        
         # Speed monitoring variables
-        self.speed_data = []  # Store speed data
         self.max_data_points = 100  # Maximum points to display
-        self.speed_monitoring = False  # Whether speed monitoring is active
+        # Telemetry channels, filled from KEY:v1,v2,... records
+        self.channels = ChannelRegistry(capacity=self.max_data_points)
+        self.channel_spec_var = tk.StringVar(value=ChannelRegistry.DEFAULT_SPEC)
         self.speed_pause = False  # Whether graph is paused
         self.last_speed_time = 0  # Last time speed data was received
         
+        # Telemetry records are framed on the I/O thread and queued for the UI
+        self.telemetry_samples = deque(maxlen=100000)
+        self.telemetry_framer = RecordFramer(self.channels.keys(), self.telemetry_samples)
+        self.telemetry_format_var = tk.StringVar(value="ASCII")
+        self.telemetry_decoder = self.telemetry_framer  # RecordFramer or binary FrameDecoder
+        
         self.create_widgets()
+        self.apply_analysis()
         self.update_port_list()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(self.get_ui_interval(), self.ui_tick)
         
     def create_widgets(self):
         # Main frame
@@ -42,7 +124,7 @@ class SerialDebugger:
         self.root.rowconfigure(0, weight=1)
         
         # Notebook for tabs
-        notebook = ttk.Notebook(main_frame)
+        self.notebook = notebook = ttk.Notebook(main_frame)
         notebook.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         main_frame.columnconfigure(0, weight=1)
         main_frame.rowconfigure(0, weight=1)
@@ -69,6 +151,10 @@ class SerialDebugger:
         self.refresh_btn = ttk.Button(config_frame, text="Refresh", command=self.update_port_list)
         self.refresh_btn.grid(row=0, column=2, padx=(0, 10))
         
+        # Auto-detect button
+        self.detect_btn = ttk.Button(config_frame, text="Auto Detect", command=self.auto_detect)
+        self.detect_btn.grid(row=0, column=5, padx=(0, 10), sticky=tk.W)
+        
         # Baudrate selection
         ttk.Label(config_frame, text="Baudrate:").grid(row=0, column=3, sticky=tk.W)
         self.baudrate_var = tk.StringVar(value="9600")
@@ -127,7 +213,8 @@ class SerialDebugger:
         
         # Receive text area
         self.receive_text = scrolledtext.ScrolledText(receive_frame, height=15)
-        self.receive_text.grid(row=0, column=0, columnspan=4, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
+        self.receive_text.grid(row=0, column=0, columnspan=6, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
+        self.receive_view = BoundedTextView(self.receive_text, max_lines=self.scrollback_var.get())
         receive_frame.rowconfigure(0, weight=1)
         receive_frame.columnconfigure(0, weight=1)
         
@@ -149,6 +236,67 @@ class SerialDebugger:
         self.save_btn = ttk.Button(receive_frame, text="Save Log", command=self.save_log)
         self.save_btn.grid(row=1, column=3, sticky=tk.E, padx=(5, 0))
         
+        # Capture button
+        self.capture_btn = ttk.Button(receive_frame, text="Start Capture", command=self.toggle_capture)
+        self.capture_btn.grid(row=1, column=4, sticky=tk.E, padx=(5, 0))
+        
+        # Hex viewer for captures and other large files
+        self.hex_viewer_btn = ttk.Button(receive_frame, text="Hex Viewer", command=self.open_hex_viewer)
+        self.hex_viewer_btn.grid(row=1, column=5, sticky=tk.E, padx=(5, 0))
+        
+        # UI refresh rate and batching counter
+        ui_rate_frame = ttk.Frame(receive_frame)
+        ui_rate_frame.grid(row=2, column=0, columnspan=6, sticky=tk.W, pady=(5, 0))
+        ttk.Label(ui_rate_frame, text="UI Rate (Hz):").pack(side=tk.LEFT)
+        ui_rate_spin = ttk.Spinbox(ui_rate_frame, from_=1, to=120, textvariable=self.ui_rate_var, width=5)
+        ui_rate_spin.pack(side=tk.LEFT, padx=(5, 10))
+        self.merge_label = ttk.Label(ui_rate_frame, text="Last tick: 0 bytes / 0 chunks")
+        self.merge_label.pack(side=tk.LEFT)
+        
+        # Scrollback limit
+        ttk.Label(ui_rate_frame, text="Scrollback:").pack(side=tk.LEFT, padx=(20, 0))
+        scrollback_spin = ttk.Spinbox(ui_rate_frame, from_=100, to=10000000, increment=1000,
+                                      textvariable=self.scrollback_var, width=9)
+        scrollback_spin.pack(side=tk.LEFT, padx=(5, 5))
+        scrollback_unit_combo = ttk.Combobox(ui_rate_frame, textvariable=self.scrollback_unit_var,
+                                             width=6, state="readonly")
+        scrollback_unit_combo['values'] = ("Lines", "KB")
+        scrollback_unit_combo.pack(side=tk.LEFT)
+        self.scrollback_var.trace('w', self.update_scrollback_limit)
+        self.scrollback_unit_var.trace('w', self.update_scrollback_limit)
+        
+        # Trigger / filter rules
+        trigger_frame = ttk.Frame(receive_frame)
+        trigger_frame.grid(row=3, column=0, columnspan=6, sticky=(tk.W, tk.E), pady=(5, 0))
+        ttk.Checkbutton(trigger_frame, text="Filter:", variable=self.trigger_enabled_var,
+                        command=self.toggle_trigger).pack(side=tk.LEFT)
+        trigger_entry = ttk.Entry(trigger_frame, textvariable=self.trigger_spec_var)
+        trigger_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 10))
+        ttk.Label(trigger_frame, text="Context before:").pack(side=tk.LEFT)
+        ttk.Spinbox(trigger_frame, from_=0, to=1000, textvariable=self.trigger_before_var,
+                    width=4).pack(side=tk.LEFT, padx=(5, 5))
+        ttk.Label(trigger_frame, text="after:").pack(side=tk.LEFT)
+        ttk.Spinbox(trigger_frame, from_=0, to=1000, textvariable=self.trigger_after_var,
+                    width=4).pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Button(trigger_frame, text="Apply", command=self.apply_trigger).pack(side=tk.LEFT)
+        self.trigger_stats_label = ttk.Label(trigger_frame, text="")
+        self.trigger_stats_label.pack(side=tk.LEFT, padx=(10, 0))
+        self.receive_text.tag_configure("trigger", background="yellow")
+        
+        # Statistics panel
+        stats_frame = ttk.LabelFrame(serial_frame, text="Statistics", padding="10")
+        stats_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E))
+        stats_frame.columnconfigure(0, weight=1)
+        self.stats_label = ttk.Label(stats_frame, text="RX 0.0 KB/s | 0 chunks/s")
+        self.stats_label.grid(row=0, column=0, sticky=tk.W)
+        self.parse_stats_label = ttk.Label(stats_frame, text=self.telemetry_decoder.counters())
+        self.parse_stats_label.grid(row=1, column=0, sticky=tk.W)
+        self.tx_stats_label = ttk.Label(stats_frame, text="TX 0.0 KB/s")
+        self.tx_stats_label.grid(row=2, column=0, sticky=tk.W)
+        # Histogram of read -> display latency for the whole session
+        self.latency_canvas = tk.Canvas(stats_frame, bg="white", height=50)
+        self.latency_canvas.grid(row=0, column=1, rowspan=3, sticky=(tk.E, tk.N, tk.S), padx=(10, 0))
+        
         # PID Tuning Frame
         pid_control_frame = ttk.LabelFrame(pid_frame, text="PID Parameters", padding="10")
         pid_control_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(0, 10))
@@ -192,6 +340,82 @@ class SerialDebugger:
         self.reset_pid_btn = ttk.Button(pid_btn_frame, text="Reset Fields", command=self.reset_pid_params)
         self.reset_pid_btn.pack(side=tk.LEFT)
         
+        # Live tuning controls
+        live_frame = ttk.Frame(pid_control_frame)
+        live_frame.grid(row=5, column=0, columnspan=3, pady=(5, 0), sticky=tk.E)
+        live_check = ttk.Checkbutton(live_frame, text="Live Tuning", variable=self.live_tuning_var,
+                                     command=self.toggle_live_tuning)
+        live_check.pack(side=tk.LEFT)
+        ttk.Label(live_frame, text="Max Rate (Hz):").pack(side=tk.LEFT, padx=(10, 0))
+        live_rate_spin = ttk.Spinbox(live_frame, from_=1, to=100, textvariable=self.live_rate_var, width=5)
+        live_rate_spin.pack(side=tk.LEFT, padx=(5, 10))
+        self.live_status_label = ttk.Label(live_frame, text="Live updates: 0")
+        self.live_status_label.pack(side=tk.LEFT)
+        
+        # Response metrics of the analysed channel
+        analysis_frame = ttk.LabelFrame(pid_control_frame, text="Response Metrics", padding="5")
+        analysis_frame.grid(row=6, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(10, 0))
+        source_frame = ttk.Frame(analysis_frame)
+        source_frame.grid(row=0, column=0, sticky=tk.W)
+        ttk.Label(source_frame, text="Signal:").pack(side=tk.LEFT)
+        self.analysis_channel_combo = ttk.Combobox(source_frame, textvariable=self.analysis_channel_var, width=10)
+        self.analysis_channel_combo['values'] = list(self.channels.channels)
+        self.analysis_channel_combo.pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(source_frame, text="Setpoint:").pack(side=tk.LEFT)
+        ttk.Entry(source_frame, textvariable=self.analysis_setpoint_var, width=10).pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(source_frame, text="Min Step:").pack(side=tk.LEFT)
+        ttk.Entry(source_frame, textvariable=self.analysis_min_step_var, width=6).pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(source_frame, text="Window:").pack(side=tk.LEFT)
+        ttk.Spinbox(source_frame, from_=10, to=1000000, increment=100, textvariable=self.analysis_window_var,
+                    width=8).pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Button(source_frame, text="Apply", command=self.apply_analysis).pack(side=tk.LEFT)
+        self.rolling_label = ttk.Label(analysis_frame, text="No samples")
+        self.rolling_label.grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        self.step_label = ttk.Label(analysis_frame, text="No step detected yet", wraplength=600)
+        self.step_label.grid(row=2, column=0, sticky=tk.W, pady=(5, 0))
+        
+        # PID sweep
+        sweep_frame = ttk.LabelFrame(pid_control_frame, text="Parameter Sweep", padding="5")
+        sweep_frame.grid(row=7, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(10, 0))
+        sweep_frame.columnconfigure(0, weight=1)
+        sweep_config_frame = ttk.Frame(sweep_frame)
+        sweep_config_frame.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        ttk.Label(sweep_config_frame, text="Ranges:").pack(side=tk.LEFT)
+        ttk.Entry(sweep_config_frame, textvariable=self.sweep_ranges_var).pack(side=tk.LEFT, fill=tk.X, expand=True,
+                                                                               padx=(5, 10))
+        ttk.Label(sweep_config_frame, text="Random:").pack(side=tk.LEFT)
+        ttk.Spinbox(sweep_config_frame, from_=0, to=10000, textvariable=self.sweep_random_var,
+                    width=6).pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(sweep_config_frame, text="Settle (s):").pack(side=tk.LEFT)
+        ttk.Spinbox(sweep_config_frame, from_=0, to=60, increment=0.5, textvariable=self.sweep_settle_var,
+                    width=5).pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(sweep_config_frame, text="Window (s):").pack(side=tk.LEFT)
+        ttk.Spinbox(sweep_config_frame, from_=0.5, to=60, increment=0.5, textvariable=self.sweep_window_var,
+                    width=5).pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Checkbutton(sweep_config_frame, text="Simulate", variable=self.sweep_simulate_var).pack(side=tk.LEFT)
+        
+        sweep_btn_frame = ttk.Frame(sweep_frame)
+        sweep_btn_frame.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=(5, 0))
+        self.sweep_btn = ttk.Button(sweep_btn_frame, text="Run Sweep", command=self.toggle_sweep)
+        self.sweep_btn.pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(sweep_btn_frame, text="Use Selected", command=self.use_sweep_result).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(sweep_btn_frame, text="Save Results", command=self.save_sweep_results).pack(side=tk.LEFT, padx=(0, 10))
+        self.sweep_status_label = ttk.Label(sweep_btn_frame, text="No sweep run")
+        self.sweep_status_label.pack(side=tk.LEFT)
+        
+        # Results table, sorted by clicking a column heading
+        columns = ["run"] + [PID_CODES[field] for field in PID_FIELDS] + ["score", "status"]
+        self.sweep_table = ttk.Treeview(sweep_frame, columns=columns, show="headings", height=6)
+        for column in columns:
+            self.sweep_table.heading(column, text=column.capitalize() if len(column) > 2 else column,
+                                     command=lambda column=column: self.sort_sweep_table(column))
+            self.sweep_table.column(column, width=120 if column == "status" else 50, anchor=tk.E, stretch=False)
+        self.sweep_table.grid(row=2, column=0, sticky=(tk.W, tk.E), pady=(5, 0))
+        sweep_scroll = ttk.Scrollbar(sweep_frame, orient=tk.VERTICAL, command=self.sweep_table.yview)
+        sweep_scroll.grid(row=2, column=1, sticky=(tk.N, tk.S), pady=(5, 0))
+        self.sweep_table.configure(yscrollcommand=sweep_scroll.set)
+        self.sweep_table.bind("<Double-1>", lambda event: self.use_sweep_result())
+        
         # Speed Monitoring Frame
         speed_monitor_frame = ttk.LabelFrame(pid_frame, text="Speed Monitoring", padding="10")
         speed_monitor_frame.grid(row=0, column=1, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -202,6 +426,8 @@ class SerialDebugger:
         self.speed_canvas.grid(row=0, column=0, columnspan=4, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
         speed_monitor_frame.rowconfigure(0, weight=1)
         speed_monitor_frame.columnconfigure(0, weight=1)
+        self.speed_graph = TelemetryGraph(self.speed_canvas, self.channels)
+        self.speed_graph.on_frame = self.stats.on_redraw
         
         # Speed monitoring controls
         self.start_speed_btn = ttk.Button(speed_monitor_frame, text="Start Monitoring", command=self.start_speed_monitoring)
@@ -217,6 +443,25 @@ class SerialDebugger:
         self.speed_value_label = ttk.Label(speed_monitor_frame, text="Current Speed: 0.00")
         self.speed_value_label.grid(row=1, column=3, padx=(10, 0))
         
+        # Telemetry channel layout
+        channel_frame = ttk.Frame(speed_monitor_frame)
+        channel_frame.grid(row=2, column=0, columnspan=4, sticky=(tk.W, tk.E), pady=(5, 0))
+        ttk.Label(channel_frame, text="Format:").pack(side=tk.LEFT)
+        format_combo = ttk.Combobox(channel_frame, textvariable=self.telemetry_format_var, width=8, state="readonly")
+        format_combo['values'] = ("ASCII", "COBS", "SLIP")
+        format_combo.pack(side=tk.LEFT, padx=(5, 10))
+        format_combo.bind("<<ComboboxSelected>>", lambda event: self.set_telemetry_format())
+        ttk.Label(channel_frame, text="Channels:").pack(side=tk.LEFT)
+        channel_entry = ttk.Entry(channel_frame, textvariable=self.channel_spec_var)
+        channel_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 5))
+        ttk.Button(channel_frame, text="Apply", command=self.apply_channel_spec).pack(side=tk.LEFT)
+        self.export_btn = ttk.Button(channel_frame, text="Start Export", command=self.toggle_export)
+        self.export_btn.pack(side=tk.LEFT, padx=(5, 0))
+        
+        # Decoder counters
+        self.telemetry_stats_label = ttk.Label(speed_monitor_frame, text=self.telemetry_decoder.counters())
+        self.telemetry_stats_label.grid(row=3, column=0, columnspan=4, sticky=tk.W, pady=(5, 0))
+        
         # PID Communication Log
         pid_log_frame = ttk.LabelFrame(pid_frame, text="Communication Log", padding="10")
         pid_log_frame.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(10, 0))
@@ -224,6 +469,7 @@ class SerialDebugger:
         
         self.pid_log_text = scrolledtext.ScrolledText(pid_log_frame, height=8)
         self.pid_log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.pid_log_view = BoundedTextView(self.pid_log_text, max_lines=2000)
         pid_log_frame.rowconfigure(0, weight=1)
         pid_log_frame.columnconfigure(0, weight=1)
         
@@ -258,6 +504,81 @@ class SerialDebugger:
                 self.pid_value_labels[control_type][param].config(
                     text=f"{control_type.capitalize()} {param.upper()}: {value:.2f}"
                 )
+        if self.live_tuning_var.get():
+            self.schedule_live_update()
+                
+    def toggle_live_tuning(self):
+        """
+        Start or stop streaming slider changes to the device
+        """
+        if self.live_tuning_var.get():
+            self.live_sent = {}  # First update carries every parameter
+            self.pid_log_message("Live tuning on\n")
+            self.schedule_live_update()
+        else:
+            if self.live_pending is not None:
+                self.root.after_cancel(self.live_pending)
+                self.live_pending = None
+            self.pid_log_message(f"Live tuning off ({self.live_updates} updates sent)\n")
+            
+    def get_live_interval(self):
+        """
+        Seconds between live updates: the configured rate, and never more
+        than half of the link's transmit capacity for a full update
+        """
+        try:
+            rate = min(max(int(self.live_rate_var.get()), 1), 100)
+        except (tk.TclError, ValueError):
+            rate = 20
+        try:
+            bytes_per_second = int(self.baudrate_var.get()) / 10
+        except ValueError:
+            bytes_per_second = 960
+        full_update = len(format_pid_update({field: 100.0 for field in PID_FIELDS})) + 1
+        return max(1.0 / rate, 2 * full_update / bytes_per_second)
+        
+    def schedule_live_update(self):
+        """
+        Merge slider changes into one update at the next allowed time
+        """
+        if self.live_pending is not None:
+            return
+        delay = self.live_last_send + self.get_live_interval() - time.perf_counter()
+        self.live_pending = self.root.after(max(0, int(delay * 1000)), self.send_live_update)
+        
+    def send_live_update(self):
+        """
+        Send the parameters that changed since the last update. Values are
+        read now rather than when the slider moved, so nothing stale is sent,
+        and nothing is queued while earlier output is still being written.
+        """
+        self.live_pending = None
+        if not self.live_tuning_var.get() or not self.is_open or not self.tx:
+            return
+        if self.tx.pending(COMMAND):
+            # Link busy: try again one interval later with the newest values
+            self.live_last_send = time.perf_counter()
+            self.schedule_live_update()
+            return
+        changed = {}
+        for control_type, param in PID_FIELDS:
+            value = round(self.pid_params[control_type][param].get(), 2)  # Resolution of the labels
+            if self.live_sent.get((control_type, param)) != value:
+                changed[(control_type, param)] = value
+        if not changed:
+            return
+        try:
+            command = format_pid_update(changed)
+            self.write_serial((command + "\n").encode('ascii'), COMMAND)
+        except Exception as e:
+            self.live_tuning_var.set(False)
+            messagebox.showerror("Send Error", f"Live tuning stopped: {str(e)}")
+            return
+        self.live_sent.update(changed)
+        self.steps.set_params(self.pid_tag())
+        self.live_last_send = time.perf_counter()
+        self.live_updates += 1
+        self.live_status_label.config(text=f"Live updates: {self.live_updates} | Last: {command}")
                 
     def start_speed_monitoring(self):
         """
@@ -267,13 +588,14 @@ class SerialDebugger:
             messagebox.showwarning("Not Connected", "Please connect to a serial port first")
             return
             
+        self.telemetry_decoder.reset()
         self.speed_monitoring = True
         self.speed_pause = False
         self.pause_speed_btn.config(text="Pause")
         
         try:
             # Send command to start speed monitoring
-            self.serial_port.write(b"START_SPEED\n")
+            self.write_serial(b"START_SPEED\n", COMMAND)
             self.pid_log_message("Sent: START_SPEED\n")
         except Exception as e:
             messagebox.showerror("Send Error", f"Failed to send speed monitoring command: {str(e)}")
@@ -285,6 +607,7 @@ class SerialDebugger:
         self.speed_pause = not self.speed_pause
         self.pause_speed_btn.config(text="Resume" if self.speed_pause else "Pause")
         if not self.speed_pause:
+            self.update_speed_graph()
             self.pid_log_message("Speed graph resumed\n")
         else:
             self.pid_log_message("Speed graph paused\n")
@@ -293,104 +616,330 @@ class SerialDebugger:
         """
         Clear speed data and graph
         """
-        self.speed_data = []
+        self.channels.clear()
+        self.telemetry_samples.clear()
         self.last_speed_time = 0
-        self.speed_canvas.delete("all")
+        self.speed_graph.clear()
         self.speed_value_label.config(text="Current Speed: 0.00")
         self.pid_log_message("Speed data cleared\n")
         
-    def add_speed_data(self, speed):
+    def apply_channel_spec(self):
         """
-        Add speed data point and update graph
+        Reconfigure the telemetry channels from the spec entry
         """
-        current_time = time.time() * 1000000  # microseconds
-        
-        # Add new data point
-        self.speed_data.append((current_time, speed))
+        try:
+            self.channels.configure(self.channel_spec_var.get())
+        except ValueError as e:
+            messagebox.showerror("Channel Error", f"Invalid channel layout: {str(e)}")
+            return
+        self.telemetry_framer.set_keys(self.channels.keys())
+        self.telemetry_samples.clear()
+        self.speed_graph.rebuild()
+        self.analysis_channel_combo['values'] = list(self.channels.channels)
+        self.apply_analysis()
+        self.pid_log_message(f"Telemetry channels: {', '.join(self.channels.channels)}\n")
         
-        # Keep only the latest data points
-        if len(self.speed_data) > self.max_data_points:
-            self.speed_data.pop(0)
+    def toggle_export(self):
+        """
+        Start or stop streaming every parsed telemetry record to CSV or .npy files
+        """
+        if self.exporter:
+            exporter = self.exporter
+            self.telemetry_decoder.tap = None
+            self.bridge.call_and_wait(lambda: None)  # Let a record in flight on the I/O thread finish
+            self.exporter = None
+            exporter.close()
+            self.export_btn.config(text="Start Export")
+            self.pid_log_message(f"{exporter.status()}\n")
+            if exporter.error:
+                messagebox.showerror("Export Error", f"Failed to write export: {str(exporter.error)}")
+            return
             
-        # Update speed value display
-        self.speed_value_label.config(text=f"Current Speed: {speed:.2f}")
-        
-        # Update graph if not paused
-        if not self.speed_pause:
-            self.update_speed_graph()
+        try:
+            file_path = filedialog.asksaveasfilename(
+                defaultextension=".csv",
+                filetypes=[("CSV files", "*.csv"), ("NumPy arrays", "*.npy"), ("All files", "*.*")]
+            )
+            if file_path:
+                self.exporter = TelemetryExporter(file_path, self.channels.records)
+                self.telemetry_decoder.tap = self.exporter.record
+                self.export_btn.config(text="Stop Export")
+                self.pid_log_message(f"Exporting telemetry to {', '.join(self.exporter.files())}\n")
+        except Exception as e:
+            messagebox.showerror("Export Error", f"Failed to start export: {str(e)}")
             
-    def update_speed_graph(self):
+    def toggle_sweep(self):
         """
-        Update the speed graph display
+        Start a sweep over the parameter ranges, or stop the running one
         """
-        if not self.speed_data:
+        if self.sweeping:
+            self.sweep.stop()
+            self.sweep_status_label.config(text="Stopping after the current set...")
+            return
+            
+        simulate = self.sweep_simulate_var.get()
+        if not simulate and (not self.is_open or not self.commands):
+            messagebox.showwarning("Not Connected", "Connect to the car first, or tick Simulate")
+            return
+        try:
+            ranges = parse_ranges(self.sweep_ranges_var.get())
+            count = int(self.sweep_random_var.get())
+            settle = float(self.sweep_settle_var.get())
+            window = float(self.sweep_window_var.get())
+            # Parameters without a range keep the slider values, which the device gets back afterwards
+            base = {(control_type, param): self.pid_params[control_type][param].get()
+                    for control_type, param in PID_FIELDS}
+            candidates = random_candidates(base, ranges, count) if count > 0 else grid_candidates(base, ranges)
+            sweep = PidSweep(candidates, base, self.channels.records, settle=settle, window=window)
+        except (ValueError, tk.TclError) as e:
+            messagebox.showerror("Sweep Error", f"Invalid sweep settings: {str(e)}")
             return
             
-        # Clear canvas
-        self.speed_canvas.delete("all")
+        self.sweep = sweep
+        self.sweeping = True
+        self.sweep_rows = {}
+        self.sweep_table.delete(*self.sweep_table.get_children())
+        self.sweep_btn.config(text="Stop Sweep")
+        self.sweep_status_label.config(text=f"0/{len(sweep.candidates)} sets")
+        on_result = lambda result: self.root.after(0, self.add_sweep_result, sweep, result)
+        if simulate:
+            # The simulated car is CPU bound, so it gets its own thread and event loop
+            def run():
+                error = None
+                try:
+                    asyncio.run(sweep.run(PlantTarget(), on_result))
+                except Exception as e:
+                    error = e
+                self.root.after(0, self.on_sweep_done, sweep, error)
+            threading.Thread(target=run, daemon=True).start()
+        else:
+            telemetry_format = self.telemetry_format_var.get()
+            self.sweep_target = DeviceTarget(self.commands, self.channels.keys(),
+                                             None if telemetry_format == "ASCII" else telemetry_format.lower())
+            future = self.bridge.submit(sweep.run(self.sweep_target, on_result))
+            future.add_done_callback(lambda f: self.root.after(0, self.on_sweep_done, sweep, f.exception()))
+        self.pid_log_message(f"Sweep started: {len(sweep.candidates)} parameter sets"
+                             f"{' on the simulated car' if simulate else ''}\n")
         
-        # Graph dimensions
-        canvas_width = self.speed_canvas.winfo_width()
-        canvas_height = self.speed_canvas.winfo_height()
+    def add_sweep_result(self, sweep, result):
+        """
+        Add one evaluated parameter set to the results table
+        """
+        if sweep is not self.sweep:
+            return
+        score = f"{result.score:.3f}" if result.ok else "-"
+        row = self.sweep_table.insert("", tk.END, values=[result.index]
+                                      + [f"{result.values[field]:g}" for field in PID_FIELDS] + [score, result.status])
+        self.sweep_rows[row] = result
+        best = sweep.ranked()[0]
+        self.sweep_status_label.config(text=f"{len(sweep.results)}/{len(sweep.candidates)} sets | "
+                                            f"Best: #{best.index} ({'-' if not best.ok else f'{best.score:.3f}'})")
         
-        if canvas_width <= 1 or canvas_height <= 1:
+    def on_sweep_done(self, sweep, error):
+        """
+        Report the end of a sweep and rank the table
+        """
+        if sweep is not self.sweep:
             return
+        if self.sweep_target is not None:
+            # The device has the slider values again
+            self.live_sent = {field: round(value, 2) for field, value in sweep.base.items()}
+            self.steps.set_params(self.pid_tag())
+            self.sweep_target = None
+        self.sweeping = False
+        self.sweep_btn.config(text="Run Sweep")
+        if error is not None:
+            self.pid_log_message(f"Sweep failed: {str(error)}\n")
+        self.sort_sweep_table("score", descending=False)
+        ranked = sweep.ranked()
+        if ranked:
+            self.pid_log_message(f"Sweep finished: {len(ranked)} sets, best {ranked[0].describe()}\n")
             
-        # Padding
-        padding = 20
-        graph_width = canvas_width - 2 * padding
-        graph_height = canvas_height - 2 * padding
-        
-        # Find min and max values
-        min_time = min(data[0] for data in self.speed_data)
-        max_time = max(data[0] for data in self.speed_data)
-        min_speed = min(data[1] for data in self.speed_data)
-        max_speed = max(data[1] for data in self.speed_data)
+    def sort_sweep_table(self, column, descending=None):
+        """
+        Sort the results table by a column; clicking the same heading again reverses the order
+        """
+        if descending is None:
+            descending = self.sweep_sort == (column, False)
+        self.sweep_sort = (column, descending)
         
-        # Add some padding to y-axis
-        speed_range = max_speed - min_speed
-        if speed_range == 0:
-            speed_range = 1
-        min_speed -= speed_range * 0.1
-        max_speed += speed_range * 0.1
+        def key(row):
+            value = self.sweep_table.set(row, column)
+            try:
+                return (0, float(value))
+            except ValueError:
+                return (1, value)  # Failed sets ("-") after the scored ones
+        rows = sorted(self.sweep_table.get_children(), key=key, reverse=descending)
+        for index, row in enumerate(rows):
+            self.sweep_table.move(row, "", index)
+            
+    def use_sweep_result(self):
+        """
+        Load the selected result's parameters into the sliders
+        """
+        selection = self.sweep_table.selection()
+        if not selection:
+            messagebox.showinfo("Parameter Sweep", "Select a result in the table first")
+            return
+        result = self.sweep_rows[selection[0]]
+        for (control_type, param), value in result.values.items():
+            self.pid_params[control_type][param].set(value)
+        self.pid_log_message(f"Sliders set to sweep result #{result.index}: {result.tag()}\n")
         
-        # Time range
-        time_range = max_time - min_time
-        if time_range == 0:
-            time_range = 1
+    def save_sweep_results(self):
+        """
+        Save the ranked sweep results as CSV
+        """
+        if not self.sweep or not self.sweep.results:
+            messagebox.showinfo("Parameter Sweep", "No sweep results to save")
+            return
+        try:
+            file_path = filedialog.asksaveasfilename(
+                defaultextension=".csv",
+                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+            )
+            if file_path:
+                self.sweep.save(file_path)
+                self.pid_log_message(f"Sweep results saved to {file_path}\n")
+        except Exception as e:
+            messagebox.showerror("Save Error", f"Failed to save sweep results: {str(e)}")
             
-        # Draw grid lines and labels
-        self.speed_canvas.create_line(padding, padding, padding, canvas_height - padding, fill="gray")
-        self.speed_canvas.create_line(padding, canvas_height - padding, canvas_width - padding, canvas_height - padding, fill="gray")
+    def channel_source(self, name):
+        """
+        (record key, value index) that carries the named channel, or None
+        """
+        for key, names in self.channels.records.items():
+            if name in names:
+                return key, names.index(name)
+        return None
         
-        # Draw zero speed line if it's in range
-        if min_speed <= 0 <= max_speed:
-            zero_y = canvas_height - padding - (0 - min_speed) / (max_speed - min_speed) * graph_height
-            self.speed_canvas.create_line(padding, zero_y, canvas_width - padding, zero_y, 
-                                        fill="green", width=1, dash=(4, 2))
+    def apply_analysis(self):
+        """
+        Restart response analysis with the chosen signal, setpoint and window
+        """
+        source = self.channel_source(self.analysis_channel_var.get().strip())
+        if source is None:
+            self.analysis_source = None
+            self.rolling_label.config(text="Analysis off: choose a telemetry channel as signal")
+            return
+        setpoint = self.analysis_setpoint_var.get().strip()
+        try:
+            self.setpoint_value = float(setpoint)
+            self.setpoint_source = None
+        except ValueError:
+            self.setpoint_source = self.channel_source(setpoint)
+            if self.setpoint_source is None:
+                messagebox.showerror("Analysis Error", f"Setpoint '{setpoint}' is neither a number nor a channel")
+                return
+        try:
+            min_step = float(self.analysis_min_step_var.get())
+        except ValueError:
+            min_step = 0.0
+        if min_step <= 0:
+            messagebox.showerror("Analysis Error", "Min Step must be a positive number")
+            return
+        try:
+            window = max(int(self.analysis_window_var.get()), 2)
+        except (ValueError, tk.TclError):
+            window = 1000
+        self.rolling = RollingStats(window)
+        # A new signal or setpoint is not a step of the old one: start over
+        self.steps.reset()
+        self.steps.threshold = min_step
+        self.steps.set_params(self.pid_tag())
+        self.analysis_source = source
+        self.rolling_label.config(text="No samples")
+        self.step_label.config(text="No step detected yet")
         
-        # Draw data points
-        if len(self.speed_data) > 1:
-            points = []
-            for i, (t, speed) in enumerate(self.speed_data):
-                x = padding + (t - min_time) / time_range * graph_width
-                y = canvas_height - padding - (speed - min_speed) / (max_speed - min_speed) * graph_height
-                points.append(x)
-                points.append(y)
-                
-            # Draw line connecting points
-            self.speed_canvas.create_line(points, fill="blue", width=2)
-            
-            # Draw data points
-            for i in range(0, len(points), 2):
-                x, y = points[i], points[i+1]
-                self.speed_canvas.create_oval(x-2, y-2, x+2, y+2, fill="red", outline="red")
+    def pid_tag(self):
+        """
+        Compact description of the PID parameters the device is known to have, or None
+        """
+        if not self.live_sent:
+            return None
+        return " ".join(f"{PID_CODES[field]}={self.live_sent[field]:g}" for field in PID_FIELDS
+                        if field in self.live_sent)
+        
+    def set_telemetry_format(self):
+        """
+        Switch between ASCII KEY:v1,v2 records and binary COBS/SLIP frames
+        """
+        telemetry_format = self.telemetry_format_var.get()
+        if telemetry_format == "ASCII":
+            self.telemetry_framer.reset()
+            self.telemetry_decoder = self.telemetry_framer
+        else:
+            self.telemetry_decoder = FrameDecoder(telemetry_format.lower(), self.telemetry_samples)
+        self.telemetry_decoder.tap = self.exporter.record if self.exporter else None
+        self.telemetry_stats_label.config(text=self.telemetry_decoder.counters())
+        self.pid_log_message(f"Telemetry format: {telemetry_format}\n")
+        
+    def update_speed_graph(self):
+        """
+        Request a redraw of the speed graph; frames are rate-limited by SpeedGraph
+        """
+        self.speed_graph.request_redraw()
             
     def update_port_list(self):
-        ports = [port.device for port in serial.tools.list_ports.comports()]
+        infos = serial.tools.list_ports.comports()
+        ports = [port.device for port in infos]
         self.port_combo['values'] = ports
         if ports and not self.port_var.get():
-            self.port_var.set(ports[0])
+            # Preselect the adapter the car was last detected on, at its baud rate
+            known = self.discovery.lookup(infos)
+            if known:
+                self.port_var.set(known[0])
+                self.baudrate_var.set(str(known[1]))
+            else:
+                self.port_var.set(ports[0])
+            
+    def auto_detect(self):
+        """
+        Probe every port for the car in the background and select the best match
+        """
+        if self.detecting:
+            return
+        # The probe scores passive data with the active telemetry format
+        telemetry_format = self.telemetry_format_var.get()
+        self.discovery.binary = None if telemetry_format == "ASCII" else telemetry_format.lower()
+        self.discovery.keys = self.channels.keys()
+        exclude = [self.port_var.get()] if self.is_open else []
+        self.detecting = True
+        self.detect_btn.config(state=tk.DISABLED, text="Detecting...")
+        self.log_message("Auto-detect: probing all ports...\n")
+        threading.Thread(target=self.run_detection, args=(exclude,), daemon=True).start()
+        
+    def run_detection(self, exclude):
+        """
+        Detection thread: probe all ports, then hand the results to Tk
+        """
+        try:
+            results = self.discovery.discover(
+                exclude=exclude,
+                on_result=lambda result: self.root.after(0, self.log_message, f"  {result.describe()}\n")
+            )
+        except Exception as e:
+            results = e
+        self.root.after(0, self.on_detection_done, results)
+        
+    def on_detection_done(self, results):
+        """
+        Select the detected port and baud rate
+        """
+        self.detecting = False
+        self.detect_btn.config(state=tk.NORMAL, text="Auto Detect")
+        if isinstance(results, Exception):
+            messagebox.showerror("Auto Detect", f"Port detection failed: {str(results)}")
+            return
+        self.update_port_list()
+        best = self.discovery.best(results)
+        if not best:
+            self.log_message("Auto-detect: no device found\n")
+            messagebox.showinfo("Auto Detect", "No device found on any port")
+            return
+        self.port_var.set(best.port)
+        self.baudrate_var.set(str(best.baudrate))
+        self.log_message(f"Auto-detect: selected {best.port} at {best.baudrate} baud\n")
             
     def toggle_connection(self):
         if not self.is_open:
@@ -425,9 +974,21 @@ class SerialDebugger:
                 bytesize=databits,
                 stopbits=stopbits,
                 parity=parity,
-                timeout=1
+                timeout=1,
+                write_timeout=WRITE_TIMEOUT  # Bounds executor writes (Windows) on a stalled port
             )
             
+            # Attach the port to the I/O thread; the UI only shows "connected" once
+            # the connection, transmit queue and command engine all exist
+            future = self.bridge.submit(open_connection(self.serial_port, self.receive_data, self.receive_error))
+            try:
+                self.connection = future.result(timeout=2)
+            except Exception:
+                future.cancel()
+                raise
+            self.tx = self.bridge.call_and_wait(self.create_write_queue)
+            self.commands = self.bridge.call_and_wait(self.create_command_engine)
+            
             self.is_open = True
             self.connect_btn.config(text="Disconnect")
             self.send_btn.config(state=tk.NORMAL)
@@ -435,22 +996,35 @@ class SerialDebugger:
             self.save_pid_btn.config(state=tk.NORMAL)
             self.start_speed_btn.config(state=tk.NORMAL)
             
-            # Start receiving thread
-            self.running = True
-            self.receive_thread = threading.Thread(target=self.receive_data, daemon=True)
-            self.receive_thread.start()
-            
             self.log_message(f"Connected to {port} at {baudrate} baud\n")
             self.pid_log_message(f"Connected to {port} at {baudrate} baud\n")
             
         except Exception as e:
+            try:
+                self.release_connection()  # Whatever was set up before the failure
+            except Exception:
+                pass
             messagebox.showerror("Connection Error", f"Failed to connect: {str(e)}")
             
+    def release_connection(self):
+        """
+        Stop the transmit queue, detach the port from the I/O thread and close it
+        """
+        self.commands = None
+        if self.tx:
+            self.bridge.call_and_wait(self.tx.close)
+            self.tx = None
+        if self.connection:
+            self.bridge.call_and_wait(self.connection.close)
+            self.connection = None
+        if self.serial_port and self.serial_port.is_open:
+            self.serial_port.close()
+            
     def disconnect_serial(self):
         try:
-            self.running = False
-            if self.serial_port and self.serial_port.is_open:
-                self.serial_port.close()
+            if self.sweep_target is not None:
+                self.sweep.stop()
+            self.release_connection()
                 
             self.is_open = False
             self.connect_btn.config(text="Connect")
@@ -484,11 +1058,11 @@ class SerialDebugger:
                 if len(data) % 2 != 0:
                     data = "0" + data  # Pad with leading zero if needed
                 byte_data = bytes.fromhex(data)
-                self.serial_port.write(byte_data)
+                self.write_serial(byte_data)
                 self.log_message(f"Sent (HEX): {data}\n")
             else:
                 # Send as ASCII string
-                self.serial_port.write(data.encode('utf-8'))
+                self.write_serial(data.encode('utf-8'))
                 self.log_message(f"Sent: {data}\n")
                 
             # Clear send text area
@@ -497,75 +1071,319 @@ class SerialDebugger:
         except Exception as e:
             messagebox.showerror("Send Error", f"Failed to send data: {str(e)}")
             
-    def receive_data(self):
-        while self.running and self.serial_port and self.serial_port.is_open:
-            try:
-                if self.serial_port.in_waiting > 0:
-                    data = self.serial_port.read(self.serial_port.in_waiting)
-                    if data:
-                        self.root.after(0, self.display_received_data, data)
-                time.sleep(0.00001)  # 10us sleep to meet timing requirements
-            except Exception as e:
-                self.root.after(0, messagebox.showerror, "Receive Error", f"Failed to receive data: {str(e)}")
-                break
+    def write_serial(self, data, priority=BULK):
+        """
+        Queue data for sending; the writer task on the I/O thread sends it
+        without blocking Tk, commands (priority COMMAND) ahead of bulk data
+        """
+        if not self.tx.put(data, priority):
+            raise IOError("Transmit queue full: the port is not accepting data")
+        if self.capture:
+            self.capture.record(TX, data)
+        
+    def write_io(self, data):
+        """
+        Queue a command from the I/O thread (used by the command engine)
+        """
+        self.write_serial(data, COMMAND)
+        
+    def create_write_queue(self):
+        """
+        Build the transmit queue on the I/O thread and start its writer
+        """
+        tx = WriteQueue(self.connection, max_write=block_size(self.serial_port.baudrate))
+        tx.on_error = lambda message: self.root.after(0, self.log_message, f"TX: {message}\n")
+        tx.start()
+        return tx
+        
+    def create_command_engine(self):
+        """
+        Build the command engine on the I/O thread, where it runs
+        """
+        commands = CommandEngine(self.write_io)
+        commands.on_result = lambda message: self.root.after(0, self.pid_log_message, message + "\n")
+        return commands
+        
+    def send_command(self, text, expect, on_reply, timeout=1.0, retries=2):
+        """
+        Send a command through the engine; on_reply(future) runs on the Tk
+        thread once the reply arrived or the command failed
+        """
+        future = self.bridge.submit(self.commands.request(text, expect, timeout=timeout, retries=retries))
+        future.add_done_callback(lambda f: self.root.after(0, on_reply, f))
+        
+    def init_receive_state(self):
+        """
+        State read by receive_data() on the I/O thread; the benchmark's
+        HeadlessDebugger calls this too, so keep every attribute it reads here
+        """
+        self.capture = None  # CaptureWriter while capturing to disk
+        self.commands = None  # CommandEngine (lives on the I/O thread) while connected
+        # Received chunks are batched here by the I/O thread and drained by a UI tick
+        self.rx_buffer = ChunkBuffer()
+        # Receive path instrumentation, reported in the Statistics panel once per second
+        self.stats = StreamStats()
+        self.trigger = None  # TriggerFilter (fed on the I/O thread) while filtering
+        self.sweep_target = None  # DeviceTarget fed by the I/O thread while sweeping the device
+        self.speed_monitoring = False  # Whether speed monitoring is active
+        self.exporter = None  # TelemetryExporter, tapped into the decoder, while exporting
+        
+    def receive_data(self, data):
+        """
+        Called from the I/O thread whenever bytes arrive
+        """
+        timestamp = time.monotonic_ns()  # Arrival time, carried through parsing and display
+        self.stats.on_chunk(len(data))
+        if self.capture:
+            self.capture.record(RX, data, timestamp)
+        trigger = self.trigger
+        if trigger is not None:
+            trigger.feed(data)  # Only matching lines and their context go on to Tk
+        else:
+            self.rx_buffer.append(data, timestamp)
+        commands = self.commands
+        if commands is not None and commands.outstanding:
+            commands.feed(data)  # Look for replies to pending commands
+        sweep_target = self.sweep_target
+        if sweep_target is not None:
+            sweep_target.feed(data, timestamp)  # Records only while a sweep window is open
+        if self.speed_monitoring or self.exporter is not None:
+            self.parse_speed_data(data, timestamp)
+
+    def receive_error(self, e):
+        """
+        Called from the I/O thread when the port fails
+        """
+        self.root.after(0, messagebox.showerror, "Serial Error", f"Serial port failed: {str(e)}")
                 
-    def display_received_data(self, data):
+    def get_ui_interval(self):
+        """
+        UI tick interval in milliseconds derived from the configured rate
+        """
+        try:
+            rate = int(self.ui_rate_var.get())
+        except (tk.TclError, ValueError):
+            rate = 30
+        rate = min(max(rate, 1), 120)
+        return max(1, int(1000 / rate))
+        
+    def ui_tick(self):
+        """
+        Drain everything received since the last tick with a single insert
+        """
+        try:
+            self.stats.on_queue(len(self.rx_buffer))
+            data, chunks, arrival = self.rx_buffer.drain()
+            if data:
+                self.display_received_data(data)
+                self.merge_label.config(text=f"Last tick: {len(data)} bytes / {chunks} chunks")
+                self.stats.on_consumed(arrival)
+            if self.trigger is not None:
+                self.display_triggered(self.trigger)
+            self.drain_telemetry()
+            if time.monotonic_ns() - self.stats.last_report >= 1000000000:
+                self.update_stats_panel()
+        finally:
+            self.root.after(self.get_ui_interval(), self.ui_tick)
+            
+    def update_stats_panel(self):
+        """
+        Show the last second's throughput and latency and the session's latency histogram
+        """
+        self.stats_label.config(text=self.stats.report())
+        if self.capture and self.capture.error:
+            self.toggle_capture()  # Stopped by a write error: close it and say so
+        self.parse_stats_label.config(text=f"Telemetry: {self.telemetry_decoder.counters()}")
+        if self.tx:
+            self.tx_stats_label.config(text=self.tx.report())
+        if self.trigger is not None:
+            self.trigger_stats_label.config(text=self.trigger.counters())
+        canvas = self.latency_canvas
+        canvas.delete("all")
+        buckets = self.stats.latency_total.buckets()
+        if not buckets:
+            return
+        width = canvas.winfo_width()
+        height = canvas.winfo_height()
+        bar = max(min((width - 10) / len(buckets), 12), 1)
+        peak = max(count for _, count in buckets)
+        for i, (_, count) in enumerate(buckets):
+            x = 5 + i * bar
+            canvas.create_rectangle(x, height - 12 - (height - 16) * count / peak, x + bar - 1, height - 12,
+                                    fill="steelblue", outline="")
+        canvas.create_text(5, height - 1, anchor=tk.SW, fill="gray", font=("TkDefaultFont", 7),
+                           text=f"{buckets[0][0] / 1e6:.2f} ms")
+        canvas.create_text(width - 5, height - 1, anchor=tk.SE, fill="gray", font=("TkDefaultFont", 7),
+                           text=f"{self.stats.latency_total.max / 1e6:.1f} ms")
+            
+    def display_received_data(self, data, tags=None):
         try:
             if self.receive_hex_var.get():
                 # Display as hex
-                hex_data = data.hex()
-                # Format hex data in groups of two characters
-                formatted_hex = ' '.join(hex_data[i:i+2] for i in range(0, len(hex_data), 2))
-                self.receive_text.insert(tk.END, formatted_hex + ' ')
+                # Bulk-format with space separated byte pairs
+                self.receive_view.append(data.hex(' ') + ' ', scroll=self.auto_scroll_var.get(), tags=tags)
             else:
                 # Display as ASCII
                 decoded_data = data.decode('utf-8', errors='replace')
-                self.receive_text.insert(tk.END, decoded_data)
-                
-                # Check if this is speed data
-                if self.speed_monitoring:
-                    self.parse_speed_data(decoded_data)
-                
-            # Auto scroll to bottom
-            if self.auto_scroll_var.get():
-                self.receive_text.see(tk.END)
+                self.receive_view.append(decoded_data, scroll=self.auto_scroll_var.get(), tags=tags)
                 
         except Exception as e:
             messagebox.showerror("Display Error", f"Failed to display received data: {str(e)}")
             
-    def parse_speed_data(self, data):
+    def display_triggered(self, trigger):
         """
-        Parse speed data from received string
-        Expected format: "SPEED:left_speed:right_speed\n"
+        Show the lines the filter let through, highlighted runs with the trigger tag
         """
-        lines = data.split('\n')
-        for line in lines:
-            if line.startswith("SPEED:"):
-                try:
-                    # Parse speed data
-                    parts = line.split(':')
-                    if len(parts) >= 2:
-                        speeds = parts[1].split(',')
-                        if len(speeds) >= 2:
-                            left_speed = float(speeds[0])
-                            right_speed = float(speeds[1])
-                            # Use average of both wheels
-                            avg_speed = (left_speed + right_speed) / 2
-                            self.add_speed_data(avg_speed)
-                except Exception as e:
-                    pass  # Ignore parsing errors
-                    
+        output = trigger.output
+        parts = []
+        highlighted = False
+        while output:
+            data, flag = output.popleft()
+            if flag != highlighted and parts:
+                self.display_received_data(b"".join(parts), "trigger" if highlighted else None)
+                parts = []
+            parts.append(data)
+            highlighted = flag
+        if parts:
+            self.display_received_data(b"".join(parts), "trigger" if highlighted else None)
+            
+    def toggle_trigger(self):
+        """
+        Start filtering with the current rules, or show everything again
+        """
+        if self.trigger_enabled_var.get():
+            self.apply_trigger()
+        else:
+            self.stop_trigger()
+            
+    def apply_trigger(self):
+        """
+        Build a filter from the rule entry and swap it in for the I/O thread
+        """
+        try:
+            rules = parse_rules(self.trigger_spec_var.get())
+            before = max(int(self.trigger_before_var.get()), 0)
+            after = max(int(self.trigger_after_var.get()), 0)
+        except (ValueError, tk.TclError) as e:
+            messagebox.showerror("Filter Error", f"Invalid filter: {str(e)}")
+            self.trigger_enabled_var.set(self.trigger is not None)
+            return
+            
+        # Capture rules append their lines to a text file, kept across re-applies
+        capture = self.trigger.capture if self.trigger else None
+        if any(rule.action == "capture" for rule in rules) and not capture:
+            file_path = filedialog.asksaveasfilename(
+                title="Trigger capture file",
+                defaultextension=".txt",
+                filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+            )
+            if not file_path:
+                self.trigger_enabled_var.set(self.trigger is not None)
+                return
+            try:
+                capture = open(file_path, "ab")
+            except OSError as e:
+                messagebox.showerror("Filter Error", f"Failed to open capture file: {str(e)}")
+                self.trigger_enabled_var.set(self.trigger is not None)
+                return
+                
+        old = self.trigger
+        self.trigger = TriggerFilter(self.trigger_spec_var.get(), before, after, capture)
+        if old:
+            self.display_triggered(old)
+            if old.capture and old.capture is not capture:
+                self.bridge.call_and_wait(old.capture.close)
+        self.trigger_enabled_var.set(True)
+        self.log_message(f"Filter: {'; '.join(rule.text for rule in rules)} (context {before}/{after})\n")
+        
+    def stop_trigger(self):
+        """
+        Remove the filter; its capture file is closed on the I/O thread, which writes it
+        """
+        trigger = self.trigger
+        if trigger is None:
+            return
+        self.trigger = None
+        self.display_triggered(trigger)
+        if trigger.capture:
+            self.bridge.call_and_wait(trigger.capture.close)
+        self.trigger_stats_label.config(text=trigger.counters())
+        self.log_message("Filter off\n")
+        
+    def parse_speed_data(self, data, timestamp):
+        """
+        Feed raw received bytes to the telemetry framer (I/O thread)
+        Expected format: "KEY:v1,v2,...\n", e.g. "SPEED:left_speed,right_speed\n",
+        or binary COBS/SLIP frames (see serial_protocol.py); records split
+        across reads are reassembled and malformed ones are counted and skipped
+        """
+        self.telemetry_decoder.feed(data, timestamp)
+        
+    def drain_telemetry(self):
+        """
+        Move records queued by the I/O thread into their channels and
+        request a single redraw for all of them (UI thread)
+        """
+        # Counters first: when every frame fails its checks there are no samples, and
+        # that is when the error counts matter most
+        self.telemetry_stats_label.config(text=self.telemetry_decoder.counters())
+        samples = self.telemetry_samples
+        if not samples:
+            return
+        speed = None
+        source = self.analysis_source
+        setpoint_source = self.setpoint_source
+        analysed = False
+        while samples:
+            timestamp, key, values = samples.popleft()
+            self.channels.push(timestamp, key, values)
+            if key == "SPEED" and len(values) >= 2:
+                # Use average of both wheels
+                speed = (values[0] + values[1]) / 2
+            if setpoint_source and key == setpoint_source[0] and len(values) > setpoint_source[1]:
+                self.setpoint_value = values[setpoint_source[1]]
+            if source and key == source[0] and len(values) > source[1]:
+                value = values[source[1]]
+                self.rolling.add(value, self.setpoint_value)
+                step = self.steps.add(timestamp, value, self.setpoint_value)
+                if step:
+                    self.step_label.config(text=step.describe())
+                    self.pid_log_message(f"{step.describe()}\n")
+                analysed = True
+                
+        # Update speed value display
+        if speed is not None:
+            self.speed_value_label.config(text=f"Current Speed: {speed:.2f}")
+        if analysed:
+            self.rolling_label.config(text=self.rolling.describe())
+            
+        # Update graph if not paused
+        if not self.speed_pause:
+            self.update_speed_graph()
+            
     def log_message(self, message):
-        self.receive_text.insert(tk.END, message)
-        if self.auto_scroll_var.get():
-            self.receive_text.see(tk.END)
+        self.receive_view.append(message, scroll=self.auto_scroll_var.get())
             
     def pid_log_message(self, message):
-        self.pid_log_text.insert(tk.END, message)
-        self.pid_log_text.see(tk.END)
+        self.pid_log_view.append(message)
             
     def clear_received(self):
-        self.receive_text.delete("1.0", tk.END)
+        self.receive_view.clear()
+        
+    def update_scrollback_limit(self, *args):
+        """
+        Apply the scrollback limit, either in lines or in kilobytes
+        """
+        try:
+            value = int(self.scrollback_var.get())
+        except (tk.TclError, ValueError):
+            return
+        if value <= 0:
+            return
+        if self.scrollback_unit_var.get() == "KB":
+            self.receive_view.set_limit(max_bytes=value * 1024)
+        else:
+            self.receive_view.set_limit(max_lines=value)
         
     def save_log(self):
         try:
@@ -574,30 +1392,102 @@ class SerialDebugger:
                 filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
             )
             if file_path:
-                content = self.receive_text.get("1.0", tk.END)
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write(content)
+                # Save the full history, including what was trimmed from the view
+                self.receive_view.save(file_path)
                 messagebox.showinfo("Save Log", "Log saved successfully")
         except Exception as e:
             messagebox.showerror("Save Error", f"Failed to save log: {str(e)}")
             
+    def toggle_capture(self):
+        """
+        Start or stop continuous binary capture of all RX/TX traffic
+        """
+        if self.capture:
+            capture = self.capture
+            self.capture = None
+            self.bridge.call_and_wait(lambda: None)  # Let a record in flight on the I/O thread finish
+            capture.close()
+            self.capture_btn.config(text="Start Capture")
+            self.log_message(f"{capture.status()}\n")
+            if capture.error:
+                messagebox.showerror("Capture Error", f"Failed to write capture, capturing stopped: {str(capture.error)}")
+            return
+            
+        try:
+            file_path = filedialog.asksaveasfilename(
+                defaultextension=".scap",
+                filetypes=[("Serial captures", "*.scap"), ("All files", "*.*")]
+            )
+            if file_path:
+                self.capture = CaptureWriter(file_path)
+                self.capture_btn.config(text="Stop Capture")
+                self.log_message(f"Capturing to {self.capture.files[0]}\n")
+        except Exception as e:
+            messagebox.showerror("Capture Error", f"Failed to start capture: {str(e)}")
+            
+    def open_hex_viewer(self):
+        """
+        Open a capture (or any file) in the paged hex viewer
+        """
+        file_path = filedialog.askopenfilename(
+            filetypes=[("Serial captures", "*.scap"), ("All files", "*.*")]
+        )
+        if file_path:
+            HexViewer(self.root, file_path)
+            
+    def on_close(self):
+        """
+        Flush the capture and release the port before the window goes away
+        """
+        if self.capture:
+            capture = self.capture
+            self.capture = None
+            self.bridge.call_and_wait(lambda: None)  # Let a record in flight on the I/O thread finish
+            capture.close()
+        self.stop_trigger()
+        if self.sweeping:
+            self.sweep.stop()
+        if self.exporter:
+            self.toggle_export()
+        if self.is_open:
+            self.disconnect_serial()
+        self.bridge.stop()
+        self.root.destroy()
+        
     def load_pid_params(self):
         """
         Load PID parameters from the device
-        Sends command to request current PID parameters
+        Sends GET_PID and fills the sliders from the "PID:..." reply
         """
         if not self.is_open or not self.serial_port:
             messagebox.showwarning("Not Connected", "Please connect to a serial port first")
             return
             
         try:
-            # Send command to request PID parameters
-            # Using a common format: "GET_PID\n"
-            self.serial_port.write(b"GET_PID\n")
+            self.send_command("GET_PID", ("PID:",), self.on_pid_reply)
             self.pid_log_message("Sent: GET_PID\n")
         except Exception as e:
             messagebox.showerror("Send Error", f"Failed to send PID request: {str(e)}")
             
+    def on_pid_reply(self, future):
+        """
+        Apply a GET_PID reply to the sliders
+        """
+        try:
+            values = parse_pid_reply(future.result())
+        except TimeoutError:
+            messagebox.showwarning("No Reply", "The device did not answer GET_PID")
+            return
+        except Exception as e:
+            messagebox.showerror("PID Error", f"Failed to load PID parameters: {str(e)}")
+            return
+        # The device already has these values: live tuning must not echo them back
+        self.live_sent = {field: round(value, 2) for field, value in values.items()}
+        self.steps.set_params(self.pid_tag())
+        for (control_type, param), value in values.items():
+            self.pid_params[control_type][param].set(value)
+        self.pid_log_message("PID parameters loaded from device\n")
+            
     def save_pid_params(self):
         """
         Save current PID parameters to the device
@@ -607,27 +1497,33 @@ class SerialDebugger:
             return
             
         try:
-            # Format PID parameters for sending to device
-            angle_p = self.pid_params['angle']['p'].get()
-            angle_i = self.pid_params['angle']['i'].get()
-            angle_d = self.pid_params['angle']['d'].get()
-            
-            speed_p = self.pid_params['speed']['p'].get()
-            speed_i = self.pid_params['speed']['i'].get()
-            speed_d = self.pid_params['speed']['d'].get()
-            
-            turn_p = self.pid_params['turn']['p'].get()
-            turn_i = self.pid_params['turn']['i'].get()
-            turn_d = self.pid_params['turn']['d'].get()
-            
-            # Send command to set PID parameters
-            # Using a common format: "SET_PID angle_p angle_i angle_d speed_p speed_i speed_d turn_p turn_i turn_d\n"
-            pid_cmd = f"SET_PID {angle_p} {angle_i} {angle_d} {speed_p} {speed_i} {speed_d} {turn_p} {turn_i} {turn_d}\n"
-            self.serial_port.write(pid_cmd.encode('utf-8'))
-            self.pid_log_message(f"Sent: {pid_cmd}")
+            # Send command to set PID parameters; the device acknowledges with "OK"
+            # Format: "SET_PID angle_p angle_i angle_d speed_p speed_i speed_d turn_p turn_i turn_d\n"
+            values = {(control_type, param): self.pid_params[control_type][param].get()
+                      for control_type, param in PID_FIELDS}
+            pid_cmd = format_set_pid(values)
+            self.send_command(pid_cmd, ("OK",), self.on_set_pid_reply)
+            self.live_sent = {field: round(value, 2) for field, value in values.items()}
+            self.steps.set_params(self.pid_tag())
+            self.pid_log_message(f"Sent: {pid_cmd}\n")
         except Exception as e:
             messagebox.showerror("Send Error", f"Failed to send PID parameters: {str(e)}")
             
+    def on_set_pid_reply(self, future):
+        """
+        Report whether the device acknowledged SET_PID
+        """
+        try:
+            future.result()
+        except TimeoutError:
+            self.pid_log_message("SET_PID was not acknowledged\n")
+        except CommandError as e:
+            messagebox.showerror("PID Error", f"Device rejected the PID parameters: {str(e)}")
+        except Exception as e:
+            self.pid_log_message(f"SET_PID failed: {str(e)}\n")
+        else:
+            self.pid_log_message("SET_PID acknowledged\n")
+            
     def reset_pid_params(self):
         """
         Reset PID parameter fields to zero
@@ -0,0 +1,318 @@
+import argparse
+import os
+import random
+import select
+import sys
+import time
+
+from serial_commands import PID_FIELDS, PID_FIELDS_BY_CODE
+from serial_plant import BalanceCar, DEFAULT_GAINS
+from serial_protocol import encode_frame
+
+try:
+    import tty
+except ImportError:  # Windows has no pseudo-terminals
+    tty = None
+
+# Binary message type of each telemetry record (see serial_protocol.MESSAGE_TYPES)
+RECORD_TYPES = {"SPEED": 0x01, "ANGLE": 0x02, "PWM": 0x03}
+FRAGMENTS = ("none", "random", "bytes")
+
+
+class SimulatedDevice:
+    """
+    Simulated STM32 balance car behind a pseudo-terminal.
+
+    The slave side (port_name) behaves like the car's serial port. The
+    device answers the firmware's command set:
+        GET_PID                -> PID:ap,ai,ad,sp,si,sd,tp,ti,td
+        SET_PID <nine values>  -> OK (or ERR <reason>)
+        PID ap=1.5 sd=0.2      -> live update, no reply
+        START_SPEED            -> stream telemetry
+        STOP_SPEED             -> stop streaming
+    The gains drive a BalanceCar, advanced in real time, so telemetry shows
+    how the car would respond to them. A car that falls over is stood back
+    up after recover seconds; push_every > 0 nudges it that often.
+
+    Telemetry (the records keys, as ASCII "KEY:v1,v2" lines or COBS/SLIP
+    frames) is sampled rate times per second; above the firmware's 200 Hz
+    control rate the control loop runs at the telemetry rate. Output is
+    paced to what baudrate could carry (10 bits per byte; 0 = no limit) and
+    goes out in fragments: "none" writes whatever is due (in 1 ms pieces
+    when paced, like USB packets), "random" in writes of 1..chunk bytes and
+    "bytes" one byte at a time, each followed by a gap of gap seconds. Like
+    the firmware's UART buffer, at most tx_buffer bytes wait; records that
+    do not fit are dropped and counted.
+    """
+
+    def __init__(self, rate=100.0, baudrate=115200, noise=0.05, records=("SPEED", "ANGLE", "PWM"),
+                 telemetry_format="ascii", fragment="none", chunk=16, gap=0.0, tx_buffer=4096,
+                 push_every=0.0, push=30.0, recover=1.0, seed=None):
+        self.rate = rate
+        self.baudrate = baudrate
+        self.records = records
+        self.telemetry_format = telemetry_format
+        self.fragment = fragment
+        self.chunk = chunk
+        self.gap = gap
+        self.tx_buffer = tx_buffer
+        self.push_every = push_every
+        self.push = push
+        self.recover = recover
+        self.random = random.Random(seed)
+        self.car = BalanceCar(dt=min(0.005, 1.0 / rate), noise=noise, seed=seed)
+        self.car.set_pid(DEFAULT_GAINS)
+        self.master = None
+        self.slave = None  # Kept open so writes never fail before a consumer attaches
+        self.port_name = None
+        self.running = False
+        self.streaming = False
+        self.input = bytearray()
+        self.output = bytearray()
+        self.tx_due = 0.0
+        self.steps = 0  # Control steps simulated since start
+        self.fallen_at = None
+        self.falls = 0
+        self.commands = 0
+        self.errors = 0  # Command lines answered with ERR
+        self.records_out = 0
+        self.dropped = 0  # Records that did not fit into the transmit buffer
+        self.bytes_out = 0
+        self.writes = 0
+        self.elapsed = 0.0
+
+    def open(self):
+        """Create the pty pair and return the port name for consumers"""
+        if tty is None or not hasattr(os, "openpty"):
+            raise OSError("Pseudo-terminals are not supported on this platform")
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)  # No echo or newline translation
+        os.set_blocking(self.master, False)
+        self.port_name = os.ttyname(self.slave)
+        return self.port_name
+
+    def close(self):
+        for fd in (self.master, self.slave):
+            if fd is not None:
+                os.close(fd)
+        self.master = self.slave = None
+
+    def stop(self):
+        """Ask run() to return (any thread)"""
+        self.running = False
+
+    def run(self, duration=None):
+        """Serve commands and stream telemetry until stop() or for duration seconds"""
+        self.running = True
+        start = time.monotonic()
+        next_push = self.push_every
+        try:
+            while self.running:
+                now = time.monotonic() - start
+                if duration is not None and now >= duration:
+                    break
+                self.simulate(now)
+                if self.push_every > 0 and now >= next_push:
+                    self.car.push(self.push if self.random.random() < 0.5 else -self.push)
+                    next_push += self.push_every
+                # Wake for the next control step, or when the pacing allows the next write
+                timeout = max((self.steps + 1) * self.car.dt - now, 0.0)
+                send = bool(self.output)
+                if send and self.tx_due > now:
+                    timeout = min(timeout, self.tx_due - now)
+                    send = False
+                readable, writable, _ = select.select([self.master], [self.master] if send else [], [],
+                                                      min(timeout, 0.01))
+                if readable:
+                    self.read_commands()
+                if writable:
+                    self.send(time.monotonic() - start)
+        finally:
+            self.elapsed = time.monotonic() - start
+            self.running = False
+
+    def simulate(self, now):
+        """Advance the car to now and queue the telemetry it produced"""
+        due = int(now / self.car.dt) - self.steps
+        if due <= 0:
+            return
+        self.steps += due
+        records = self.car.run(due * self.car.dt, self.rate)
+        if self.car.fallen:
+            if self.fallen_at is None:
+                self.fallen_at = now
+                self.falls += 1
+            elif now - self.fallen_at >= self.recover:
+                self.car.reset()  # Stood back up
+                self.fallen_at = None
+        if not self.streaming:
+            return
+        for _, key, values in records:
+            if key not in self.records:
+                continue
+            if self.telemetry_format == "ascii":
+                data = f"{key}:{','.join(f'{value:.2f}' for value in values)}\n".encode('ascii')
+            else:
+                data = encode_frame(RECORD_TYPES[key], *values, framing=self.telemetry_format)
+            if len(self.output) + len(data) > self.tx_buffer:
+                self.dropped += 1
+                continue
+            self.output += data
+            self.records_out += 1
+
+    def send(self, now):
+        """Write the next fragment of pending output"""
+        if self.fragment == "bytes":
+            size = 1
+        elif self.fragment == "random":
+            size = self.random.randint(1, self.chunk)
+        elif self.baudrate:
+            size = max(int(self.baudrate / 10 / 1000), 1)  # 1 ms of line time
+        else:
+            size = len(self.output)
+        try:
+            n = os.write(self.master, self.output[:size])
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            n = 0  # EIO while no consumer has the port open: keep the data
+        del self.output[:n]
+        self.bytes_out += n
+        self.writes += 1
+        due = max(self.tx_due, now)
+        if self.baudrate:
+            due += n * 10 / self.baudrate
+        self.tx_due = max(due, now + self.gap) if self.gap and self.fragment != "none" else due
+
+    def read_commands(self):
+        try:
+            data = os.read(self.master, 4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            return  # EIO while no consumer has the port open
+        self.input += data
+        while True:
+            end = self.input.find(b'\n')
+            if end < 0:
+                break
+            line = self.input[:end].decode('utf-8', errors='replace').strip()
+            del self.input[:end + 1]
+            if line:
+                self.handle_command(line)
+        if len(self.input) > 4096:
+            del self.input[:]  # No newline in sight
+
+    def handle_command(self, line):
+        self.commands += 1
+        name, _, rest = line.partition(' ')
+        if name == "GET_PID":
+            self.reply("PID:" + ",".join(f"{self.car.gains[field]:g}" for field in PID_FIELDS))
+        elif name == "SET_PID":
+            try:
+                values = [float(value) for value in rest.split()]
+            except ValueError:
+                self.error("invalid number")
+                return
+            if len(values) != len(PID_FIELDS):
+                self.error(f"expected {len(PID_FIELDS)} values")
+                return
+            self.car.set_pid(dict(zip(PID_FIELDS, values)))
+            self.reply("OK")
+        elif name == "PID":
+            values = {}
+            for item in rest.split():
+                code, _, text = item.partition('=')
+                try:
+                    values[PID_FIELDS_BY_CODE[code]] = float(text)
+                except (KeyError, ValueError):
+                    self.error(f"invalid update '{item}'")
+                    return
+            self.car.set_pid(values)
+        elif name == "START_SPEED":
+            self.streaming = True
+        elif name == "STOP_SPEED":
+            self.streaming = False
+        else:
+            self.error("unknown command")
+
+    def reply(self, text):
+        # Replies bypass the telemetry limit, as the firmware answers from the main loop
+        self.output += (text + "\n").encode('ascii')
+
+    def error(self, reason):
+        self.errors += 1
+        self.reply(f"ERR {reason}")
+
+    def status(self):
+        elapsed = self.elapsed or 1e-9
+        return (f"Sent {self.records_out} records ({self.records_out / elapsed:.0f}/s), {self.bytes_out} bytes "
+                f"({self.bytes_out / elapsed / 1024:.1f} KB/s) in {self.writes} writes over {self.elapsed:.1f} s; "
+                f"{self.dropped} records dropped, {self.commands} commands ({self.errors} errors), "
+                f"{self.falls} falls")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated STM32 balance car on a pseudo-terminal")
+    parser.add_argument("--rate", type=float, default=100.0, help="Telemetry samples per second (default: 100)")
+    parser.add_argument("--baudrate", type=int, default=115200,
+                        help="Pace output to what this baud rate carries, 0 = unlimited (default: 115200)")
+    parser.add_argument("--format", default="ascii", choices=["ascii", "cobs", "slip"],
+                        help="Telemetry as ASCII records or binary frames (default: ascii)")
+    parser.add_argument("--records", default="SPEED,ANGLE,PWM",
+                        help="Telemetry records to stream (default: SPEED,ANGLE,PWM)")
+    parser.add_argument("--noise", type=float, default=0.05, help="Sensor noise, standard deviation (default: 0.05)")
+    parser.add_argument("--fragment", default="none", choices=FRAGMENTS,
+                        help="How output is split into writes: as due, random sizes or single bytes (default: none)")
+    parser.add_argument("--chunk", type=int, default=16, help="Largest random fragment in bytes (default: 16)")
+    parser.add_argument("--gap", type=float, default=0.0, metavar="SECONDS",
+                        help="Pause after each fragment, so the reader sees them separately (default: 0)")
+    parser.add_argument("--push-every", type=float, default=0.0, metavar="SECONDS",
+                        help="Nudge the car this often, 0 = never (default: 0)")
+    parser.add_argument("--stream", action="store_true", help="Stream telemetry without waiting for START_SPEED")
+    parser.add_argument("--duration", type=float, help="Exit after this many seconds")
+    parser.add_argument("--link", metavar="PATH", help="Also expose the port under this path (symlink)")
+    parser.add_argument("--seed", type=int, help="Seed for noise, fragments and pushes")
+
+    args = parser.parse_args()
+
+    records = tuple(key.strip().upper() for key in args.records.split(',') if key.strip())
+    unknown = [key for key in records if key not in RECORD_TYPES]
+    if unknown or not records:
+        parser.error(f"Unknown record {', '.join(unknown)} (choose from {', '.join(RECORD_TYPES)})")
+    if args.rate <= 0:
+        parser.error("--rate must be positive")
+    device = SimulatedDevice(rate=args.rate, baudrate=args.baudrate, noise=args.noise, records=records,
+                             telemetry_format=args.format, fragment=args.fragment, chunk=max(args.chunk, 1),
+                             gap=args.gap, push_every=args.push_every, seed=args.seed)
+    device.streaming = args.stream
+    try:
+        port_name = device.open()
+    except OSError as e:
+        print(f"Failed to open pseudo-terminal: {e}")
+        return
+    if args.link:
+        try:
+            if os.path.islink(args.link):
+                os.remove(args.link)
+            os.symlink(port_name, args.link)
+            port_name = f"{args.link} -> {port_name}"
+        except OSError as e:
+            print(f"Failed to create {args.link}: {e}")
+            args.link = None
+
+    print(f"Simulated car on {port_name}. Press Ctrl+C to stop.")
+    sys.stdout.flush()
+    try:
+        device.run(args.duration)
+    except KeyboardInterrupt:
+        print("\nInterrupted by user")
+    finally:
+        device.close()
+        if args.link:
+            os.remove(args.link)
+        print(device.status())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+import serial.tools.list_ports
+
+from serial_telemetry import RecordFramer
+from serial_protocol import FrameDecoder
+
+# Most common rates first, so a passive scan finds typical devices early
+CANDIDATE_BAUDRATES = (115200, 9600, 57600, 38400, 19200, 230400, 460800, 921600)
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".serial_debugger_ports.json")
+TEXT_BYTES = bytes(range(0x20, 0x7F)) + b"\r\n\t"
+
+
+def score_data(data, keys=("SPEED",), binary=None):
+    """
+    Rate how plausible data is as device output at the right baud rate.
+    Returns (score, detail): 0 for silence or noise, up to 0.9 when every
+    line is a telemetry record (or every binary frame is valid). A wrong
+    baud rate turns text into non-printable bytes and breaks every frame.
+    """
+    if not data:
+        return 0.0, "No data"
+    if binary:
+        decoder = FrameDecoder(binary)
+        decoder.feed(data)
+        total = decoder.frames + decoder.frame_errors + decoder.crc_errors
+        if not total:
+            return 0.0, f"{len(data)} bytes, no frames"
+        return 0.9 * decoder.frames / total, f"{decoder.frames}/{total} valid {binary.upper()} frames"
+    framer = RecordFramer(keys)
+    framer.feed(data)
+    text = 1 - len(data.translate(None, TEXT_BYTES)) / len(data)
+    records = len(framer.samples)
+    if records:
+        return 0.5 + 0.4 * records / max(framer.lines, records), f"{records}/{framer.lines} telemetry lines"
+    if framer.lines:
+        return 0.4 * text, f"{framer.lines} lines, {text:.0%} text"
+    return 0.2 * text, f"{len(data)} bytes, {text:.0%} text"
+
+
+class ProbeResult:
+    """Best baud rate found for one port"""
+
+    def __init__(self, port, serial_number=None, description=""):
+        self.port = port
+        self.serial_number = serial_number  # USB serial number, None for non-USB ports
+        self.description = description
+        self.baudrate = None
+        self.score = 0.0
+        self.detail = "Not probed"
+        self.cached = False  # Confirmed at the cached baud rate without a full scan
+        self.error = None
+        self.elapsed = 0.0
+
+    def describe(self):
+        if self.error:
+            return f"{self.port}: {self.error}"
+        if self.baudrate is None:
+            return f"{self.port}: {self.detail}"
+        source = ", cached" if self.cached else ""
+        return (f"{self.port}: {self.baudrate} baud, score {self.score:.2f} ({self.detail}{source}) "
+                f"in {self.elapsed:.2f} s")
+
+
+class PortDiscovery:
+    """
+    Finds which serial port a device is on, and at which baud rate.
+
+    discover() probes every port at once from a thread pool, one worker per
+    port, because opening ports and waiting for data is slow and blocking.
+    A worker tries each candidate baud rate on its port for up to listen
+    seconds. With a handshake (e.g. GET_PID), it sends the handshake and a
+    reply starting with expect scores 1.0. Without one, or while no reply
+    has come, the received bytes are scored by score_data(). A port stops
+    early once a baud rate scores accept or more.
+
+    Found devices are cached by USB serial number in a JSON file. The cached
+    baud rate is tried first, so a known adapter is confirmed in one listen
+    period even if its port name changed. lookup() answers straight from the
+    cache without opening anything.
+    """
+
+    def __init__(self, baudrates=CANDIDATE_BAUDRATES, handshake=None, expect=None, listen=0.3,
+                 keys=("SPEED",), binary=None, accept=0.85, cache_path=CACHE_PATH, max_workers=16):
+        self.baudrates = list(baudrates)
+        self.handshake = handshake  # Command line sent at each baud rate, or None to listen only
+        self.expect = expect  # Reply prefix that confirms the device
+        self.listen = listen  # Seconds per baud rate
+        self.keys = keys
+        self.binary = binary
+        self.accept = accept  # Score that ends the scan of a port; also the minimum to cache
+        self.cache_path = cache_path
+        self.max_workers = max_workers
+        self.cache = self.load_cache()
+
+    def load_cache(self):
+        """The cached devices; entries without a usable baud rate and time are dropped"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(cache, dict):
+            return {}
+        return {serial_number: entry for serial_number, entry in cache.items() if self.valid_entry(entry)}
+
+    @staticmethod
+    def valid_entry(entry):
+        if not isinstance(entry, dict):
+            return False
+        baudrate = entry.get('baudrate')
+        timestamp = entry.get('time')
+        return (isinstance(baudrate, int) and not isinstance(baudrate, bool) and baudrate > 0
+                and isinstance(timestamp, (int, float)) and not isinstance(timestamp, bool))
+
+    def save_cache(self):
+        temp = self.cache_path + ".tmp"
+        try:
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(self.cache, f, indent=2)
+            os.replace(temp, self.cache_path)
+        except OSError:
+            pass  # The cache is only an accelerator
+
+    def lookup(self, ports=None):
+        """
+        (port, baudrate) of the most recently confirmed cached device that
+        is plugged in now, or None. Opens nothing, so it is instant.
+        """
+        ports = serial.tools.list_ports.comports() if ports is None else ports
+        best = None
+        for info in ports:
+            entry = self.cache.get(info.serial_number or "")
+            if entry and (best is None or entry['time'] > best[2]):
+                best = (info.device, entry['baudrate'], entry['time'])
+        return best[:2] if best else None
+
+    def discover(self, ports=None, exclude=(), on_result=None):
+        """
+        Probe ports (names; default: every detected port) concurrently and
+        return their ProbeResults, best first. on_result is called from the
+        worker threads as each port finishes.
+        """
+        detected = {info.device: info for info in serial.tools.list_ports.comports()}
+        names = list(detected) if ports is None else list(ports)
+        results = []
+        for name in names:
+            if name in exclude:
+                continue
+            info = detected.get(name)
+            results.append(ProbeResult(name, getattr(info, 'serial_number', None) or None,
+                                       getattr(info, 'description', "") or ""))
+        if not results:
+            return []
+
+        def probe(result):
+            self.probe_port(result)
+            if on_result:
+                on_result(result)
+            return result
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(results))) as pool:
+            list(pool.map(probe, results))
+
+        changed = False
+        for result in results:
+            if not result.serial_number:
+                continue
+            if result.score >= self.accept:
+                self.cache[result.serial_number] = {
+                    'baudrate': result.baudrate,
+                    'port': result.port,
+                    'description': result.description,
+                    'time': time.time()
+                }
+                changed = True
+            elif result.serial_number in self.cache and not result.error:
+                del self.cache[result.serial_number]  # Answered, but no longer as our device
+                changed = True
+        if changed:
+            self.save_cache()
+        return sorted(results, key=lambda result: result.score, reverse=True)
+
+    def best(self, results):
+        """
+        The best of discover()'s results if it looks like the device (a
+        handshake reply, telemetry records or mostly valid frames), else None
+        """
+        if results and results[0].score >= 0.5:
+            return results[0]
+        return None
+
+    def probe_port(self, result):
+        """Try the candidate baud rates on one port (worker thread)"""
+        start = time.monotonic()
+        baudrates = list(self.baudrates)
+        entry = self.cache.get(result.serial_number or "")
+        if entry:
+            baudrates.insert(0, entry['baudrate'])
+            baudrates = list(dict.fromkeys(baudrates))  # Drop the later duplicate
+        try:
+            port = serial.Serial(port=result.port, baudrate=baudrates[0], timeout=0.05, write_timeout=0.2)
+        except Exception as e:
+            result.error = f"Failed to open: {e}"
+            return
+        try:
+            for index, baudrate in enumerate(baudrates):
+                port.baudrate = baudrate
+                port.reset_input_buffer()
+                score, detail = self.probe_baudrate(port)
+                if score > result.score:
+                    result.baudrate, result.score, result.detail = baudrate, score, detail
+                    result.cached = bool(entry) and index == 0
+                if score >= self.accept:
+                    break
+            if result.baudrate is None:
+                result.detail = "No response at any baud rate"
+        except Exception as e:
+            result.error = f"Probe failed: {e}"
+        finally:
+            port.close()
+            result.elapsed = time.monotonic() - start
+
+    def probe_baudrate(self, port):
+        """Score one baud rate: handshake reply or plausibility of what arrives"""
+        expect = self.expect.encode('ascii') if self.expect else None
+        if self.handshake:
+            port.write((self.handshake.rstrip("\n") + "\n").encode('utf-8'))
+        data = bytearray()
+        deadline = time.monotonic() + self.listen
+        while time.monotonic() < deadline:
+            data += port.read(max(port.in_waiting, 1))
+            if expect and expect in data:
+                for line in data[:data.rfind(b"\n") + 1].split(b"\n"):
+                    if line.startswith(expect):
+                        return 1.0, f"Reply '{line.rstrip().decode('ascii', errors='replace')[:40]}'"
+        return score_data(bytes(data), self.keys, self.binary)
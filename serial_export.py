@@ -0,0 +1,247 @@
+import argparse
+import os
+import queue
+import struct
+import sys
+import threading
+from array import array
+
+from serial_capture import iter_capture, RX
+from serial_telemetry import RecordFramer, ChannelRegistry
+from serial_protocol import FrameDecoder
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+
+
+class ExportTable:
+    """Rows of one record key: seconds since the first record, then its channels"""
+
+    def __init__(self, path, key, names, fmt):
+        self.path = path
+        self.key = key
+        self.columns = ["time"] + list(names)
+        self.width = len(self.columns)
+        self.fmt = fmt
+        self.block = array('d')  # Row-major values not yet handed to the writer
+        self.rows = 0  # Rows recorded
+        self.written = 0  # Rows on disk
+        self.file = None
+        self.header_size = 0
+
+    def open(self):
+        if self.fmt == "npy":
+            self.file = open(self.path, "wb")
+            header = self.npy_header(0)
+            self.header_size = len(header)
+            self.file.write(header)
+        else:
+            self.file = open(self.path, "w", encoding="utf-8", newline="")
+            self.file.write(",".join(self.columns) + "\n")
+
+    def npy_header(self, rows):
+        """
+        .npy v1.0 header for a structured array with one float64 field per
+        column, so np.load() returns named columns. open() sizes it once,
+        with room for a 20-digit row count, and every later header is padded
+        to that size, so it can be rewritten in place after every block and
+        the file is always loadable.
+        """
+        descr = ", ".join(f"('{name}', '<f8')" for name in self.columns)
+        header = f"{{'descr': [{descr}], 'fortran_order': False, 'shape': ({rows},), }}"
+        size = self.header_size or (len(NPY_MAGIC) + 2 + len(header) + 20 + 1 + 63) // 64 * 64
+        header = header.ljust(size - len(NPY_MAGIC) - 2 - 1) + "\n"
+        return NPY_MAGIC + struct.pack('<H', len(header)) + header.encode('latin1')
+
+    def write(self, block):
+        rows = len(block) // self.width
+        if self.fmt == "npy":
+            if sys.byteorder != "little":
+                block.byteswap()
+            self.file.write(block.tobytes())
+            self.written += rows
+            self.file.seek(0)
+            self.file.write(self.npy_header(self.written))
+            self.file.seek(0, os.SEEK_END)
+        else:
+            line = "%.6f" + ",%.9g" * (self.width - 1) + "\n"
+            width = self.width
+            self.file.write("".join(line % tuple(block[i:i + width]) for i in range(0, len(block), width)))
+            self.written += rows
+        self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+class TelemetryExporter:
+    """
+    Streams parsed telemetry records to CSV or .npy files.
+
+    Every record key gets its own file, <stem>-<KEY><suffix>, with a time
+    column (seconds since the first record) followed by the key's channels.
+    CSV has a header row. .npy holds a structured float64 array with named
+    fields, so np.load(path) or pandas.DataFrame(np.load(path)) has the
+    whole session with its column names.
+
+    record() is the decoders' tap and runs on the I/O thread straight after
+    parsing. It appends the values to the key's in-memory block. Full
+    blocks of block_rows rows go to a writer thread, which formats them and
+    writes each block in one call. Partial blocks are flushed every
+    flush_interval seconds. At most max_blocks blocks wait for the disk, so
+    memory stays bounded. If the disk falls that far behind, blocks are
+    dropped and counted so that the I/O thread never stalls. A lossless
+    exporter (for offline conversion) waits for the writer instead.
+    """
+
+    def __init__(self, path, records, block_rows=65536, max_blocks=16, flush_interval=1.0, lossless=False):
+        stem, suffix = os.path.splitext(path)
+        self.fmt = "npy" if suffix.lower() == ".npy" else "csv"
+        suffix = suffix or ".csv"
+        self.block_rows = block_rows
+        self.flush_interval = flush_interval
+        self.lossless = lossless
+        self.tables = {key: ExportTable(f"{stem}-{key}{suffix}", key, names, self.fmt)
+                       for key, names in records.items()}
+        self.lock = threading.Lock()
+        self.blocks = queue.Queue(maxsize=max_blocks)
+        self.start = None  # Timestamp of the first record, ns
+        self.dropped = 0  # Rows lost because the writer fell behind
+        self.error = None
+        for table in self.tables.values():
+            table.open()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def record(self, record):
+        """Append one (timestamp_ns, key, values) record (any thread; never blocks on disk)"""
+        timestamp, key, values = record
+        table = self.tables.get(key)
+        if table is None:
+            return
+        with self.lock:
+            if self.start is None:
+                self.start = timestamp
+            block = table.block
+            block.append((timestamp - self.start) / 1e9)
+            if len(values) == table.width - 1:
+                block.extend(values)
+            else:
+                # Short or long record: pad with NaN / truncate so columns stay aligned
+                block.extend((list(values) + [float('nan')] * table.width)[:table.width - 1])
+            table.rows += 1
+            if len(block) < self.block_rows * table.width:
+                return
+            table.block = array('d')
+            # Queued under the lock so blocks of a key reach the disk in order
+            self.submit(table, block)
+
+    def submit(self, table, block):
+        if self.lossless:
+            self.blocks.put((table, block))
+            return
+        try:
+            self.blocks.put_nowait((table, block))
+        except queue.Full:
+            self.dropped += len(block) // table.width
+
+    def flush_partial(self):
+        """Queue the partially filled blocks behind the full ones"""
+        with self.lock:
+            for table in self.tables.values():
+                if table.block:
+                    try:
+                        self.blocks.put_nowait((table, table.block))
+                    except queue.Full:
+                        return  # Still busy; flushed next time
+                    table.block = array('d')
+
+    def close(self):
+        """Flush everything and stop the writer thread"""
+        self.flush_partial()
+        self.blocks.put(None)
+        self.thread.join()
+        for table in self.tables.values():
+            if table.block:
+                self.write(table, table.block)
+                table.block = array('d')
+            table.close()
+
+    def run(self):
+        while True:
+            try:
+                # A lossless exporter may hold the lock while waiting for queue space,
+                # so only the lossy one flushes idle blocks from here
+                item = self.blocks.get(timeout=None if self.lossless else self.flush_interval)
+            except queue.Empty:
+                self.flush_partial()
+                continue
+            if item is None:
+                break
+            self.write(*item)
+
+    def write(self, table, block):
+        try:
+            table.write(block)
+        except OSError as e:
+            self.error = e
+
+    def files(self):
+        return [table.path for table in self.tables.values()]
+
+    def status(self):
+        rows = sum(table.rows for table in self.tables.values())
+        text = f"Exported {rows} records to {len(self.tables)} {self.fmt.upper()} file(s)"
+        if self.dropped:
+            text += f" ({self.dropped} dropped: disk too slow)"
+        return text
+
+
+def export_capture(paths, output, spec=ChannelRegistry.DEFAULT_SPEC, binary=None, block_rows=65536):
+    """Parse the received stream of capture files and export its telemetry; returns the exporter"""
+    channels = ChannelRegistry(spec)
+    exporter = TelemetryExporter(output, channels.records, block_rows=block_rows, lossless=True)
+    decoder = FrameDecoder(binary) if binary else RecordFramer(channels.keys())
+    samples = decoder.samples
+    try:
+        for path in paths:
+            for timestamp, direction, data in iter_capture(path):
+                if direction != RX:
+                    continue
+                decoder.feed(data, timestamp)
+                while samples:
+                    exporter.record(samples.popleft())
+    finally:
+        exporter.close()
+    return exporter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the telemetry in serial capture files to CSV or .npy")
+    parser.add_argument("paths", nargs="+", help="Capture files, in order")
+    parser.add_argument("-o", "--output", required=True,
+                        help="Output path; .npy writes NumPy files, anything else CSV (one file per record key)")
+    parser.add_argument("--channels", default=ChannelRegistry.DEFAULT_SPEC,
+                        help=f"Channel layout, as in the GUI (default: {ChannelRegistry.DEFAULT_SPEC})")
+    parser.add_argument("--binary", choices=["cobs", "slip"], help="Decode binary COBS/SLIP frames instead of text records")
+
+    args = parser.parse_args()
+
+    spec = args.channels
+    if args.binary and spec == ChannelRegistry.DEFAULT_SPEC:
+        spec = "SPEED:left,right;ANGLE:angle,gyro"  # Records carried by the binary frame types
+    try:
+        exporter = export_capture(args.paths, args.output, spec, args.binary)
+    except (OSError, ValueError) as e:
+        print(f"Export failed: {e}")
+        return
+    print(exporter.status())
+    for path in exporter.files():
+        print(f"  {path}")
+    if exporter.error:
+        print(f"Write error: {exporter.error}")
+
+
+if __name__ == "__main__":
+    main()
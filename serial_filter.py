@@ -0,0 +1,240 @@
+import re
+from collections import deque
+
+ACTIONS = ("show", "highlight", "capture")
+
+
+class TriggerRule:
+    """One pattern of a trigger spec and what to do with matching lines"""
+
+    def __init__(self, action, source, text, width=None):
+        self.action = action
+        self.source = source  # Regex source (bytes)
+        self.text = text  # As written in the spec, for messages
+        self.width = width  # Length of a literal or hex pattern; None for a regex
+
+
+def parse_rules(spec):
+    """
+    Parse a trigger spec into TriggerRules; raises ValueError.
+
+    Rules are separated by ';' and written [action:]pattern, where action is
+    show (default), highlight or capture, and pattern is literal text,
+    /regex/ or hex:DEADBEEF for raw bytes. Example:
+        ERR;highlight:/overflow \\d+/;capture:hex:A55A
+    """
+    rules = []
+    for entry in spec.split(';'):
+        entry = entry.strip()
+        if not entry:
+            continue
+        action, sep, pattern = entry.partition(':')
+        if not sep or action.strip().lower() not in ACTIONS:
+            action, pattern = "show", entry
+        action = action.strip().lower()
+        width = None
+        if pattern.startswith('/') and pattern.endswith('/') and len(pattern) > 1:
+            source = pattern[1:-1].encode('utf-8')
+        elif pattern.lower().startswith('hex:'):
+            try:
+                literal = bytes.fromhex(pattern[4:])
+            except ValueError:
+                raise ValueError(f"Invalid hex pattern '{pattern}'")
+            source = re.escape(literal)
+            width = len(literal)
+        else:
+            literal = pattern.encode('utf-8')
+            source = re.escape(literal)
+            width = len(literal)
+        if not source:
+            raise ValueError(f"Empty pattern in '{entry}'")
+        try:
+            compiled = re.compile(source)
+        except re.error as e:
+            raise ValueError(f"Invalid regex '{pattern}': {e}")
+        if compiled.match(b""):
+            raise ValueError(f"Pattern '{pattern}' matches empty text")
+        rules.append(TriggerRule(action, source, entry, width))
+    if not rules:
+        raise ValueError("No trigger patterns given")
+    return rules
+
+
+class TriggerSink:
+    """Where one kind of triggered line goes (the view or the capture file)"""
+
+    def __init__(self, write):
+        self.write = write  # Called with (bytes, highlighted)
+        self.next_line = 0  # First line number not yet written
+        self.post = 0  # Context lines still to write after the last match
+        self.offset = 0  # Offset of next_line in the chunk being scanned
+        self.written = False
+
+
+class TriggerFilter:
+    """
+    Line filter that drops uninteresting received data before it reaches Tk.
+
+    All rule patterns are compiled into one alternation of named groups, so
+    every chunk is searched in a single C-level regex pass over its
+    complete lines, and lines without a match are never sliced, decoded or
+    touched by Python code. A matching line is located around the match
+    with rfind/find. Depending on its rules it is shown in the view,
+    highlighted there, or appended to a capture file, together with up to
+    before/after lines of context. Non-adjacent groups are separated by
+    "--", as in grep. Lines before a chunk's first match come from a small
+    history of the previous chunk's tail.
+
+    Data without a newline for max_line bytes (a binary stream, or a very
+    long line) is not dropped unseen: all but the last overlap bytes are
+    scanned as a line of their own (extended to the end of a match that
+    straddles the cut), so hex: patterns match binary streams and long
+    matching lines are shown in pieces. The overlap is one byte less than
+    the longest literal pattern, or half of max_line with regex rules.
+
+    feed() runs on the I/O thread. Lines for the view are appended to the
+    output deque as (bytes, highlighted) for the UI to drain. Replace the
+    whole filter to change rules rather than modifying it in place.
+    """
+
+    SEPARATOR = b"--\n"
+
+    def __init__(self, spec, before=0, after=0, capture=None, max_line=4096):
+        self.rules = parse_rules(spec)
+        self.pattern = re.compile(b"|".join(b"(?P<r%d>%s)" % (index, rule.source)
+                                            for index, rule in enumerate(self.rules)))
+        self.actions = {f"r{index}": rule.action for index, rule in enumerate(self.rules)}
+        self.before = before
+        self.after = after
+        self.max_line = max_line
+        widths = [rule.width for rule in self.rules]
+        self.overlap = max_line // 2 if None in widths else min(max(widths) - 1, max_line // 2)
+        self.output = deque()
+        self.capture = capture  # Binary file for capture rules, or None
+        self.view = TriggerSink(lambda data, highlighted: self.output.append((data, highlighted)))
+        self.captured = TriggerSink(lambda data, highlighted: self.capture.write(data))
+        self.buffer = bytearray()
+        self.scanned = 0
+        self.history = deque(maxlen=before or 1)  # (line number, bytes) of the previous chunk's tail
+        self.lines = 0  # Complete lines seen
+        self.matches = 0  # Lines that matched a rule
+        self.shown = 0  # Lines sent to the view, including context
+        self.overflows = 0  # Times max_line bytes arrived without a newline
+
+    def feed(self, data):
+        buf = self.buffer
+        buf += data
+        end = buf.rfind(b'\n', self.scanned) + 1
+        if end:
+            self.scan(buf, end)
+            del buf[:end]
+        if len(buf) > self.max_line:
+            # No newline in sight: scan what no match can still extend into as a
+            # line of its own instead of growing forever or dropping it unseen
+            self.overflows += 1
+            cut = len(buf) - self.overlap
+            for match in self.pattern.finditer(buf, max(cut - self.overlap, 0)):
+                if match.start() >= cut:
+                    break
+                if match.end() > cut:
+                    cut = match.end()  # Keep a straddling match whole
+                    break
+            segment = buf[:cut] + b"\n"
+            self.scan(segment, len(segment))
+            del buf[:cut]
+        self.scanned = len(buf)
+
+    def scan(self, buf, end):
+        """Trigger on the complete lines buf[:end]"""
+        base = self.lines
+        for sink in (self.view, self.captured):
+            sink.offset = 0  # Context still owed from the previous chunk starts here
+        pos = 0  # Start of line number line
+        line = base
+        match = self.pattern.search(buf, 0, end)
+        while match:
+            start = buf.rfind(b'\n', 0, match.start()) + 1
+            stop = buf.find(b'\n', match.start()) + 1
+            line += buf.count(b'\n', pos, start)
+            actions = {self.actions[match.lastgroup]}
+            for other in self.pattern.finditer(buf, match.end(), stop):
+                actions.add(self.actions[other.lastgroup])
+            self.matches += 1
+            highlighted = "highlight" in actions
+            if highlighted or "show" in actions:
+                self.trigger(self.view, buf, base, start, stop, line, highlighted)
+            if "capture" in actions and self.capture:
+                self.trigger(self.captured, buf, base, start, stop, line, False)
+            pos = stop
+            line += 1
+            match = self.pattern.search(buf, stop, end)
+        for sink in (self.view, self.captured):
+            if sink.post:
+                self.write_post(sink, buf, end)
+        self.lines = base + buf.count(b'\n', 0, end)
+        if self.before:
+            self.remember(buf, end)
+
+    def trigger(self, sink, buf, base, start, stop, line, highlighted):
+        """Write the matching line buf[start:stop] (number line) to sink with its context"""
+        if sink.post:
+            self.write_post(sink, buf, start)
+        first = max(sink.next_line, line - self.before)
+        if sink.written and first > sink.next_line and (self.before or self.after):
+            sink.write(self.SEPARATOR, False)
+        context = self.lines_before(buf, base, start, line, first)
+        if context:
+            sink.write(b"".join(context), False)
+        sink.write(bytes(buf[start:stop]), highlighted)
+        if sink is self.view:
+            self.shown += len(context) + 1
+        sink.next_line = line + 1
+        sink.offset = stop
+        sink.post = self.after
+        sink.written = True
+
+    def write_post(self, sink, buf, end):
+        """Write the context lines still owed after the last match, up to offset end"""
+        lines = []
+        pos = sink.offset
+        while sink.post and pos < end:
+            stop = buf.find(b'\n', pos, end) + 1
+            lines.append(bytes(buf[pos:stop]))
+            pos = stop
+            sink.post -= 1
+        if lines:
+            sink.write(b"".join(lines), False)
+            if sink is self.view:
+                self.shown += len(lines)
+            sink.next_line += len(lines)
+            sink.offset = pos
+
+    def lines_before(self, buf, base, start, line, first):
+        """Lines first..line-1 as bytes, from this chunk or the previous one's tail"""
+        lines = []
+        pos = start
+        number = line
+        while number > first and number > base:
+            prev = buf.rfind(b'\n', 0, pos - 1) + 1
+            lines.append(bytes(buf[prev:pos]))
+            pos = prev
+            number -= 1
+        lines.reverse()
+        if number > first:
+            lines[:0] = [text for index, text in self.history if first <= index < number]
+        return lines
+
+    def remember(self, buf, end):
+        """Keep the last before lines of buf[:end] for context at the start of the next chunk"""
+        tail = []
+        pos = end
+        number = self.lines
+        while len(tail) < self.before and pos > 0:
+            prev = buf.rfind(b'\n', 0, pos - 1) + 1
+            number -= 1
+            tail.append((number, bytes(buf[prev:pos])))
+            pos = prev
+        self.history.extend(reversed(tail))
+
+    def counters(self):
+        return f"Lines: {self.lines} | Matches: {self.matches} | Shown: {self.shown} | Overflows: {self.overflows}"
@@ -0,0 +1,397 @@
+import bisect
+import mmap
+import os
+import threading
+import time
+import tkinter as tk
+import tkinter.font as tkfont
+from array import array
+from tkinter import ttk, filedialog, messagebox
+
+from serial_capture import MAGIC, FILE_HEADER, RECORD_HEADER, RX, TX, read_capture
+
+BYTES_PER_ROW = 16
+HEX_COLUMN = 12  # Width of "offset  " in a formatted row
+ASCII_COLUMN = HEX_COLUMN + BYTES_PER_ROW * 3 + 2  # Hex digits, spaces, then "  |"
+# Byte -> character shown in the ASCII column; non-printable bytes show as '.'
+PRINTABLE = bytes(b if 32 <= b < 127 else ord('.') for b in range(256))
+
+
+def format_rows(data, offset, width=BYTES_PER_ROW):
+    """Hex dump of data as "offset  hex bytes  |ascii|" rows, formatted in bulk"""
+    hex_text = data.hex(' ')
+    ascii_text = data.translate(PRINTABLE).decode('ascii')
+    hex_width = width * 3 - 1
+    rows = []
+    for row in range(0, len(data), width):
+        rows.append(f"{offset + row:010x}  {hex_text[row * 3:row * 3 + hex_width]:<{hex_width}}  "
+                    f"|{ascii_text[row:row + width]}|")
+    return "\n".join(rows)
+
+
+class FileDocument:
+    """Random access to the bytes of any file through a read-only memory map"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def size(self):
+        return len(self.map)
+
+    def read(self, offset, n):
+        return bytes(self.map[offset:offset + n])
+
+    def describe(self, offset):
+        return f"{os.path.basename(self.path)} | Offset 0x{offset:x} of 0x{self.size():x}"
+
+    def offset_at_time(self, seconds):
+        return None  # No timestamps in plain files
+
+    def progress(self):
+        return None
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+
+class CaptureDocument(FileDocument):
+    """
+    The payload stream of one direction of a capture file (see serial_capture).
+
+    A background thread scans the record headers once and keeps a checkpoint
+    every STRIDE payload bytes: (stream offset, record position, record
+    timestamp). Memory is therefore a few bytes per 64 KB of capture, and
+    read() and offset_at_time() bisect the checkpoints and then walk only
+    the records between two of them. Offsets are positions in the payload
+    stream, i.e. the bytes as they were received (or sent).
+    """
+
+    STRIDE = 65536
+
+    def __init__(self, path, direction=RX):
+        self.wall_ns, self.mono_ns = read_capture(path)
+        super().__init__(path)
+        self.direction = direction
+        self.stream_size = 0  # Payload bytes indexed so far
+        self.cp_stream = array('q')
+        self.cp_time = array('q')
+        self.cp_file = array('q')  # Appended last: its length is the number of complete checkpoints
+        self.scanned = 0
+        self.done = False
+        self.stopping = False
+        self.thread = threading.Thread(target=self.build_index, daemon=True)
+        self.thread.start()
+
+    def build_index(self):
+        m = self.map
+        size = len(m)
+        unpack = RECORD_HEADER.unpack_from
+        header = RECORD_HEADER.size
+        pos = len(MAGIC) + FILE_HEADER.size
+        stream = 0
+        next_checkpoint = 0
+        while pos + header <= size and not self.stopping:
+            timestamp, direction, length = unpack(m, pos)
+            end = pos + header + length
+            if end > size:
+                break  # Truncated last record
+            if direction == self.direction and length:
+                if stream >= next_checkpoint:
+                    self.cp_stream.append(stream)
+                    self.cp_time.append(timestamp)
+                    self.cp_file.append(pos)
+                    next_checkpoint = stream + self.STRIDE
+                stream += length
+                self.stream_size = stream
+            pos = end
+            self.scanned = pos
+        self.done = True
+
+    def records_from(self, offset):
+        """Yield (stream offset, timestamp, start, end) of the records from the checkpoint before offset"""
+        count = len(self.cp_file)
+        i = bisect.bisect_right(self.cp_stream, offset, 0, count) - 1
+        if i < 0:
+            return
+        m = self.map
+        size = len(m)
+        header = RECORD_HEADER.size
+        stream = self.cp_stream[i]
+        pos = self.cp_file[i]
+        while pos + header <= size:
+            timestamp, direction, length = RECORD_HEADER.unpack_from(m, pos)
+            start = pos + header
+            pos = start + length
+            if pos > size:
+                return
+            if direction == self.direction and length:
+                yield stream, timestamp, start, pos
+                stream += length
+
+    def size(self):
+        return self.stream_size
+
+    def read(self, offset, n):
+        out = bytearray()
+        for stream, _, start, end in self.records_from(offset):
+            if stream + end - start <= offset:
+                continue
+            start += max(offset - stream, 0)
+            out += self.map[start:min(end, start + n - len(out))]
+            if len(out) >= n:
+                break
+        return bytes(out)
+
+    def time_at(self, offset):
+        for stream, timestamp, start, end in self.records_from(offset):
+            if stream + end - start > offset:
+                return timestamp
+        return None
+
+    def describe(self, offset):
+        name = "RX" if self.direction == RX else "TX"
+        text = f"{os.path.basename(self.path)} | {name} offset 0x{offset:x} of 0x{self.size():x}"
+        timestamp = self.time_at(offset)
+        if timestamp is not None:
+            wall = (self.wall_ns + timestamp - self.mono_ns) / 1e9
+            text += (f" | t = {(timestamp - self.mono_ns) / 1e9:.6f} s"
+                     f" ({time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(wall))}.{int(wall * 1e6) % 1000000:06d})")
+        return text
+
+    def offset_at_time(self, seconds):
+        """Stream offset of the first record at or after seconds since the capture started"""
+        target = self.mono_ns + int(seconds * 1e9)
+        count = len(self.cp_file)
+        i = max(bisect.bisect_right(self.cp_time, target, 0, count) - 1, 0)
+        if not count:
+            return 0
+        for stream, timestamp, _, _ in self.records_from(self.cp_stream[i]):
+            if timestamp >= target:
+                return stream
+        return self.size()
+
+    def progress(self):
+        if self.done:
+            return None
+        return self.scanned / max(len(self.map), 1)
+
+    def close(self):
+        self.stopping = True
+        self.thread.join()
+        super().close()
+
+
+def open_document(path, direction=RX):
+    """CaptureDocument for capture files, FileDocument for anything else"""
+    try:
+        return CaptureDocument(path, direction)
+    except ValueError:
+        return FileDocument(path)
+
+
+class HexViewer:
+    """
+    Paged hex/ASCII viewer window for captures and other large files.
+
+    The file is memory-mapped and only the rows that fit in the window are
+    formatted and inserted into the Text widget. The scrollbar, mouse wheel
+    and keys move the offset of the top row and re-render that one page, so
+    scrolling is instant and memory use does not grow with the file size.
+    """
+
+    def __init__(self, parent, path=None):
+        self.window = tk.Toplevel(parent)
+        self.window.title("Hex Viewer")
+        self.window.geometry("860x520")
+        self.document = None
+        self.path = None
+        self.top = 0  # Offset of the first visible row
+        self.mark = None  # Offset highlighted after a jump
+        self.font = tkfont.nametofont("TkFixedFont")
+        self.direction_var = tk.StringVar(value="RX")
+        self.offset_var = tk.StringVar()
+        self.time_var = tk.StringVar()
+
+        # Toolbar
+        toolbar = ttk.Frame(self.window, padding="5")
+        toolbar.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E))
+        ttk.Button(toolbar, text="Open...", command=self.ask_open).pack(side=tk.LEFT)
+        ttk.Label(toolbar, text="Direction:").pack(side=tk.LEFT, padx=(10, 0))
+        direction_combo = ttk.Combobox(toolbar, textvariable=self.direction_var, values=("RX", "TX"),
+                                       width=4, state="readonly")
+        direction_combo.pack(side=tk.LEFT, padx=(5, 0))
+        direction_combo.bind("<<ComboboxSelected>>", lambda event: self.reopen())
+        ttk.Label(toolbar, text="Offset:").pack(side=tk.LEFT, padx=(10, 0))
+        offset_entry = ttk.Entry(toolbar, textvariable=self.offset_var, width=12)
+        offset_entry.pack(side=tk.LEFT, padx=(5, 0))
+        offset_entry.bind("<Return>", lambda event: self.jump_to_offset())
+        ttk.Button(toolbar, text="Go", command=self.jump_to_offset, width=4).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Label(toolbar, text="Time (s):").pack(side=tk.LEFT, padx=(10, 0))
+        time_entry = ttk.Entry(toolbar, textvariable=self.time_var, width=12)
+        time_entry.pack(side=tk.LEFT, padx=(5, 0))
+        time_entry.bind("<Return>", lambda event: self.jump_to_time())
+        ttk.Button(toolbar, text="Go", command=self.jump_to_time, width=4).pack(side=tk.LEFT, padx=(5, 0))
+
+        # Page and scrollbar
+        self.text = tk.Text(self.window, font=self.font, wrap=tk.NONE, state=tk.DISABLED)
+        self.text.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.text.tag_config("mark", background="yellow")
+        self.scrollbar = ttk.Scrollbar(self.window, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        self.status_label = ttk.Label(self.window, text="No file", padding="5")
+        self.status_label.grid(row=2, column=0, columnspan=2, sticky=tk.W)
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(1, weight=1)
+
+        self.text.bind("<Configure>", lambda event: self.render())
+        self.text.bind("<MouseWheel>", lambda event: self.scroll_rows(-3 if event.delta > 0 else 3))
+        self.text.bind("<Button-4>", lambda event: self.scroll_rows(-3))
+        self.text.bind("<Button-5>", lambda event: self.scroll_rows(3))
+        self.window.bind("<Prior>", lambda event: self.scroll_rows(-self.rows()))
+        self.window.bind("<Next>", lambda event: self.scroll_rows(self.rows()))
+        self.window.bind("<Up>", lambda event: self.scroll_rows(-1))
+        self.window.bind("<Down>", lambda event: self.scroll_rows(1))
+        self.window.bind("<Control-Home>", lambda event: self.scroll_to(0))
+        self.window.bind("<Control-End>", lambda event: self.scroll_to(self.size()))
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        if path:
+            self.open(path)
+
+    def ask_open(self):
+        path = filedialog.askopenfilename(
+            parent=self.window,
+            filetypes=[("Serial captures", "*.scap"), ("All files", "*.*")]
+        )
+        if path:
+            self.open(path)
+
+    def open(self, path):
+        try:
+            document = open_document(path, RX if self.direction_var.get() == "RX" else TX)
+        except Exception as e:
+            messagebox.showerror("Open Error", f"Failed to open file: {str(e)}", parent=self.window)
+            return
+        if self.document:
+            self.document.close()
+        self.document = document
+        self.path = path
+        self.top = 0
+        self.mark = None
+        self.window.title(f"Hex Viewer - {path}")
+        self.render()
+        self.poll()
+
+    def reopen(self):
+        """Switch the capture direction shown"""
+        if self.path:
+            self.open(self.path)
+
+    def close(self):
+        if self.document:
+            self.document.close()
+            self.document = None
+        self.window.destroy()
+
+    def poll(self):
+        """Refresh the scrollbar and status while a capture is being indexed"""
+        if self.document and self.document.progress() is not None:
+            self.render()
+            self.window.after(200, self.poll)
+        elif self.document:
+            self.render()
+
+    def size(self):
+        return self.document.size() if self.document else 0
+
+    def rows(self):
+        """Rows that fit in the Text widget"""
+        return max(self.text.winfo_height() // self.font.metrics("linespace"), 1)
+
+    def render(self):
+        """Format and show the page starting at self.top"""
+        if not self.document:
+            return
+        size = self.size()
+        rows = self.rows()
+        last_top = max((size + BYTES_PER_ROW - 1) // BYTES_PER_ROW - rows, 0) * BYTES_PER_ROW
+        self.top = min(max(self.top - self.top % BYTES_PER_ROW, 0), last_top)
+        data = self.document.read(self.top, rows * BYTES_PER_ROW)
+
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert(tk.END, format_rows(data, self.top))
+        if self.mark is not None and self.top <= self.mark < self.top + len(data):
+            row, column = divmod(self.mark - self.top, BYTES_PER_ROW)
+            hex_column = HEX_COLUMN + column * 3
+            ascii_column = ASCII_COLUMN + column
+            self.text.tag_add("mark", f"{row + 1}.{hex_column}", f"{row + 1}.{hex_column + 2}")
+            self.text.tag_add("mark", f"{row + 1}.{ascii_column}", f"{row + 1}.{ascii_column + 1}")
+        self.text.config(state=tk.DISABLED)
+
+        if size:
+            self.scrollbar.set(self.top / size, (self.top + len(data)) / size)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        status = self.document.describe(self.top)
+        progress = self.document.progress()
+        if progress is not None:
+            status += f" | Indexing {progress:.0%}"
+        self.status_label.config(text=status)
+
+    def scroll_to(self, offset):
+        self.top = offset
+        self.render()
+
+    def scroll_rows(self, rows):
+        self.scroll_to(self.top + rows * BYTES_PER_ROW)
+
+    def on_scrollbar(self, *args):
+        """Scrollbar command covering the whole file"""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(int(min(max(float(args[1]), 0.0), 1.0) * self.size()))
+        elif args[0] == "scroll":
+            step = self.rows() if args[2] == "pages" else 1
+            self.scroll_rows(int(args[1]) * step)
+
+    def jump_to_offset(self):
+        """Show the byte at the entered offset (decimal, or hex with 0x)"""
+        try:
+            offset = int(self.offset_var.get().strip(), 0)
+        except ValueError:
+            messagebox.showerror("Invalid Offset", "Enter a decimal offset or a hex offset like 0x1f00",
+                                 parent=self.window)
+            return
+        self.jump(offset)
+
+    def jump_to_time(self):
+        """Show the first record at or after the entered seconds since capture start"""
+        if not self.document:
+            return
+        try:
+            seconds = float(self.time_var.get())
+        except ValueError:
+            messagebox.showerror("Invalid Time", "Enter the time in seconds since the capture started",
+                                 parent=self.window)
+            return
+        offset = self.document.offset_at_time(seconds)
+        if offset is None:
+            messagebox.showinfo("No Timestamps", "This file is not a capture and has no timestamps",
+                                parent=self.window)
+            return
+        self.jump(offset)
+
+    def jump(self, offset):
+        if not self.document:
+            return
+        offset = min(max(offset, 0), max(self.size() - 1, 0))
+        self.mark = offset
+        # Put the marked row a few rows below the top for context
+        self.scroll_to(offset - offset % BYTES_PER_ROW - 2 * BYTES_PER_ROW)
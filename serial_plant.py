@@ -0,0 +1,145 @@
+import math
+import random
+
+from serial_commands import PID_FIELDS
+
+G = 9.81
+# Gains the simulated car balances with (the simulated device boots with them)
+DEFAULT_GAINS = {('angle', 'p'): 20.0, ('angle', 'i'): 0.0, ('angle', 'd'): 1.0,
+                 ('speed', 'p'): 2.0, ('speed', 'i'): 0.5, ('speed', 'd'): 0.0,
+                 ('turn', 'p'): 0.5, ('turn', 'i'): 0.0, ('turn', 'd'): 0.0}
+
+
+class BalanceCar:
+    """
+    Simulated two-wheeled balance car: an inverted pendulum on a wheel base,
+    stabilized by the same three PID loops as the firmware.
+
+    The control loop runs every dt seconds of simulated time, as the
+    STM32's timer interrupt does. Each step reads the (noisy) tilt angle,
+    gyro rate and wheel encoder speeds, evaluates the loops and drives the
+    two motors; the pendulum and wheels are then integrated over dt:
+
+        angle loop:  ap * angle + ai * integral(angle) + ad * gyro
+        speed loop:  sp * e + si * integral(e) + sd * de/dt, e = mean wheel speed - target
+        turn loop:   tp * t + ti * integral(t) + td * dt/dt, t = half wheel speed difference - target
+        motors:      left = angle + speed - turn, right = angle + speed + turn (PWM %, clamped)
+
+    The speed loop output is added with a positive sign, as in the usual
+    balance car firmware: to slow down the car has to lean back, which it
+    does by briefly driving the wheels forward. A small center of mass
+    offset makes the car drift unless the speed loop holds it. Beyond
+    fall_angle degrees the car has fallen over: the motors stop and the
+    angle stays there until reset().
+
+    Units are those of the telemetry: degrees, degrees/s, wheel speeds in
+    cm/s and PWM in percent. run() advances the simulation as fast as the
+    CPU allows and returns the telemetry records it produced.
+    """
+
+    def __init__(self, dt=0.005, length=0.1, motor_accel=5.0, motor_drag=2.0, com_offset=1.0,
+                 noise=0.05, fall_angle=40.0, seed=None):
+        self.dt = dt  # Control period, s
+        self.length = length  # Effective pendulum length, m
+        self.motor_accel = motor_accel  # Wheel acceleration at 100% PWM, m/s^2
+        self.motor_drag = motor_drag  # Back-EMF and friction, 1/s
+        self.com_offset = math.radians(com_offset)  # Center of mass ahead of the axle
+        self.noise = noise  # Sensor noise, standard deviation in telemetry units
+        self.fall_angle = fall_angle
+        self.random = random.Random(seed)
+        self.gains = {field: 0.0 for field in PID_FIELDS}
+        self.target_speed = 0.0  # cm/s
+        self.target_turn = 0.0  # cm/s of wheel speed difference / 2
+        self.reset()
+
+    def reset(self, angle=0.0):
+        """Put the car upright (or at angle degrees), at rest, with the loops cleared"""
+        self.time = 0.0
+        self.steps = 0
+        self.theta = math.radians(angle)
+        self.omega = 0.0
+        self.speed = 0.0  # Mean wheel speed, m/s
+        self.spin = 0.0  # Half the wheel speed difference, m/s
+        self.angle_integral = 0.0
+        self.speed_integral = 0.0
+        self.speed_error = 0.0
+        self.turn_integral = 0.0
+        self.turn_error = 0.0
+        self.pwm = (0.0, 0.0)
+        self.fallen = False
+
+    def set_pid(self, values):
+        """Update some or all gains from a {(control, param): value} mapping"""
+        self.gains.update(values)
+
+    def push(self, rate):
+        """Disturb the car, as a nudge would: add rate deg/s to its tilt rate"""
+        self.omega += math.radians(rate)
+
+    def step(self):
+        """Advance one control period"""
+        gains = self.gains
+        noise = self.noise
+        gauss = self.random.gauss
+        dt = self.dt
+        angle = math.degrees(self.theta) + gauss(0.0, noise)
+        gyro = math.degrees(self.omega) + gauss(0.0, noise)
+        left = (self.speed + self.spin) * 100 + gauss(0.0, noise)
+        right = (self.speed - self.spin) * 100 + gauss(0.0, noise)
+        if self.fallen:
+            self.pwm = (0.0, 0.0)
+        else:
+            self.angle_integral = max(min(self.angle_integral + angle * dt, 100.0), -100.0)
+            upright = gains['angle', 'p'] * angle + gains['angle', 'i'] * self.angle_integral + gains['angle', 'd'] * gyro
+
+            error = (left + right) / 2 - self.target_speed
+            self.speed_integral = max(min(self.speed_integral + error * dt, 1000.0), -1000.0)
+            velocity = (gains['speed', 'p'] * error + gains['speed', 'i'] * self.speed_integral
+                        + gains['speed', 'd'] * (error - self.speed_error) / dt)
+            self.speed_error = error
+
+            error = (left - right) / 2 - self.target_turn
+            self.turn_integral = max(min(self.turn_integral + error * dt, 1000.0), -1000.0)
+            turn = (gains['turn', 'p'] * error + gains['turn', 'i'] * self.turn_integral
+                    + gains['turn', 'd'] * (error - self.turn_error) / dt)
+            self.turn_error = error
+
+            self.pwm = (max(min(upright + velocity - turn, 100.0), -100.0),
+                        max(min(upright + velocity + turn, 100.0), -100.0))
+
+        accel_left = self.motor_accel * self.pwm[0] / 100 - self.motor_drag * (self.speed + self.spin)
+        accel_right = self.motor_accel * self.pwm[1] / 100 - self.motor_drag * (self.speed - self.spin)
+        accel = (accel_left + accel_right) / 2
+        self.spin += (accel_left - accel_right) / 2 * dt
+        self.speed += accel * dt
+        if self.fallen:
+            self.speed *= 0.9  # Lying on the floor
+            self.spin *= 0.9
+        else:
+            # Semi-implicit Euler: stable for the stiff upright loop at the control rate
+            alpha = (G * math.sin(self.theta + self.com_offset) - accel * math.cos(self.theta)) / self.length
+            self.omega += alpha * dt
+            self.theta += self.omega * dt
+            if abs(math.degrees(self.theta)) > self.fall_angle:
+                self.fallen = True
+                self.omega = 0.0
+        self.time += dt
+        self.steps += 1
+        return angle, gyro, left, right
+
+    def run(self, seconds, rate=100.0):
+        """
+        Simulate seconds of operation; returns the telemetry as (timestamp_ns,
+        key, values) records, SPEED, ANGLE and PWM at rate records per second
+        """
+        records = []
+        steps = max(int(round(seconds / self.dt)), 1)
+        every = max(int(round(1.0 / (rate * self.dt))), 1)
+        for _ in range(steps):
+            angle, gyro, left, right = self.step()
+            if self.steps % every == 0:  # Counted across calls, so short runs keep the rate
+                timestamp = int(self.time * 1e9)
+                records.append((timestamp, "SPEED", [left, right]))
+                records.append((timestamp, "ANGLE", [angle, gyro]))
+                records.append((timestamp, "PWM", [(self.pwm[0] + self.pwm[1]) / 2]))
+        return records
@@ -0,0 +1,162 @@
+import time
+import tkinter as tk
+
+
+class TelemetryGraph:
+    """
+    Incremental multi-channel renderer for the telemetry canvas.
+
+    Canvas items (axes, zero line, one trace and legend entry per channel and
+    the frame-time readout) are created once per channel layout and
+    afterwards only moved with coords(), so a redraw never creates or
+    deletes items. Redraws are requested rather than performed:
+    request_redraw() coalesces new samples on every channel into a single
+    frame, at most max_fps times per second. When a channel holds more
+    samples than the plot has pixel columns, its trace is reduced to a
+    per-column min/max envelope.
+    """
+
+    def __init__(self, canvas, channels, padding=20, max_fps=30):
+        self.canvas = canvas
+        self.channels = channels  # ChannelRegistry
+        self.padding = padding
+        self.max_fps = max_fps
+        self.pending = None  # after() id of the scheduled frame
+        self.last_frame = 0.0
+        self.frame_time = 0.0  # Smoothed redraw duration in seconds
+        self.frames = 0
+        self.on_frame = None  # Called with every frame's duration in seconds
+
+        self.y_axis = canvas.create_line(0, 0, 0, 0, fill="gray")
+        self.x_axis = canvas.create_line(0, 0, 0, 0, fill="gray")
+        self.zero_line = canvas.create_line(0, 0, 0, 0, fill="green", width=1, dash=(4, 2), state=tk.HIDDEN)
+        self.readout = canvas.create_text(0, 0, anchor=tk.NE, fill="gray", text="")
+        self.traces = {}  # Channel name -> line item
+        self.legends = {}  # Channel name -> text item
+        self.axis_labels = {}  # Axis name -> text item
+        self.rebuild()
+        canvas.bind("<Configure>", lambda event: self.request_redraw())
+
+    def rebuild(self):
+        """Recreate the per-channel items after the channel layout changed"""
+        canvas = self.canvas
+        for item in list(self.traces.values()) + list(self.legends.values()) + list(self.axis_labels.values()):
+            canvas.delete(item)
+        self.traces = {}
+        self.legends = {}
+        self.axis_labels = {}
+        x = self.padding + 4
+        for channel in self.channels:
+            self.traces[channel.name] = canvas.create_line(0, 0, 0, 0, fill=channel.color, width=2, state=tk.HIDDEN)
+            legend = canvas.create_text(x, 2, anchor=tk.NW, fill=channel.color, text=channel.name)
+            self.legends[channel.name] = legend
+            x = canvas.bbox(legend)[2] + 8
+        for axis in self.channels.axes():
+            self.axis_labels[axis] = canvas.create_text(0, 0, anchor=tk.SW, fill="gray", text="")
+        self.request_redraw()
+
+    def request_redraw(self):
+        """Schedule a frame, respecting the frame-rate cap"""
+        if self.pending is not None:
+            return
+        interval = 1.0 / max(self.max_fps, 1)
+        delay = max(0, int((self.last_frame + interval - time.perf_counter()) * 1000))
+        self.pending = self.canvas.after(delay, self.redraw)
+
+    def clear(self):
+        if self.pending is not None:
+            self.canvas.after_cancel(self.pending)
+            self.pending = None
+        for item in [self.zero_line] + list(self.traces.values()):
+            self.canvas.itemconfig(item, state=tk.HIDDEN)
+        for item in list(self.axis_labels.values()) + [self.readout]:
+            self.canvas.itemconfig(item, text="")
+
+    def redraw(self):
+        self.pending = None
+        start = time.perf_counter()
+        self.last_frame = start
+        points = self.draw()
+        elapsed = time.perf_counter() - start
+        self.frames += 1
+        self.frame_time = elapsed if self.frames == 1 else self.frame_time * 0.9 + elapsed * 0.1
+        if self.on_frame:
+            self.on_frame(elapsed)
+        self.canvas.itemconfig(self.readout, text=f"Frame: {self.frame_time * 1000:.2f} ms | {points} pts")
+
+    def draw(self):
+        """Draw every channel; returns the number of samples plotted"""
+        canvas = self.canvas
+        active = [channel for channel in self.channels if len(channel.data)]
+        if not active:
+            return 0
+
+        # Graph dimensions
+        canvas_width = canvas.winfo_width()
+        canvas_height = canvas.winfo_height()
+        if canvas_width <= 1 or canvas_height <= 1:
+            return 0
+        padding = self.padding
+        graph_width = canvas_width - 2 * padding
+        graph_height = canvas_height - 2 * padding
+        bottom = canvas_height - padding
+
+        canvas.coords(self.y_axis, padding, padding, padding, bottom)
+        canvas.coords(self.x_axis, padding, bottom, canvas_width - padding, bottom)
+        canvas.coords(self.readout, canvas_width - 2, 2)
+
+        # Shared time axis; min and max values are tracked incrementally by the ring buffers
+        min_time = min(channel.data.first_time() for channel in active)
+        max_time = max(channel.data.last_time() for channel in active)
+
+        plotted = 0
+        label_y = bottom - 2
+        first_axis = True
+        for axis, channels in self.channels.axes().items():
+            channels = [channel for channel in channels if len(channel.data)]
+            label = self.axis_labels[axis]
+            if not channels:
+                canvas.itemconfig(label, text="")
+                continue
+            min_value = min(channel.data.min() for channel in channels)
+            max_value = max(channel.data.max() for channel in channels)
+
+            # Add some padding to y-axis
+            value_range = max_value - min_value
+            if value_range == 0:
+                value_range = 1
+            min_value -= value_range * 0.1
+            max_value += value_range * 0.1
+
+            # Zero line of the first axis if it's in range
+            if first_axis:
+                if min_value <= 0 <= max_value:
+                    zero_y = bottom - (0 - min_value) / (max_value - min_value) * graph_height
+                    canvas.coords(self.zero_line, padding, zero_y, canvas_width - padding, zero_y)
+                    canvas.itemconfig(self.zero_line, state=tk.NORMAL)
+                else:
+                    canvas.itemconfig(self.zero_line, state=tk.HIDDEN)
+                first_axis = False
+
+            for channel in channels:
+                data = channel.data
+                trace = self.traces[channel.name]
+                if len(data) < 2:
+                    canvas.itemconfig(trace, state=tk.HIDDEN)
+                    continue
+                if len(data) > graph_width:
+                    points = data.to_envelope(padding, bottom, graph_width, graph_height,
+                                              min_time, max_time, min_value, max_value)
+                else:
+                    points = data.to_coords(padding, bottom, graph_width, graph_height,
+                                            min_time, max_time, min_value, max_value)
+                if len(points) < 4:
+                    points = points + points
+                canvas.coords(trace, points)
+                canvas.itemconfig(trace, state=tk.NORMAL)
+                plotted += len(data)
+
+            canvas.coords(label, padding + 4, label_y)
+            canvas.itemconfig(label, text=f"{axis}: {min_value:.2f} .. {max_value:.2f}")
+            label_y -= 14
+        return plotted
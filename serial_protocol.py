@@ -0,0 +1,152 @@
+import struct
+from binascii import crc_hqx
+from collections import deque
+
+# Frame layout (before COBS/SLIP stuffing):
+#   [type: u8] [payload: packed little-endian fields] [crc16: u16 LE]
+# The CRC is CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) over type + payload.
+CRC_INIT = 0xFFFF
+
+# Message type -> (record key, payload layout). Keys match the ASCII record
+# keys so binary and text telemetry feed the same ChannelRegistry records.
+MESSAGE_TYPES = {
+    0x01: ("SPEED", struct.Struct('<ff')),  # left, right
+    0x02: ("ANGLE", struct.Struct('<ff')),  # angle, gyro rate
+    0x03: ("PWM", struct.Struct('<f')),  # PWM output
+    0x10: ("STATE", struct.Struct('<fffff')),  # left, right, angle, gyro, pwm
+}
+
+SLIP_END = 0xC0
+SLIP_ESC = 0xDB
+SLIP_ESC_END = 0xDC
+SLIP_ESC_ESC = 0xDD
+
+
+def crc16(data):
+    return crc_hqx(data, CRC_INIT)
+
+
+def cobs_encode(data):
+    """Consistent Overhead Byte Stuffing: remove all zero bytes from data"""
+    out = bytearray()
+    for part in bytes(data).split(b'\x00'):
+        while len(part) >= 254:
+            out.append(0xFF)
+            out += part[:254]
+            part = part[254:]
+        out.append(len(part) + 1)
+        out += part
+    return bytes(out)
+
+
+def cobs_decode(data):
+    """Inverse of cobs_encode(); raises ValueError on a malformed block"""
+    out = bytearray()
+    pos = 0
+    n = len(data)
+    while pos < n:
+        code = data[pos]
+        end = pos + code
+        if code == 0 or end > n:
+            raise ValueError("Malformed COBS block")
+        out += data[pos + 1:end]
+        pos = end
+        if code < 0xFF and pos < n:
+            out.append(0)
+    return bytes(out)
+
+
+def slip_encode(data):
+    return bytes(data).replace(b'\xdb', b'\xdb\xdd').replace(b'\xc0', b'\xdb\xdc')
+
+
+def slip_decode(data):
+    """Inverse of slip_encode(); raises ValueError on an escape byte not followed by 0xDC or 0xDD"""
+    data = bytes(data)
+    if data.count(b'\xdb') != data.count(b'\xdb\xdc') + data.count(b'\xdb\xdd'):
+        raise ValueError("Invalid SLIP escape")
+    return data.replace(b'\xdb\xdc', b'\xc0').replace(b'\xdb\xdd', b'\xdb')
+
+
+def encode_frame(msg_type, *values, framing="cobs"):
+    """Build a complete, delimited frame for one message (device side / testing)"""
+    body = bytes([msg_type]) + MESSAGE_TYPES[msg_type][1].pack(*values)
+    body += crc16(body).to_bytes(2, 'little')
+    if framing == "slip":
+        return bytes([SLIP_END]) + slip_encode(body) + bytes([SLIP_END])
+    return cobs_encode(body) + b'\x00'
+
+
+class FrameDecoder:
+    """
+    Streaming decoder for COBS- or SLIP-delimited binary telemetry frames.
+
+    Mirrors RecordFramer: feed() takes raw chunks from the reader thread and
+    appends (timestamp, key, values) for every valid frame to the samples
+    deque. Frames that fail to unstuff, have an unknown type or a wrong
+    length count as frame errors; a checksum mismatch counts as a CRC error.
+    """
+
+    def __init__(self, framing="cobs", samples=None, max_frame=1024):
+        if framing not in ("cobs", "slip"):
+            raise ValueError(f"Unknown framing '{framing}'")
+        self.framing = framing
+        self.delimiter = 0x00 if framing == "cobs" else SLIP_END
+        self.unstuff = cobs_decode if framing == "cobs" else slip_decode
+        self.samples = samples if samples is not None else deque(maxlen=100000)
+        self.max_frame = max_frame
+        self.buffer = bytearray()
+        self.scanned = 0
+        self.timestamp = 0
+        self.frames = 0
+        self.frame_errors = 0
+        self.crc_errors = 0
+        self.tap = None  # Also called with every record, e.g. a TelemetryExporter
+
+    def feed(self, data, timestamp=0):
+        self.timestamp = timestamp
+        buf = self.buffer
+        buf += data
+        pos = 0
+        end = buf.find(self.delimiter, self.scanned)
+        while end != -1:
+            if end > pos:  # Back-to-back delimiters are idle fill, not frames
+                self.handle_frame(buf[pos:end])
+            pos = end + 1
+            end = buf.find(self.delimiter, pos)
+        if pos:
+            del buf[:pos]
+        if len(buf) > self.max_frame:
+            self.frame_errors += 1
+            del buf[:]
+        self.scanned = len(buf)
+
+    def handle_frame(self, raw):
+        try:
+            body = self.unstuff(raw)
+        except ValueError:
+            self.frame_errors += 1
+            return
+        if len(body) < 3:
+            self.frame_errors += 1
+            return
+        if crc16(body[:-2]) != int.from_bytes(body[-2:], 'little'):
+            self.crc_errors += 1
+            return
+        message = MESSAGE_TYPES.get(body[0])
+        if message is None or len(body) - 3 != message[1].size:
+            self.frame_errors += 1
+            return
+        key, layout = message
+        self.frames += 1
+        record = (self.timestamp, key, list(layout.unpack_from(body, 1)))
+        self.samples.append(record)
+        if self.tap is not None:
+            self.tap(record)
+
+    def reset(self):
+        del self.buffer[:]
+        self.scanned = 0
+
+    def counters(self):
+        return f"Frames: {self.frames} | CRC errors: {self.crc_errors} | Frame errors: {self.frame_errors}"
@@ -0,0 +1,116 @@
+import threading
+
+
+class SerialReader:
+    """
+    Background reader thread for a serial port. AsyncSerial uses it where the
+    port cannot be registered with the event loop (Windows).
+
+    Instead of polling in_waiting in a sleep loop, the reader thread blocks
+    inside serial.read() until at least one byte arrives (pyserial waits on
+    select() on POSIX and on an overlapped event on Windows), then drains
+    whatever else the driver has already buffered. An idle port therefore
+    costs one wake-up per read_timeout, and new data is delivered as soon as
+    the OS signals it.
+    """
+
+    def __init__(self, serial_port, on_data, on_error=None, read_timeout=0.1, chunk_size=65536):
+        self.serial_port = serial_port
+        self.on_data = on_data  # Called from the reader thread with each chunk
+        self.on_error = on_error  # Called from the reader thread on read failure
+        self.read_timeout = read_timeout
+        self.chunk_size = chunk_size
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """Start the reader thread"""
+        # The timeout only bounds how long stop() may take to be noticed
+        self.serial_port.timeout = self.read_timeout
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        """Stop the reader thread and wait for it to exit"""
+        self.running = False
+        # Wake up a read that is currently blocked (supported by pyserial on POSIX and Windows)
+        cancel_read = getattr(self.serial_port, "cancel_read", None)
+        if cancel_read:
+            try:
+                cancel_read()
+            except Exception:
+                pass
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        self.thread = None
+
+    def is_alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def run(self):
+        port = self.serial_port
+        while self.running:
+            try:
+                # Blocks until the first byte arrives or read_timeout expires
+                waiting = port.in_waiting
+                data = port.read(min(max(waiting, 1), self.chunk_size))
+                if data:
+                    waiting = port.in_waiting
+                    if waiting:
+                        data += port.read(min(waiting, self.chunk_size))
+            except Exception as e:
+                if self.running and self.on_error:
+                    self.on_error(e)
+                break
+            if data and self.running:
+                self.on_data(data)
+        self.running = False
+
+
+class ChunkBuffer:
+    """
+    Thread-safe hand-off of received chunks from the reader thread to the UI.
+
+    The reader appends raw chunks; the UI periodically drains everything in
+    one go so that a burst of thousands of reads costs a single UI update.
+    The arrival timestamp of the oldest undrained chunk is kept so the UI can
+    measure how long data waited before it was displayed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.chunks = []
+        self.size = 0
+        self.first_time = 0  # Arrival timestamp of the oldest undrained chunk
+
+    def append(self, data, timestamp=0):
+        with self.lock:
+            if not self.chunks:
+                self.first_time = timestamp
+            self.chunks.append(data)
+            self.size += len(data)
+
+    def drain(self):
+        """
+        Return (data, chunk_count, first_timestamp) with everything received
+        since the last drain; first_timestamp is that of the oldest chunk
+        """
+        with self.lock:
+            chunks = self.chunks
+            first_time = self.first_time
+            self.chunks = []
+            self.size = 0
+        if not chunks:
+            return b"", 0, 0
+        if len(chunks) == 1:
+            return chunks[0], 1, first_time
+        return b"".join(chunks), len(chunks), first_time
+
+    def clear(self):
+        with self.lock:
+            self.chunks = []
+            self.size = 0
+
+    def __len__(self):
+        return self.size
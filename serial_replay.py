@@ -0,0 +1,185 @@
+import argparse
+import itertools
+import os
+import select
+import sys
+import time
+
+from serial_capture import iter_capture, RX, TX
+
+try:
+    import tty
+except ImportError:  # Windows has no pseudo-terminals
+    tty = None
+
+
+class CaptureReplay:
+    """
+    Replays capture files into the master side of a pseudo-terminal.
+
+    The slave side (port_name, e.g. /dev/pts/7) behaves like a serial port,
+    so the debugger, the CLI or any other consumer can open it and receive
+    the captured stream. Records are written at their original spacing
+    divided by speed; speed=0 writes as fast as the consumer reads, in
+    chunk_size writes, which makes the replay a stress source for the
+    receive path. Records that fall due while the consumer is not keeping
+    up are merged into one write. Whatever the consumer sends is read and
+    discarded so it never blocks on a full pty buffer.
+    """
+
+    def __init__(self, paths, speed=1.0, directions=(RX,), repeat=1, chunk_size=65536):
+        self.paths = paths
+        self.speed = speed  # Time scale; 0 replays at maximum speed
+        self.directions = directions
+        self.repeat = repeat  # Passes over the capture; 0 repeats forever
+        self.chunk_size = chunk_size
+        self.master = None
+        self.slave = None  # Kept open so writes never fail before a consumer attaches
+        self.port_name = None
+        self.running = False
+        self.records = 0
+        self.bytes_out = 0
+        self.bytes_in = 0  # Sent by the consumer and discarded
+        self.elapsed = 0.0
+
+    def open(self):
+        """Create the pty pair and return the port name for consumers"""
+        if tty is None or not hasattr(os, "openpty"):
+            raise OSError("Pseudo-terminals are not supported on this platform")
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)  # No echo or newline translation
+        os.set_blocking(self.master, False)
+        self.port_name = os.ttyname(self.slave)
+        return self.port_name
+
+    def close(self):
+        for fd in (self.master, self.slave):
+            if fd is not None:
+                os.close(fd)
+        self.master = self.slave = None
+
+    def stop(self):
+        """Ask run() to return (any thread)"""
+        self.running = False
+
+    def timeline(self):
+        """Yield (offset_ns, data) for every selected record, relative to the first"""
+        passes = itertools.count() if self.repeat == 0 else range(self.repeat)
+        shift = 0
+        for _ in passes:
+            first = last = None
+            for path in self.paths:
+                for timestamp, direction, data in iter_capture(path):
+                    if direction not in self.directions:
+                        continue
+                    if first is None:
+                        first = timestamp
+                    last = timestamp
+                    yield shift + timestamp - first, data
+            if first is None:
+                return  # Nothing to replay
+            shift += last - first
+
+    def run(self):
+        """Replay until the timeline ends or stop() is called"""
+        self.running = True
+        records = self.timeline()
+        pending = bytearray()
+        record = next(records, None)
+        start = time.monotonic_ns()
+        try:
+            while self.running and (record is not None or pending):
+                now = time.monotonic_ns() - start
+                # Move every record that is due into the output buffer
+                while record is not None and len(pending) < self.chunk_size and (
+                        not self.speed or record[0] / self.speed <= now):
+                    pending += record[1]
+                    self.records += 1
+                    record = next(records, None)
+                timeout = 0.1
+                if not pending and record is not None:
+                    timeout = min(max(record[0] / self.speed - now, 0) / 1e9, timeout)
+                readable, writable, _ = select.select([self.master], [self.master] if pending else [], [], timeout)
+                if readable:
+                    self.discard_input()
+                if writable:
+                    try:
+                        n = os.write(self.master, pending)
+                    except (BlockingIOError, InterruptedError):
+                        continue
+                    del pending[:n]
+                    self.bytes_out += n
+        finally:
+            self.elapsed = (time.monotonic_ns() - start) / 1e9
+            self.running = False
+
+    def discard_input(self):
+        try:
+            self.bytes_in += len(os.read(self.master, 65536))
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            pass  # EIO while no consumer has the port open
+
+    def status(self):
+        rate = self.bytes_out / self.elapsed if self.elapsed > 0 else 0.0
+        return (f"Replayed {self.bytes_out} bytes in {self.records} records in {self.elapsed:.2f} s "
+                f"({rate / 1024:.1f} KB/s); discarded {self.bytes_in} bytes from the consumer")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay serial capture files through a pseudo-terminal")
+    parser.add_argument("paths", nargs="+", help="Capture files, replayed in the given order")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Time scale: 1 = original timing, 2 = twice as fast, 0 = as fast as possible (default: 1)")
+    parser.add_argument("--max-speed", action="store_true", help="Replay as fast as the consumer reads (same as --speed 0)")
+    parser.add_argument("--direction", default="rx", choices=["rx", "tx", "both"],
+                        help="Which captured direction to replay (default: rx, what the device sent)")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of passes over the capture, 0 = forever (default: 1)")
+    parser.add_argument("--link", metavar="PATH", help="Also expose the port under this path (symlink)")
+    parser.add_argument("--no-wait", action="store_true", help="Start immediately instead of waiting for Enter")
+
+    args = parser.parse_args()
+
+    directions = {"rx": (RX,), "tx": (TX,), "both": (RX, TX)}[args.direction]
+    replay = CaptureReplay(args.paths, speed=0 if args.max_speed else args.speed,
+                           directions=directions, repeat=args.repeat)
+    try:
+        port_name = replay.open()
+    except OSError as e:
+        print(f"Failed to open pseudo-terminal: {e}")
+        return
+    if args.link:
+        try:
+            if os.path.islink(args.link):
+                os.remove(args.link)
+            os.symlink(port_name, args.link)
+            port_name = f"{args.link} -> {port_name}"
+        except OSError as e:
+            print(f"Failed to create {args.link}: {e}")
+            args.link = None
+
+    print(f"Replay port: {port_name}")
+    try:
+        if not args.no_wait:
+            print("Open the port in the consumer, then press Enter to start the replay")
+            try:
+                input()
+            except EOFError:
+                pass
+        mode = "maximum speed" if not replay.speed else f"{replay.speed:g}x original timing"
+        print(f"Replaying at {mode}. Press Ctrl+C to stop.")
+        replay.run()
+    except KeyboardInterrupt:
+        print("\nInterrupted by user")
+    except (OSError, ValueError) as e:
+        print(f"Replay error: {e}", file=sys.stderr)
+    finally:
+        replay.close()
+        if args.link:
+            os.remove(args.link)
+        print(replay.status())
+
+
+if __name__ == "__main__":
+    main()
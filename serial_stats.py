@@ -0,0 +1,128 @@
+import time
+
+
+class Histogram:
+    """
+    Fixed-memory histogram of non-negative integers (e.g. nanoseconds).
+
+    Buckets are logarithmic: every power of two is split into 2**sub_bits
+    linear steps, so add() is O(1), memory is a few hundred counters and
+    percentiles are accurate to within 1/2**sub_bits of the value.
+    """
+
+    def __init__(self, sub_bits=3, max_bits=48):
+        self.sub_bits = sub_bits
+        self.counts = [0] * ((max_bits - sub_bits) << sub_bits)
+        self.count = 0
+        self.max = 0
+
+    def index(self, value):
+        shift = max(value.bit_length() - self.sub_bits - 1, 0)
+        return min((shift << self.sub_bits) + (value >> shift), len(self.counts) - 1)
+
+    def lower_bound(self, index):
+        shift = max((index >> self.sub_bits) - 1, 0)
+        return (index - (shift << self.sub_bits)) << shift
+
+    def add(self, value):
+        value = max(int(value), 0)
+        self.counts[self.index(value)] += 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """Approximate q-th percentile (0-100); 0 when empty"""
+        if not self.count:
+            return 0
+        if q >= 100:
+            return self.max
+        rank = q / 100 * (self.count - 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen > rank:
+                # Middle of the bucket, but never beyond the largest value seen
+                return min((self.lower_bound(index) + self.lower_bound(index + 1)) / 2, self.max)
+        return self.max
+
+    def buckets(self):
+        """(lower bound, count) of every non-empty bucket, for plotting"""
+        return [(self.lower_bound(index), count) for index, count in enumerate(self.counts) if count]
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.max = 0
+
+
+class StreamStats:
+    """
+    Receive path instrumentation shared by the GUI and the CLI.
+
+    The I/O thread calls on_chunk() for every received chunk; the consumer
+    calls on_consumed() with the chunk's monotonic_ns arrival time once the
+    data has been displayed or printed, on_queue() with the depth of its
+    hand-off queue and on_redraw() with graph frame times. report() turns
+    the cumulative counters into rates and percentiles since the previous
+    report and starts a new interval; the *_total histograms keep the whole
+    session for the summary.
+    """
+
+    def __init__(self, queue_unit="B"):
+        self.start = time.monotonic_ns()
+        self.bytes = 0
+        self.chunks = 0
+        self.latency = Histogram()  # Arrival -> displayed, ns, current interval
+        self.latency_total = Histogram()
+        self.redraw = Histogram()  # Graph frame time, ns, current interval
+        self.max_queue = 0  # Deepest hand-off queue in the current interval
+        self.queue_unit = queue_unit
+        self.last_report = self.start
+        self.last_bytes = 0
+        self.last_chunks = 0
+
+    def on_chunk(self, size):
+        self.bytes += size
+        self.chunks += 1
+
+    def on_consumed(self, arrival, now=None):
+        latency = (now or time.monotonic_ns()) - arrival
+        self.latency.add(latency)
+        self.latency_total.add(latency)
+
+    def on_queue(self, depth):
+        if depth > self.max_queue:
+            self.max_queue = depth
+
+    def on_redraw(self, seconds):
+        self.redraw.add(seconds * 1e9)
+
+    def report(self):
+        """One-line summary of the interval since the previous report"""
+        now = time.monotonic_ns()
+        elapsed = max(now - self.last_report, 1) / 1e9
+        byte_rate = (self.bytes - self.last_bytes) / elapsed
+        chunk_rate = (self.chunks - self.last_chunks) / elapsed
+        text = (f"RX {byte_rate / 1024:.1f} KB/s | {chunk_rate:.0f} chunks/s | Queue max {self.max_queue} {self.queue_unit}"
+                f" | Latency p50 {self.latency.percentile(50) / 1e6:.1f} ms"
+                f" p99 {self.latency.percentile(99) / 1e6:.1f} ms")
+        if self.redraw.count:
+            text += (f" | Redraw p50 {self.redraw.percentile(50) / 1e6:.1f} ms"
+                     f" p99 {self.redraw.percentile(99) / 1e6:.1f} ms")
+        self.last_report = now
+        self.last_bytes = self.bytes
+        self.last_chunks = self.chunks
+        self.latency.reset()
+        self.redraw.reset()
+        self.max_queue = 0
+        return text
+
+    def summary(self):
+        """Totals for the whole session"""
+        elapsed = max(time.monotonic_ns() - self.start, 1) / 1e9
+        latency = self.latency_total
+        return (f"{self.bytes} bytes in {self.chunks} chunks over {elapsed:.1f} s"
+                f" ({self.bytes / elapsed / 1024:.1f} KB/s)"
+                f" | Latency p50 {latency.percentile(50) / 1e6:.2f} ms p90 {latency.percentile(90) / 1e6:.2f} ms"
+                f" p99 {latency.percentile(99) / 1e6:.2f} ms max {latency.max / 1e6:.2f} ms")
@@ -0,0 +1,291 @@
+import asyncio
+import csv
+import itertools
+import math
+import random
+
+from serial_analysis import RollingStats
+from serial_commands import PID_FIELDS, PID_CODES, PID_FIELDS_BY_CODE, format_set_pid
+from serial_plant import BalanceCar
+from serial_protocol import FrameDecoder
+from serial_telemetry import RecordFramer
+
+def parse_ranges(spec):
+    """
+    Parse a sweep spec into {(control, param): (low, high, count)}; raises
+    ValueError. Entries are separated by ';' or ',' and written code=value
+    (fixed), code=low:high or code=low:high:count, with the short codes of
+    live updates (ap, ai, ad, sp, ..., td). Example:
+        ap=10:40:4;ad=0.5:2:4;sp=2
+    A count of None means the grid's default number of steps.
+    """
+    ranges = {}
+    for entry in spec.replace(',', ';').split(';'):
+        entry = entry.strip()
+        if not entry:
+            continue
+        code, sep, text = entry.partition('=')
+        field = PID_FIELDS_BY_CODE.get(code.strip().lower())
+        if not sep or field is None:
+            raise ValueError(f"Invalid sweep entry '{entry}' (expected e.g. ap=10:40:4)")
+        parts = text.split(':')
+        try:
+            values = [float(part) for part in parts[:2]]
+            count = int(parts[2]) if len(parts) == 3 else None
+        except ValueError:
+            raise ValueError(f"Invalid number in '{entry}'")
+        if len(parts) > 3 or (count is not None and count < 1):
+            raise ValueError(f"Invalid range '{entry}' (expected low:high:count)")
+        if len(values) == 1:
+            ranges[field] = (values[0], values[0], 1)
+        else:
+            ranges[field] = (values[0], values[1], count)
+    if not ranges:
+        raise ValueError("No sweep parameters given")
+    return ranges
+
+
+def grid_candidates(base, ranges, steps=3):
+    """Every combination of evenly spaced values; fields without a range keep their base value"""
+    axes = []
+    for field, (low, high, count) in ranges.items():
+        count = 1 if low == high else count or steps
+        if count == 1:
+            axes.append([(field, low)])
+        else:
+            axes.append([(field, low + (high - low) * index / (count - 1)) for index in range(count)])
+    for combination in itertools.product(*axes):
+        values = dict(base)
+        values.update(combination)
+        yield values
+
+
+def random_candidates(base, ranges, count, seed=None):
+    """count sets drawn uniformly from the ranges; fields without a range keep their base value"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        values = dict(base)
+        for field, (low, high, _) in ranges.items():
+            values[field] = rng.uniform(low, high)
+        yield values
+
+
+def round_gains(values):
+    """Gains at the resolution of the PID labels, so they read well in commands and tables"""
+    return {field: round(value, 2) for field, value in values.items()}
+
+
+class SweepResult:
+    """Outcome of one parameter set; a lower score is better and a failed set scores inf"""
+
+    def __init__(self, index, values):
+        self.index = index
+        self.values = values
+        self.score = math.inf
+        self.rms = math.inf  # RMS error of the scored channels against the setpoint
+        self.std = 0.0
+        self.peak = 0.0  # Largest |error| seen
+        self.samples = 0
+        self.status = "Not run"
+
+    @property
+    def ok(self):
+        return self.status == "OK"
+
+    def tag(self):
+        return " ".join(f"{PID_CODES[field]}={self.values[field]:g}" for field in PID_FIELDS)
+
+    def describe(self):
+        if not self.ok:
+            return f"#{self.index} {self.tag()}: {self.status}"
+        return (f"#{self.index} {self.tag()}: score {self.score:.3f} (RMS {self.rms:.3f}, "
+                f"std {self.std:.3f}, peak {self.peak:.3f}, {self.samples} samples)")
+
+
+class PlantTarget:
+    """
+    Runs sweep candidates against the simulated BalanceCar, in simulated
+    time: a candidate takes a few milliseconds instead of settle + window
+    seconds. Every candidate starts from an upright car at rest; the
+    window begins with a push of push deg/s, so that the recorded response
+    shows how the gains recover from a disturbance.
+    """
+
+    def __init__(self, car=None, rate=100.0, push=30.0):
+        self.car = car or BalanceCar()
+        self.rate = rate  # Telemetry records per second
+        self.push = push
+
+    async def start(self):
+        pass
+
+    async def apply(self, values):
+        self.car.set_pid(values)
+        self.car.reset()
+
+    async def record(self, settle, window):
+        self.car.run(settle, self.rate)
+        self.car.push(self.push)
+        records = self.car.run(window, self.rate)
+        await asyncio.sleep(0)  # Let stop() and other tasks in between candidates
+        return records
+
+    async def restore(self, values):
+        self.car.set_pid(values)
+
+
+class DeviceTarget:
+    """
+    Runs sweep candidates on the real car through a CommandEngine.
+
+    start() sends START_SPEED once; each candidate is sent with SET_PID and
+    must be acknowledged with OK. Telemetry is only parsed while a window is
+    being recorded: the receive path passes every chunk to feed() (on the
+    I/O thread), which is a no-op otherwise.
+    """
+
+    def __init__(self, commands, keys=("SPEED", "ANGLE"), binary=None):
+        self.commands = commands
+        self.decoder = FrameDecoder(binary) if binary else RecordFramer(keys)
+        self.recording = False
+
+    def feed(self, data, timestamp):
+        if self.recording:
+            self.decoder.feed(data, timestamp)
+
+    async def start(self):
+        self.commands.write(b"START_SPEED\n")
+
+    async def apply(self, values):
+        await self.commands.request(format_set_pid(values), ("OK",))
+
+    async def record(self, settle, window):
+        await asyncio.sleep(settle)
+        self.decoder.reset()
+        self.decoder.samples.clear()
+        self.recording = True
+        try:
+            await asyncio.sleep(window)
+        finally:
+            self.recording = False
+        return list(self.decoder.samples)
+
+    async def restore(self, values):
+        await self.commands.request(format_set_pid(values), ("OK",))
+
+
+class PidSweep:
+    """
+    Batch evaluation of PID parameter sets.
+
+    run() takes each candidate in turn: the target applies it (SET_PID on a
+    device, new gains on the simulated car), waits settle seconds and
+    records window seconds of telemetry. The window is scored from the
+    channels in score_channels (names from the records layout, e.g. the
+    wheel speeds): the score is their mean RMS error against setpoint, from
+    RollingStats. A set fails if no telemetry arrived, if the device did
+    not acknowledge it, or if |fall_channel| exceeded fall_limit (the car
+    fell over); failed sets score inf. After the last candidate, or when
+    stopped, the target gets the base parameters back.
+    """
+
+    def __init__(self, candidates, base, records, settle=2.0, window=5.0, score_channels=("left", "right"),
+                 setpoint=0.0, fall_channel="angle", fall_limit=30.0):
+        self.candidates = [round_gains(values) for values in candidates]
+        self.base = base  # Parameters restored afterwards
+        self.settle = settle
+        self.window = window
+        self.setpoint = setpoint
+        self.fall_limit = fall_limit
+        self.sources = []  # (record key, value index) of each scored channel
+        self.fall_source = None
+        for key, names in records.items():
+            for index, name in enumerate(names):
+                if name in score_channels:
+                    self.sources.append((key, index))
+                if name == fall_channel:
+                    self.fall_source = (key, index)
+        if not self.sources:
+            raise ValueError(f"None of the score channels {', '.join(score_channels)} is in the telemetry layout")
+        self.results = []
+        self.running = False
+
+    def stop(self):
+        """Finish after the current candidate (any thread)"""
+        self.running = False
+
+    async def run(self, target, on_result=None):
+        """Evaluate every candidate; on_result is called with each SweepResult as it completes"""
+        self.running = True
+        try:
+            await target.start()
+            for index, values in enumerate(self.candidates, 1):
+                if not self.running:
+                    break
+                result = SweepResult(index, values)
+                try:
+                    await target.apply(values)
+                except TimeoutError:
+                    result.status = "No reply to SET_PID"
+                except Exception as e:
+                    result.status = f"SET_PID failed: {e}"
+                else:
+                    self.score(result, await target.record(self.settle, self.window))
+                self.results.append(result)
+                if on_result:
+                    on_result(result)
+        finally:
+            self.running = False
+            try:
+                await target.restore(self.base)
+            except Exception:
+                pass  # Reported by the caller's connection handling
+        return self.ranked()
+
+    def score(self, result, records):
+        stats = [RollingStats(max(len(records), 2)) for _ in self.sources]
+        fall = 0.0
+        for _, key, values in records:
+            for stat, (source_key, index) in zip(stats, self.sources):
+                if key == source_key and index < len(values):
+                    stat.add(values[index], self.setpoint)
+            if self.fall_source and key == self.fall_source[0] and self.fall_source[1] < len(values):
+                fall = max(fall, abs(values[self.fall_source[1]]))
+        result.samples = min(stat.count for stat in stats)
+        if not result.samples:
+            result.status = "No telemetry"
+            return
+        if self.fall_source and fall > self.fall_limit:
+            result.status = f"Fell over ({fall:.0f} deg)"
+            return
+        result.rms = sum(stat.rms_error for stat in stats) / len(stats)
+        result.std = sum(stat.std for stat in stats) / len(stats)
+        result.peak = max(max(abs(stat.max - self.setpoint), abs(stat.min - self.setpoint)) for stat in stats)
+        result.score = result.rms
+        result.status = "OK"
+
+    def ranked(self):
+        """Results best first; failed sets last, in run order"""
+        return sorted(self.results, key=lambda result: (result.score, result.index))
+
+    def save(self, path):
+        """Write the results, best first, as CSV"""
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["rank", "run"] + [PID_CODES[field] for field in PID_FIELDS]
+                            + ["score", "rms", "std", "peak", "samples", "status"])
+            for rank, result in enumerate(self.ranked(), 1):
+                writer.writerow([rank, result.index] + [result.values[field] for field in PID_FIELDS]
+                                + [f"{result.score:.6g}", f"{result.rms:.6g}", f"{result.std:.6g}",
+                                   f"{result.peak:.6g}", result.samples, result.status])
+
+
+def format_table(results, limit=None):
+    """Text table of results (already in the wanted order) for the console"""
+    lines = ["Rank  Run  " + " ".join(f"{PID_CODES[field]:>6}" for field in PID_FIELDS)
+             + "     Score  Status"]
+    for rank, result in enumerate(results[:limit] if limit else results, 1):
+        score = f"{result.score:9.3f}" if result.ok else "        -"
+        lines.append(f"{rank:>4} {result.index:>4}  " + " ".join(f"{result.values[field]:>6g}" for field in PID_FIELDS)
+                     + f" {score}  {result.status}")
+    return lines
@@ -0,0 +1,341 @@
+from array import array
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to array-based buffers
+    np = None
+
+
+class LineFramer:
+    """
+    Incremental newline framer over a reusable bytearray.
+
+    Chunks from the reader thread are appended with feed(); every complete
+    line is passed to handle_line() as (buffer, start, end) offsets into the
+    internal buffer, so no per-line bytes or str objects are created unless
+    a subclass needs them. Partial lines are carried over to the next feed().
+    """
+
+    def __init__(self, max_line=4096):
+        self.buffer = bytearray()
+        self.max_line = max_line  # Longest line kept before the partial is discarded
+        self.scanned = 0  # Bytes of the partial line already searched for a newline
+        self.lines = 0
+        self.overflows = 0
+
+    def feed(self, data):
+        buf = self.buffer
+        buf += data
+        pos = 0
+        end = buf.find(b'\n', self.scanned)
+        while end != -1:
+            self.handle_line(buf, pos, end)
+            self.lines += 1
+            pos = end + 1
+            end = buf.find(b'\n', pos)
+        if pos:
+            del buf[:pos]
+        if len(buf) > self.max_line:
+            # No newline in sight: drop the garbage instead of growing forever
+            self.overflows += 1
+            del buf[:]
+        self.scanned = len(buf)
+
+    def handle_line(self, buf, start, end):
+        """Process buf[start:end] (without the trailing newline)"""
+        pass
+
+    def reset(self):
+        del self.buffer[:]
+        self.scanned = 0
+
+
+class RecordFramer(LineFramer):
+    """
+    Parses "KEY:v1,v2,..." telemetry records out of the receive stream.
+
+    Runs on the reader thread. Only lines starting with one of the configured
+    keys are parsed; each record is appended to the samples deque as
+    (timestamp, key, values), where timestamp is the one passed to feed()
+    for the chunk that completed the line. The UI drains the deque on its
+    own schedule.
+    """
+
+    def __init__(self, keys=("SPEED",), samples=None, max_line=4096):
+        super().__init__(max_line)
+        self.samples = samples if samples is not None else deque(maxlen=100000)
+        self.errors = 0
+        self.timestamp = 0
+        self.tap = None  # Also called with every record, e.g. a TelemetryExporter
+        self.set_keys(keys)
+
+    def set_keys(self, keys):
+        # Replaced as a whole so the reader thread never sees a half-built list
+        self.prefixes = [(key.encode('ascii') + b':', key) for key in keys]
+
+    def feed(self, data, timestamp=0):
+        self.timestamp = timestamp
+        super().feed(data)
+
+    def handle_line(self, buf, start, end):
+        for prefix, key in self.prefixes:
+            if buf.startswith(prefix, start, end):
+                break
+        else:
+            return
+        pos = start + len(prefix)
+        values = []
+        try:
+            # float() accepts bytes directly and ignores surrounding whitespace such as '\r'
+            comma = buf.find(b',', pos, end)
+            while comma != -1:
+                values.append(float(buf[pos:comma]))
+                pos = comma + 1
+                comma = buf.find(b',', pos, end)
+            values.append(float(buf[pos:end]))
+        except ValueError:
+            self.errors += 1
+            return
+        record = (self.timestamp, key, values)
+        self.samples.append(record)
+        if self.tap is not None:
+            self.tap(record)
+
+    def counters(self):
+        return f"Lines: {self.lines} | Parse errors: {self.errors} | Overflows: {self.overflows}"
+
+
+class RingBuffer:
+    """
+    Fixed-capacity ring buffer of (timestamp, value) samples.
+
+    Storage is preallocated (NumPy arrays when available, array('d')
+    otherwise), so pushing a sample never allocates or shifts memory. The
+    minimum and maximum of the window are tracked incrementally with
+    monotonic deques, and to_coords() maps the whole window to canvas
+    coordinates in one vectorized step.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        if np is not None:
+            self.times = np.zeros(capacity)
+            self.values = np.zeros(capacity)
+        else:
+            self.times = array('d', bytes(8 * capacity))
+            self.values = array('d', bytes(8 * capacity))
+        self.head = 0  # Next slot to write
+        self.count = 0
+        self.seq = 0  # Total samples ever pushed
+        self.min_candidates = deque()  # (seq, value), values increasing
+        self.max_candidates = deque()  # (seq, value), values decreasing
+
+    def __len__(self):
+        return self.count
+
+    def push(self, t, value):
+        self.times[self.head] = t
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        seq = self.seq
+        self.seq += 1
+
+        # Sliding-window extremes: amortised O(1) per sample
+        oldest = seq - self.capacity
+        mins = self.min_candidates
+        while mins and mins[-1][1] >= value:
+            mins.pop()
+        mins.append((seq, value))
+        if mins[0][0] <= oldest:
+            mins.popleft()
+        maxs = self.max_candidates
+        while maxs and maxs[-1][1] <= value:
+            maxs.pop()
+        maxs.append((seq, value))
+        if maxs[0][0] <= oldest:
+            maxs.popleft()
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+        self.seq = 0
+        self.min_candidates.clear()
+        self.max_candidates.clear()
+
+    def min(self):
+        return self.min_candidates[0][1] if self.count else 0.0
+
+    def max(self):
+        return self.max_candidates[0][1] if self.count else 0.0
+
+    def first_time(self):
+        return self.times[(self.head - self.count) % self.capacity] if self.count else 0.0
+
+    def last_time(self):
+        return self.times[(self.head - 1) % self.capacity] if self.count else 0.0
+
+    def last(self):
+        return self.values[(self.head - 1) % self.capacity] if self.count else 0.0
+
+    def ordered(self, column):
+        """Samples of one column (self.times or self.values), oldest first"""
+        start = (self.head - self.count) % self.capacity
+        end = start + self.count
+        if end <= self.capacity:
+            return column[start:end]
+        if np is not None:
+            return np.concatenate((column[start:], column[:end - self.capacity]))
+        return column[start:] + column[:end - self.capacity]
+
+    def to_coords(self, x0, y0, width, height, t_min, t_max, v_min, v_max):
+        """
+        Map the window to a flat [x0, y0, x1, y1, ...] list for Canvas.coords(),
+        with time growing to the right and values growing upwards from y0
+        """
+        sx = width / ((t_max - t_min) or 1)
+        sy = height / ((v_max - v_min) or 1)
+        times = self.ordered(self.times)
+        values = self.ordered(self.values)
+        if np is not None:
+            coords = np.empty(2 * self.count)
+            coords[0::2] = (times - t_min) * sx + x0
+            coords[1::2] = y0 - (values - v_min) * sy
+            return coords.tolist()
+        coords = [0.0] * (2 * self.count)
+        coords[0::2] = [(t - t_min) * sx + x0 for t in times]
+        coords[1::2] = [y0 - (v - v_min) * sy for v in values]
+        return coords
+
+    def to_envelope(self, x0, y0, width, height, t_min, t_max, v_min, v_max):
+        """
+        Like to_coords(), but reduces the samples to a min/max envelope with one
+        vertical segment per pixel column. Used when there are more samples
+        than columns; the returned polyline zig-zags between each column's
+        extremes, so spikes stay visible whatever the decimation factor.
+        """
+        columns = max(int(width), 1)
+        sx = columns / ((t_max - t_min) or 1)
+        sy = height / ((v_max - v_min) or 1)
+        times = self.ordered(self.times)
+        values = self.ordered(self.values)
+        if np is not None:
+            cols = np.minimum(((times - t_min) * sx).astype(np.int64), columns - 1)
+            # Timestamps are monotonic, so each column is one contiguous run
+            starts = np.flatnonzero(np.concatenate(([True], cols[1:] != cols[:-1])))
+            lows = np.minimum.reduceat(values, starts)
+            highs = np.maximum.reduceat(values, starts)
+            xs = cols[starts] + x0
+            coords = np.empty(4 * len(starts))
+            coords[0::4] = xs
+            coords[1::4] = y0 - (lows - v_min) * sy
+            coords[2::4] = xs
+            coords[3::4] = y0 - (highs - v_min) * sy
+            return coords.tolist()
+        coords = []
+        current = None
+        low = high = 0.0
+        for t, v in zip(times, values):
+            col = min(int((t - t_min) * sx), columns - 1)
+            if col != current:
+                if current is not None:
+                    x = current + x0
+                    coords += (x, y0 - (low - v_min) * sy, x, y0 - (high - v_min) * sy)
+                current = col
+                low = high = v
+            elif v < low:
+                low = v
+            elif v > high:
+                high = v
+        if current is not None:
+            x = current + x0
+            coords += (x, y0 - (low - v_min) * sy, x, y0 - (high - v_min) * sy)
+        return coords
+
+
+class Channel:
+    """A named telemetry channel with its own sample buffer, color and y-axis"""
+
+    def __init__(self, name, color, axis, capacity):
+        self.name = name
+        self.color = color
+        self.axis = axis  # Channels sharing an axis share a y scale
+        self.data = RingBuffer(capacity)
+
+
+class ChannelRegistry:
+    """
+    Registry of telemetry channels and of the records that fill them.
+
+    The layout is configured with a spec such as
+    "SPEED:left,right;ANGLE:angle,gyro;PWM:pwm": every KEY:v1,v2,... record
+    fills the listed channels positionally. A channel may choose its axis
+    with "name/axis"; otherwise it uses an axis named after its record key.
+    """
+
+    DEFAULT_SPEC = "SPEED:left,right;ANGLE:angle,gyro;PWM:pwm"
+    PALETTE = ("blue", "red", "green", "orange", "purple", "brown", "magenta", "cyan", "gray40")
+
+    def __init__(self, spec=DEFAULT_SPEC, capacity=100):
+        self.capacity = capacity
+        self.channels = {}  # Channel name -> Channel, in spec order
+        self.records = {}  # Record key -> list of channel names
+        self.configure(spec)
+
+    def configure(self, spec):
+        """Replace the layout; raises ValueError for a malformed spec"""
+        channels = {}
+        records = {}
+        for entry in spec.split(';'):
+            entry = entry.strip()
+            if not entry:
+                continue
+            key, sep, names = entry.partition(':')
+            key = key.strip()
+            if not sep or not key or not key.isascii():
+                raise ValueError(f"Invalid channel record '{entry}' (expected KEY:name1,name2,...)")
+            if key in records:
+                raise ValueError(f"Duplicate record key '{key}'")
+            records[key] = []
+            for name in names.split(','):
+                name, _, axis = name.strip().partition('/')
+                if not name:
+                    raise ValueError(f"Empty channel name in '{entry}'")
+                if name in channels:
+                    raise ValueError(f"Duplicate channel name '{name}'")
+                color = self.PALETTE[len(channels) % len(self.PALETTE)]
+                channels[name] = Channel(name, color, axis or key.lower(), self.capacity)
+                records[key].append(name)
+        if not channels:
+            raise ValueError("No telemetry channels configured")
+        self.channels = channels
+        self.records = records
+
+    def keys(self):
+        return list(self.records)
+
+    def axes(self):
+        """Axis name -> channels on that axis, in spec order"""
+        axes = {}
+        for channel in self.channels.values():
+            axes.setdefault(channel.axis, []).append(channel)
+        return axes
+
+    def push(self, timestamp, key, values):
+        names = self.records.get(key)
+        if names:
+            channels = self.channels
+            for name, value in zip(names, values):
+                channels[name].data.push(timestamp, value)
+
+    def clear(self):
+        for channel in self.channels.values():
+            channel.data.clear()
+
+    def __iter__(self):
+        return iter(self.channels.values())
+
+    def __len__(self):
+        return len(self.channels)
@@ -0,0 +1,292 @@
+import tempfile
+import tkinter as tk
+from array import array
+from bisect import bisect_right
+
+
+class ScrollbackStore:
+    """
+    Append-only history of everything written to a text view.
+
+    The text is kept UTF-8 encoded in an anonymous temporary file; only an
+    array of segment start offsets stays in memory. A segment ends at a
+    newline or after max_segment bytes, so long runs without newlines (hex
+    mode) can still be paged through.
+    """
+
+    def __init__(self, max_segment=4096):
+        self.max_segment = max_segment
+        self.file = tempfile.TemporaryFile()
+        self.starts = array('Q', [0])  # Byte offset where each segment starts
+        self.size = 0  # Total bytes stored
+
+    def __len__(self):
+        # The last segment is still open; don't count it while it is empty
+        if self.size == self.starts[-1]:
+            return len(self.starts) - 1
+        return len(self.starts)
+
+    def append(self, text):
+        data = text.encode('utf-8')
+        n = len(data)
+        if not n:
+            return
+        self.file.seek(0, 2)
+        self.file.write(data)
+        base = self.size
+        starts = self.starts
+        pos = 0
+        while pos < n:
+            limit = starts[-1] - base + self.max_segment
+            nl = data.find(b'\n', pos)
+            if nl != -1 and nl < limit:
+                pos = nl + 1
+            elif limit < n:
+                # Force a segment boundary, but never inside a UTF-8 sequence
+                pos = max(limit, pos)
+                while pos < n and (data[pos] & 0xC0) == 0x80:
+                    pos += 1
+                if pos >= n:
+                    break
+            else:
+                break
+            if pos < n or nl == n - 1:
+                starts.append(base + pos)
+        self.size += n
+
+    def offset(self, index):
+        """Byte offset of segment index (len(self) maps to the end of the store)"""
+        if index < len(self.starts):
+            return self.starts[index]
+        return self.size
+
+    def index_at(self, offset):
+        """Segment containing the byte offset"""
+        return max(bisect_right(self.starts, offset) - 1, 0)
+
+    def get(self, first, count):
+        """Return segments [first, first + count) as text"""
+        last = min(first + count, len(self))
+        if first >= last:
+            return ""
+        begin = self.starts[first]
+        end = self.offset(last)
+        self.file.seek(begin)
+        return self.file.read(end - begin).decode('utf-8', errors='replace')
+
+    def write_to(self, f, block_size=1 << 20):
+        """Copy the whole history into a binary file object"""
+        self.file.seek(0)
+        remaining = self.size
+        while remaining > 0:
+            block = self.file.read(min(block_size, remaining))
+            if not block:
+                break
+            f.write(block)
+            remaining -= len(block)
+
+    def clear(self):
+        self.file.seek(0)
+        self.file.truncate()
+        self.starts = array('Q', [0])
+        self.size = 0
+
+    def close(self):
+        self.file.close()
+
+
+class BoundedTextView:
+    """
+    Scrollback-limited, virtualized view over a ScrolledText widget.
+
+    Everything appended goes into a ScrollbackStore, but the Text widget
+    only holds a window of at most max_lines segments and max_bytes bytes
+    (either limit may be None). While following the live tail the oldest
+    rendered content is trimmed in bulk; when the scrollbar is dragged or
+    scrolled into older history, the window is re-rendered from the store.
+    Insert cost and widget memory therefore stay constant however long the
+    session runs, while the full history remains browsable and saveable.
+    """
+
+    TRIM_RATIO = 0.8  # Trim down to this fraction of the limit to amortise deletes
+
+    def __init__(self, text, max_lines=5000, max_bytes=None):
+        self.text = text
+        self.store = ScrollbackStore()
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.first = 0  # Store index of the first rendered segment
+        self.count = 0  # Rendered segments while browsing history
+        self.following = True  # Whether the window is attached to the live tail
+        self.rendering = False
+        self.page_pending = False
+        self.text.vbar.config(command=self.on_scrollbar)
+        self.text.config(yscrollcommand=self.on_text_scroll)
+
+    def set_limit(self, max_lines=None, max_bytes=None):
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        if self.following:
+            self.trim()
+        else:
+            self.render(self.first)
+
+    def rendered_count(self):
+        if self.following:
+            return len(self.store) - self.first
+        return self.count
+
+    def window_size(self, start):
+        """Number of segments from start that fit within the limits"""
+        end = len(self.store)
+        if self.max_lines:
+            end = min(end, start + self.max_lines)
+        if self.max_bytes:
+            end = min(end, self.store.index_at(self.store.offset(start) + self.max_bytes))
+        return max(end - start, 1)
+
+    def tail_start(self):
+        """First segment of a full window that ends at the live tail"""
+        total = len(self.store)
+        start = 0
+        if self.max_lines:
+            start = max(start, total - self.max_lines)
+        if self.max_bytes and self.store.size > self.max_bytes:
+            start = max(start, self.store.index_at(self.store.size - self.max_bytes) + 1)
+        return min(start, max(total - 1, 0))
+
+    def append(self, text, scroll=True, tags=None):
+        """
+        Append text to the history and to the live window; tags (e.g. a
+        highlight) apply to the live insert only, not to re-rendered history
+        """
+        if not text:
+            return
+        self.store.append(text)
+        if not self.following:
+            if not scroll:
+                self.update_scrollbar()
+                return
+            self.show_tail()
+            return
+        self.text.insert(tk.END, text, tags)
+        self.trim()
+        if scroll:
+            self.text.see(tk.END)
+
+    def trim(self):
+        """Drop the oldest rendered segments in one bulk delete once a limit is exceeded"""
+        store = self.store
+        total = len(store)
+        drop_to = self.first
+        if self.max_lines and total - self.first > self.max_lines:
+            drop_to = max(drop_to, total - int(self.max_lines * self.TRIM_RATIO))
+        if self.max_bytes and store.size - store.offset(self.first) > self.max_bytes:
+            keep_from = store.size - int(self.max_bytes * self.TRIM_RATIO)
+            drop_to = max(drop_to, store.index_at(keep_from) + 1)
+        drop_to = min(drop_to, total - 1)
+        if drop_to <= self.first:
+            return
+        dropped = len(store.get(self.first, drop_to - self.first))
+        self.rendering = True
+        try:
+            self.text.delete("1.0", f"1.0 + {dropped} chars")
+        finally:
+            self.rendering = False
+        self.first = drop_to
+
+    def render(self, start, fraction=None):
+        """Re-render the window beginning at segment start"""
+        total = len(self.store)
+        start = min(max(start, 0), max(total - 1, 0))
+        count = self.window_size(start)
+        if start + count >= total:
+            # Window reaches the tail: fill it backwards so it stays full
+            start = min(start, self.tail_start())
+            count = max(total - start, 0)
+        self.rendering = True
+        try:
+            self.text.delete("1.0", tk.END)
+            self.text.insert(tk.END, self.store.get(start, count))
+        finally:
+            self.rendering = False
+        self.first = start
+        self.count = count
+        self.following = start + count >= total
+        if fraction is not None:
+            self.text.yview_moveto(fraction)
+        self.update_scrollbar()
+
+    def show_tail(self):
+        self.render(self.tail_start())
+        self.text.see(tk.END)
+
+    def clear(self):
+        self.store.clear()
+        self.text.delete("1.0", tk.END)
+        self.first = 0
+        self.count = 0
+        self.following = True
+
+    def save(self, file_path):
+        """Write the complete history (not just the rendered window) to file_path"""
+        with open(file_path, "wb") as f:
+            self.store.write_to(f)
+
+    def update_scrollbar(self):
+        lo, hi = self.text.yview()
+        self.on_text_scroll(lo, hi)
+
+    def on_text_scroll(self, lo, hi):
+        """yscrollcommand of the Text: map the window position onto the whole history"""
+        lo, hi = float(lo), float(hi)
+        total = len(self.store)
+        n = self.rendered_count()
+        if total == 0 or n <= 0:
+            self.text.vbar.set(lo, hi)
+            return
+        self.text.vbar.set((self.first + lo * n) / total, (self.first + hi * n) / total)
+        if self.rendering or self.page_pending:
+            return
+        # Page in neighbouring history when the user scrolls against a window edge
+        if lo <= 0.0 and hi < 1.0 and self.first > 0:
+            self.page_pending = True
+            self.text.after_idle(self.page, -1)
+        elif hi >= 1.0 and lo > 0.0 and not self.following:
+            self.page_pending = True
+            self.text.after_idle(self.page, 1)
+
+    def page(self, direction):
+        self.page_pending = False
+        n = self.rendered_count()
+        half = max(n // 2, 1)
+        if direction < 0:
+            anchor = self.first
+            start = max(self.first - half, 0)
+        else:
+            anchor = self.first + n
+            start = self.first + half
+        self.render(start)
+        # Keep the segment at the old edge in view
+        count = max(self.rendered_count(), 1)
+        self.text.yview_moveto(min(max((anchor - self.first) / count, 0.0), 1.0))
+        if direction > 0:
+            self.text.yview_scroll(-1, "pages")
+
+    def on_scrollbar(self, *args):
+        """Scrollbar command covering the whole history"""
+        total = len(self.store)
+        if not args or total == 0:
+            self.text.yview(*args)
+            return
+        if args[0] == "moveto":
+            target = min(max(float(args[1]), 0.0), 1.0) * total
+            n = self.rendered_count()
+            if self.first <= target < self.first + n or (self.following and target >= self.first):
+                self.text.yview_moveto((target - self.first) / max(n, 1))
+            else:
+                start = int(target) - self.window_size(int(target)) // 2
+                self.render(start)
+                self.text.yview_moveto((target - self.first) / max(self.rendered_count(), 1))
+        else:
+            self.text.yview(*args)
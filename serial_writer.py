@@ -0,0 +1,223 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+# Message priorities, most urgent first
+COMMAND = 0  # Device commands (SET_PID, live updates, ...): sent ahead of anything queued
+BULK = 1  # User data from the send box and other bulk transfers
+WRITE_TIMEOUT = 2.0  # Seconds without progress before queued output is given up
+
+
+def block_size(baudrate, write_timeout=WRITE_TIMEOUT, limit=4096):
+    """
+    Largest write that the line carries in a quarter of write_timeout (10
+    bits per byte), so one block never runs into the port's own write
+    timeout on a slow link
+    """
+    return max(min(int(baudrate / 10 * write_timeout / 4), limit), 16)
+
+
+class WriteQueue:
+    """
+    Prioritized, coalescing transmit queue in front of an AsyncSerial.
+
+    put() may be called from any thread and never blocks: the message is
+    appended to its priority's queue and the writer task on the event loop
+    is woken. The writer hands the port one block at a time. A block joins
+    every queued message (most urgent first, FIFO within a priority) up to
+    max_write bytes, so a burst of small sends goes out as one write. The
+    next block is only built once the previous one has left the process,
+    which is what lets a command overtake queued bulk data.
+
+    Once the port has accepted nothing for write_timeout seconds (a stalled
+    adapter or a flow-control hold), the rest of the block is discarded and
+    reported through on_error, and the writer moves on; a slow but moving
+    link never times out. The OS only takes more once its own buffer has
+    room, so the clock starts after what it already holds should have left
+    at the port's baud rate (10 bits per byte). If the block was cut off mid-line, resync is sent
+    first, so the device rejects the partial line instead of gluing it onto
+    the next message (None disables this for binary links). With the
+    executor fallback (Windows) progress is only seen per write, so open
+    the port with write_timeout and keep max_write to what the line carries
+    well within it (block_size()). At most max_bytes may wait:
+    put() refuses messages beyond that instead of buffering without limit.
+    report() gives throughput, write and message rates, queue depth and
+    timeouts since the previous report, like StreamStats.
+    """
+
+    def __init__(self, connection, max_write=4096, write_timeout=WRITE_TIMEOUT, max_bytes=1 << 20, priorities=2,
+                 resync=b"\n"):
+        self.connection = connection
+        self.loop = connection.loop
+        self.max_write = max_write
+        self.write_timeout = write_timeout
+        self.resync = resync
+        baudrate = getattr(connection.serial_port, "baudrate", 0)
+        self.byte_time = 10.0 / baudrate if baudrate else 0.0  # Line time per byte, s
+        self.backlog = 0.0  # Estimated bytes the OS/driver holds, leaving at line rate
+        self.backlog_at = time.monotonic()
+        self.max_bytes = max_bytes
+        self.on_error = None  # Called on the loop thread with a message after a timeout or failure
+        self.lock = threading.Lock()
+        self.queues = [deque() for _ in range(priorities)]
+        self.queued = [0] * priorities  # Bytes waiting per priority
+        self.ready = None  # asyncio.Event, created on the loop by start()
+        self.wake_pending = False
+        self.task = None
+        self.messages = 0
+        self.writes = 0  # Blocks handed to the port
+        self.bytes_written = 0
+        self.timeouts = 0
+        self.discarded = 0  # Bytes dropped after write timeouts
+        self.rejected = 0  # Messages refused because the queue was full
+        self.max_depth = 0  # Deepest queue in bytes in the current interval
+        self.last_report = time.monotonic_ns()
+        self.last_bytes = 0
+        self.last_writes = 0
+        self.last_messages = 0
+
+    def start(self):
+        """Start the writer task (loop thread)"""
+        self.ready = asyncio.Event()
+        self.task = asyncio.ensure_future(self.run())
+
+    def close(self):
+        """Stop the writer and drop whatever is still queued (loop thread)"""
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        with self.lock:
+            for queue in self.queues:
+                queue.clear()
+            self.queued = [0] * len(self.queues)
+
+    def put(self, data, priority=BULK):
+        """Queue data for sending (any thread); returns False if the queue is full"""
+        if not data:
+            return True
+        with self.lock:
+            depth = sum(self.queued)
+            if depth + len(data) > self.max_bytes:
+                self.rejected += 1
+                return False
+            self.queues[priority].append(bytes(data))
+            self.queued[priority] += len(data)
+            if depth + len(data) > self.max_depth:
+                self.max_depth = depth + len(data)
+            wake = not self.wake_pending
+            self.wake_pending = True
+        if wake:
+            self.loop.call_soon_threadsafe(self.wakeup)
+        return True
+
+    def wakeup(self):
+        with self.lock:
+            self.wake_pending = False
+        self.ready.set()
+
+    def pending(self, priority=None):
+        """Bytes queued at priority or more urgent (default: all), plus those the port has not written yet"""
+        queued = self.queued if priority is None else self.queued[:priority + 1]
+        return sum(queued) + self.connection.pending()
+
+    def take(self):
+        """Remove the next block's messages from the queues; returns (data, messages) or None"""
+        parts = []
+        size = 0
+        with self.lock:
+            for priority, queue in enumerate(self.queues):
+                while queue and (not parts or size + len(queue[0]) <= self.max_write):
+                    data = queue.popleft()
+                    self.queued[priority] -= len(data)
+                    parts.append(data)
+                    size += len(data)
+                if queue:
+                    break  # Block full; less urgent messages wait for the next one
+        if not parts:
+            return None
+        return b"".join(parts), len(parts)
+
+    async def run(self):
+        connection = self.connection
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            while True:
+                block = self.take()
+                if block is None:
+                    break
+                data, messages = block
+                discarded = connection.discarded
+                start = connection.bytes_out
+                try:
+                    connection.write(data)
+                    await self.flush(start)
+                except Exception as e:
+                    self.report_error(f"Write failed: {e}")
+                    return
+                dropped = connection.discarded - discarded
+                self.writes += 1
+                self.messages += messages
+                self.bytes_written += len(data) - dropped
+                if not dropped:
+                    continue
+                self.timeouts += 1
+                self.discarded += dropped
+                self.report_error(f"Write stalled for {self.write_timeout:g} s: {dropped} bytes discarded")
+                sent = data[:len(data) - dropped]
+                if self.resync and sent and not sent.endswith(self.resync):
+                    with self.lock:
+                        self.queues[COMMAND].appendleft(self.resync)
+                        self.queued[COMMAND] += len(self.resync)
+
+    async def flush(self, start):
+        """
+        Wait until the port has taken the output written since bytes_out was
+        start; discard the rest once nothing moved for write_timeout seconds
+        beyond the time the OS needs to send what it holds
+        """
+        connection = self.connection
+        progress = connection.bytes_out
+        wait = self.write_timeout + self.line_backlog(progress - start)
+        while connection.pending():
+            try:
+                await asyncio.wait_for(connection.drain(0), wait)
+            except asyncio.TimeoutError:
+                moved = connection.bytes_out - progress
+                progress = connection.bytes_out
+                wait = self.write_timeout + self.line_backlog(moved)
+                # Executor writes (connection.out empty) end with the port's own write_timeout
+                if not moved and connection.out:
+                    connection.discard_output()
+        self.line_backlog(connection.bytes_out - progress)
+
+    def line_backlog(self, moved):
+        """Add moved bytes to the OS backlog; returns the seconds it needs to leave at line rate"""
+        now = time.monotonic()
+        if self.byte_time:
+            self.backlog = max(self.backlog - (now - self.backlog_at) / self.byte_time, 0.0) + moved
+        self.backlog_at = now
+        return self.backlog * self.byte_time
+
+    def report_error(self, message):
+        if self.on_error:
+            self.on_error(message)
+
+    def report(self):
+        """One-line summary of the interval since the previous report"""
+        now = time.monotonic_ns()
+        elapsed = max(now - self.last_report, 1) / 1e9
+        byte_rate = (self.bytes_written - self.last_bytes) / elapsed
+        write_rate = (self.writes - self.last_writes) / elapsed
+        message_rate = (self.messages - self.last_messages) / elapsed
+        text = (f"TX {byte_rate / 1024:.1f} KB/s | {message_rate:.0f} msgs/s in {write_rate:.0f} writes/s"
+                f" | Queue {self.pending()} B (max {self.max_depth} B)")
+        if self.timeouts or self.rejected:
+            text += f" | Timeouts {self.timeouts} ({self.discarded} B dropped) | Rejected {self.rejected}"
+        self.last_report = now
+        self.last_bytes = self.bytes_written
+        self.last_writes = self.writes
+        self.last_messages = self.messages
+        self.max_depth = 0
+        return text
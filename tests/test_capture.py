@@ -0,0 +1,36 @@
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serial_capture import CaptureWriter, iter_capture, RX, TX
+
+
+def test_records_round_trip_across_rotation(tmp_path):
+    capture = CaptureWriter(str(tmp_path / "run.scap"), max_bytes=4096, block_size=1024)
+    for index in range(200):
+        capture.record(RX if index % 2 else TX, b"chunk %03d" % index, index)
+    capture.close()
+    assert len(capture.files) > 1
+    records = [record for path in capture.files for record in iter_capture(path)]
+    assert records == [(index, RX if index % 2 else TX, b"chunk %03d" % index) for index in range(200)]
+    assert capture.error is None
+
+
+def test_failed_rotation_stops_the_capture(tmp_path):
+    folder = tmp_path / "captures"
+    folder.mkdir()
+    errors = []
+    capture = CaptureWriter(str(folder / "run.scap"), max_bytes=2048, block_size=1024, flush_interval=0.05)
+    capture.on_error = errors.append
+    shutil.rmtree(folder)  # Rotation can no longer create a file
+    for index in range(100):
+        capture.record(RX, b"x" * 100, index)
+    capture.close()
+    assert errors and capture.error is errors[0]
+    assert capture.dropped > 0
+    assert capture.thread.is_alive() is False
+    capture.record(RX, b"late", 0)  # Refused, not queued
+    assert capture.blocks.empty()
+    assert "stopped by a write error" in capture.status()
@@ -0,0 +1,28 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+serial = pytest.importorskip("serial")
+
+from serial_discovery import PortDiscovery
+
+
+def test_bad_cache_entries_are_dropped(tmp_path):
+    path = tmp_path / "ports.json"
+    path.write_text(json.dumps({
+        "GOOD": {"baudrate": 115200, "port": "/dev/ttyUSB0", "time": 1700000000.0},
+        "NO_TIME": {"baudrate": 115200},
+        "NO_BAUD": {"time": 1700000001.0},
+        "TEXT_BAUD": {"baudrate": "fast", "time": 1700000002.0},
+        "NOT_A_DICT": [115200],
+    }))
+    discovery = PortDiscovery(cache_path=str(path))
+    assert list(discovery.cache) == ["GOOD"]
+    ports = [SimpleNamespace(device=f"/dev/tty{name}", serial_number=name)
+             for name in ("NO_TIME", "NO_BAUD", "TEXT_BAUD", "NOT_A_DICT", "GOOD")]
+    assert discovery.lookup(ports) == ("/dev/ttyGOOD", 115200)
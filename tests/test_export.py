@@ -0,0 +1,35 @@
+import os
+import struct
+import sys
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serial_export import ExportTable, NPY_MAGIC
+
+
+def read_npy(path):
+    """(header, data bytes) of a .npy v1.0 file"""
+    with open(path, "rb") as f:
+        content = f.read()
+    assert content.startswith(NPY_MAGIC)
+    (length,) = struct.unpack('<H', content[len(NPY_MAGIC):len(NPY_MAGIC) + 2])
+    start = len(NPY_MAGIC) + 2
+    return content[start:start + length].decode('latin1'), content[start + length:]
+
+
+def test_npy_header_keeps_its_size_when_the_count_gains_digits(tmp_path):
+    # Channel names of every length, so some header lands on each padding boundary
+    for length in range(1, 80):
+        path = str(tmp_path / f"run-{length}.npy")
+        table = ExportTable(path, "KEY", ["c" * length], "npy")
+        table.open()
+        size = table.header_size
+        table.write(array('d', [float(i) for i in range(18)]))  # 9 rows of (time, value)
+        table.write(array('d', [9.0, 9.5]))  # 10th row: the count gains a digit
+        table.close()
+        assert os.path.getsize(path) == size + 10 * 2 * 8
+        header, data = read_npy(path)
+        assert "'shape': (10,)" in header
+        assert array('d', data)[:4].tolist() == [0.0, 1.0, 2.0, 3.0]
+        assert array('d', data)[-2:].tolist() == [9.0, 9.5]
@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serial_filter import TriggerFilter
+
+
+def shown(trigger):
+    return b"".join(data for data, _ in trigger.output)
+
+
+def test_matching_lines_with_context():
+    trigger = TriggerFilter("ERR", before=1, after=1)
+    trigger.feed(b"a\nb\nERR 1\nc\nd\ne\n")
+    assert shown(trigger) == b"b\nERR 1\nc\n"
+    assert (trigger.lines, trigger.matches) == (6, 1)
+
+
+def test_hex_pattern_matches_binary_stream_without_newlines():
+    trigger = TriggerFilter("hex:A55A", max_line=256)
+    data = (bytes(range(0x20, 0x60)) + b"\xa5\x5a") * 160  # 10 KB, no newline
+    for pos in range(0, len(data), 97):  # Chunks that split the pattern
+        trigger.feed(data[pos:pos + 97])
+    assert trigger.overflows > 0
+    assert trigger.matches > 0
+    assert shown(trigger).count(b"\xa5\x5a") + trigger.buffer.count(b"\xa5\x5a") == 160
+
+
+def test_long_matching_line_is_not_lost():
+    trigger = TriggerFilter("MARK", max_line=64)
+    trigger.feed(b"x" * 200 + b"MARK" + b"y" * 200 + b"\n")
+    assert b"MARK" in shown(trigger)
+    assert "Overflows: " in trigger.counters()
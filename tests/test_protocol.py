@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from serial_protocol import FrameDecoder, encode_frame, slip_decode, slip_encode
+
+
+def test_slip_round_trip():
+    data = bytes(range(256)) * 2
+    assert slip_decode(slip_encode(data)) == data
+
+
+@pytest.mark.parametrize("raw", [b"\x01\xdb\x02", b"\x01\x02\xdb"])
+def test_slip_invalid_escape(raw):
+    with pytest.raises(ValueError):
+        slip_decode(raw)
+
+
+@pytest.mark.parametrize("framing", ["cobs", "slip"])
+def test_frames_byte_at_a_time(framing):
+    stream = encode_frame(0x01, 1.5, -2.0, framing=framing) + encode_frame(0x02, 3.0, 4.0, framing=framing)
+    decoder = FrameDecoder(framing)
+    for index in range(len(stream)):
+        decoder.feed(stream[index:index + 1], index)
+    assert [(key, values) for _, key, values in decoder.samples] == [("SPEED", [1.5, -2.0]), ("ANGLE", [3.0, 4.0])]
+    assert (decoder.crc_errors, decoder.frame_errors) == (0, 0)
+
+
+def test_invalid_slip_escape_counts_as_frame_error():
+    decoder = FrameDecoder("slip")
+    decoder.feed(b"\xc0\x01\xdb\x02\x03\x04\xc0")
+    assert decoder.frame_errors == 1
+    assert not decoder.samples
@@ -0,0 +1,84 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serial_telemetry import LineFramer, RecordFramer
+
+
+class CollectingFramer(LineFramer):
+    def __init__(self, max_line=4096):
+        super().__init__(max_line)
+        self.collected = []
+
+    def handle_line(self, buf, start, end):
+        self.collected.append(bytes(buf[start:end]))
+
+
+STREAM = (b"SPEED:1.5,-2.25\r\n"
+          b"ANGLE:0.5,10\n"
+          b"noise without a key\n"
+          b"SPEED:3,4\r\n"
+          b"SPEED:bad,1\n"
+          b"PWM:42\n"
+          b"ANGLE:-1.25,0\n")
+
+
+def feed_all(framer, chunks):
+    for timestamp, chunk in enumerate(chunks):
+        framer.feed(chunk, timestamp)
+    return [(key, values) for _, key, values in framer.samples]
+
+
+def test_record_split_across_chunks():
+    framer = RecordFramer(("SPEED",))
+    framer.feed(b"SPE", 1)
+    framer.feed(b"ED:1.", 2)
+    assert not framer.samples
+    framer.feed(b"5,2\nSPEED:3", 3)
+    assert list(framer.samples) == [(3, "SPEED", [1.5, 2.0])]
+    framer.feed(b",4\n", 4)
+    assert list(framer.samples)[-1] == (4, "SPEED", [3.0, 4.0])
+    assert framer.lines == 2
+
+
+def test_crlf_endings():
+    framer = CollectingFramer()
+    framer.feed(b"a\r\nb\r")
+    framer.feed(b"\n")
+    assert framer.collected == [b"a\r", b"b\r"]
+    records = RecordFramer(("SPEED",))
+    records.feed(b"SPEED:1,2\r\nSPEED:3,4\r\n")
+    assert [values for _, _, values in records.samples] == [[1.0, 2.0], [3.0, 4.0]]
+    assert records.errors == 0
+
+
+def test_overflow_discards_partial_line():
+    framer = CollectingFramer(max_line=16)
+    framer.feed(b"x" * 10)
+    framer.feed(b"y" * 10)
+    assert framer.overflows == 1
+    assert not framer.buffer
+    framer.feed(b"ok\n")
+    assert framer.collected == [b"ok"]
+    assert framer.overflows == 1
+
+
+def test_byte_at_a_time_matches_one_block():
+    keys = ("SPEED", "ANGLE", "PWM")
+    whole = RecordFramer(keys)
+    single = RecordFramer(keys)
+    expected = feed_all(whole, [STREAM])
+    assert feed_all(single, [STREAM[i:i + 1] for i in range(len(STREAM))]) == expected
+    assert expected == [("SPEED", [1.5, -2.25]), ("ANGLE", [0.5, 10.0]), ("SPEED", [3.0, 4.0]),
+                        ("PWM", [42.0]), ("ANGLE", [-1.25, 0.0])]
+    assert (single.lines, single.errors) == (whole.lines, whole.errors) == (7, 1)
+
+
+def test_large_block():
+    framer = RecordFramer(("SPEED",), max_line=64)
+    framer.feed(b"".join(b"SPEED:%d,%d\n" % (i, -i) for i in range(100000)))
+    assert len(framer.samples) == 100000
+    assert framer.samples[-1][2] == [99999.0, -99999.0]
+    assert framer.overflows == 0
+    assert not framer.buffer